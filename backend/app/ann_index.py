@@ -0,0 +1,292 @@
+#/backend/app/ann_index.py
+"""
+Approximate nearest-neighbour face search (IVF, pure NumPy).
+
+Embeddings are clustered with spherical k-means into `nlist` inverted
+lists. A query only scans the `nprobe` lists whose centroids are closest,
+using a float16 copy of the vectors, and then re-ranks the best
+`rerank_k` candidates with the exact float32 vectors, so the cosine
+threshold used for duplicate detection keeps its exact meaning.
+
+The index is persisted to a single file and opened with np.memmap, so
+every worker shares the same page cache instead of rebuilding it.
+
+    python -m app.ann_index build --nlist 1024
+"""
+import argparse
+import json
+import math
+import os
+import struct
+import threading
+import time
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .embeddings import current_embedding_clause, decode_embedding
+
+MAGIC = b"SCIVF001"
+ALIGN = 64
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk: int = 8192) -> np.ndarray:
+    """Index of the closest centroid (by cosine) for every row"""
+    labels = np.empty(vectors.shape[0], dtype=np.int64)
+    for start in range(0, vectors.shape[0], chunk):
+        block = vectors[start:start + chunk]
+        labels[start:start + chunk] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def train_centroids(vectors: np.ndarray, nlist: int, iterations: int = 10,
+                    sample_size: int = 50000, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on a random sample of the (normalized) vectors"""
+    rng = np.random.default_rng(seed)
+    if vectors.shape[0] > sample_size:
+        sample = vectors[rng.choice(vectors.shape[0], sample_size, replace=False)]
+    else:
+        sample = vectors
+    nlist = min(nlist, sample.shape[0])
+    centroids = sample[rng.choice(sample.shape[0], nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        labels = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        counts = np.bincount(labels, minlength=nlist)
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty lists with random points
+            sums[empty] = sample[rng.choice(sample.shape[0], int(empty.sum()), replace=False)]
+        centroids = _normalize_rows(sums)
+    return centroids
+
+
+class IVFIndex:
+    def __init__(self, ids: np.ndarray, centroids: np.ndarray, offsets: np.ndarray,
+                 scan: np.ndarray, vectors: np.ndarray, path: Optional[str] = None):
+        self.ids = ids
+        self.centroids = centroids
+        self.offsets = offsets
+        self.scan = scan
+        self.vectors = vectors
+        self.path = path
+        self._id_set: Optional[Set[str]] = None
+
+    def __len__(self):
+        return int(self.ids.shape[0])
+
+    @property
+    def nlist(self) -> int:
+        return int(self.centroids.shape[0])
+
+    @property
+    def dim(self) -> int:
+        return int(self.centroids.shape[1])
+
+    @property
+    def id_set(self) -> Set[str]:
+        if self._id_set is None:
+            self._id_set = {i.decode() for i in self.ids}
+        return self._id_set
+
+    @classmethod
+    def build(cls, ids: List[str], embeddings, nlist: Optional[int] = None,
+              iterations: int = 10, seed: int = 0) -> "IVFIndex":
+        vectors = _normalize_rows(embeddings)
+        if nlist is None:
+            nlist = max(1, int(4 * math.sqrt(vectors.shape[0])))
+        centroids = train_centroids(vectors, nlist, iterations=iterations, seed=seed)
+        labels = _assign(vectors, centroids)
+
+        # Store each inverted list contiguously so a probe is one slice
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=centroids.shape[0])
+        offsets = np.zeros(centroids.shape[0] + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        width = max((len(i) for i in ids), default=1)
+        id_array = np.array(ids, dtype=f"S{width}")[order]
+        ordered = vectors[order]
+        return cls(id_array, centroids, offsets, ordered.astype(np.float16), ordered)
+
+    def search(self, embedding, k: int = 1, nprobe: Optional[int] = None,
+               rerank_k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Return up to k (user_id, exact cosine distance) pairs, closest first"""
+        nprobe = nprobe or settings.FACE_ANN_NPROBE
+        rerank_k = max(k, rerank_k or settings.FACE_ANN_RERANK_K)
+        query = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if norm == 0 or len(self) == 0:
+            return []
+        query = query / norm
+
+        nprobe = min(nprobe, self.nlist)
+        centroid_sims = self.centroids @ query
+        probes = np.argpartition(-centroid_sims, nprobe - 1)[:nprobe]
+
+        rows = [np.arange(self.offsets[p], self.offsets[p + 1]) for p in probes]
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        if rows.size == 0:
+            return []
+        rows.sort()  # sequential reads through the memory map
+
+        approx = self.scan[rows].astype(np.float32) @ query
+        if rows.size > rerank_k:
+            keep = np.argpartition(-approx, rerank_k - 1)[:rerank_k]
+            rows = rows[keep]
+
+        # Exact re-rank with the float32 vectors
+        exact = self.vectors[rows] @ query
+        best = np.argsort(-exact)[:k]
+        return [(self.ids[rows[i]].decode(), float(1.0 - exact[i])) for i in best]
+
+    def find_match(self, embedding, threshold: float = 0.3, **kwargs) -> Optional[Tuple[str, float]]:
+        results = self.search(embedding, k=1, **kwargs)
+        if results and results[0][1] < threshold:
+            return results[0]
+        return None
+
+    def save(self, path: str):
+        """Write the index atomically to a single memory-mappable file"""
+        arrays = {
+            "centroids": np.ascontiguousarray(self.centroids, dtype=np.float32),
+            "offsets": np.ascontiguousarray(self.offsets, dtype=np.int64),
+            "ids": np.ascontiguousarray(self.ids),
+            "scan": np.ascontiguousarray(self.scan, dtype=np.float16),
+            "vectors": np.ascontiguousarray(self.vectors, dtype=np.float32),
+        }
+        layout = {}
+        offset = 0
+        for name, array in arrays.items():
+            layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset += math.ceil(array.nbytes / ALIGN) * ALIGN
+        header = json.dumps({"arrays": layout, "created": time.time()}).encode()
+        data_start = math.ceil((len(MAGIC) + 8 + len(header)) / ALIGN) * ALIGN
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            for name, array in arrays.items():
+                f.seek(data_start + layout[name]["offset"])
+                f.write(array.tobytes())
+            f.truncate(data_start + offset)
+        os.replace(tmp_path, path)
+        self.path = path
+
+    @classmethod
+    def open(cls, path: str) -> "IVFIndex":
+        """Memory-map a saved index; pages are shared between processes"""
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a face index file")
+            (header_len,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_len))
+        data_start = math.ceil((len(MAGIC) + 8 + header_len) / ALIGN) * ALIGN
+
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            shape = tuple(spec["shape"])
+            if 0 in shape:
+                arrays[name] = np.empty(shape, dtype=spec["dtype"])
+                continue
+            arrays[name] = np.memmap(
+                path, dtype=spec["dtype"], mode="r",
+                offset=data_start + spec["offset"], shape=shape
+            )
+        return cls(
+            arrays["ids"], np.asarray(arrays["centroids"]), np.asarray(arrays["offsets"]),
+            arrays["scan"], arrays["vectors"], path=path
+        )
+
+
+def load_embeddings_from_db(db: Session) -> Tuple[List[str], np.ndarray]:
+    rows = db.query(
+        models.User.id,
+        models.User.face_embedding_blob,
+        models.User.face_embedding_dim,
+        models.User.face_embedding
+    ).filter(current_embedding_clause()).yield_per(1000)
+
+    ids = []
+    vectors = []
+    for user_id, blob, dim, legacy_json in rows:
+        try:
+            vectors.append(decode_embedding(blob, dim, legacy_json))
+            ids.append(user_id)
+        except (TypeError, ValueError):
+            continue
+    if not vectors:
+        return [], np.empty((0, 0), dtype=np.float32)
+    return ids, np.vstack(vectors)
+
+
+def build_from_db(db: Session, path: str = None, nlist: Optional[int] = None,
+                  iterations: int = 10, seed: int = 0) -> IVFIndex:
+    ids, embeddings = load_embeddings_from_db(db)
+    if not ids:
+        raise ValueError("No stored face embeddings to index")
+    index = IVFIndex.build(ids, embeddings, nlist=nlist, iterations=iterations, seed=seed)
+    index.save(path or settings.FACE_ANN_PATH)
+    return index
+
+
+_ann_lock = threading.Lock()
+_ann_index: Optional[IVFIndex] = None
+_ann_mtime: Optional[float] = None
+
+
+def get_ann_index() -> Optional[IVFIndex]:
+    """The memory-mapped index for this process, reopened if the file was rebuilt"""
+    global _ann_index, _ann_mtime
+    if not settings.FACE_ANN_ENABLED:
+        return None
+    try:
+        mtime = os.path.getmtime(settings.FACE_ANN_PATH)
+    except OSError:
+        return None
+    if _ann_index is None or mtime != _ann_mtime:
+        with _ann_lock:
+            if _ann_index is None or mtime != _ann_mtime:
+                _ann_index = IVFIndex.open(settings.FACE_ANN_PATH)
+                _ann_mtime = mtime
+                print(f"[ANN] Opened face index with {len(_ann_index)} faces, {_ann_index.nlist} lists")
+    return _ann_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Approximate face search index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="build the index file from the users table")
+    build.add_argument("--path", default=settings.FACE_ANN_PATH)
+    build.add_argument("--nlist", type=int, default=None, help="number of lists (default 4*sqrt(n))")
+    build.add_argument("--iterations", type=int, default=10)
+    build.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from .database import SessionLocal
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        index = build_from_db(db, args.path, args.nlist, args.iterations, args.seed)
+        print(f"Indexed {len(index)} faces into {index.nlist} lists "
+              f"in {time.perf_counter() - start:.1f}s -> {args.path}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#/backend/app/attendance.py
+"""
+Real-time attendance from classroom camera frames.
+
+Each WebSocket session matches faces only against the students enrolled
+in its course. To keep up with the camera on CPU:
+- only the newest frame is processed; frames that arrive while one is
+  being processed replace each other (stale frames are dropped),
+- faces overlapping a face recognized in the previous frame are not
+  re-embedded,
+- frames from all classrooms are embedded together in pool batches.
+"""
+import asyncio
+from datetime import date
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+
+from . import models
+from .config import settings
+from .database import SessionLocal
+from .embeddings import current_embedding_clause, get_user_embedding
+from .face_index import FaceIndex
+from .face_pipeline import box_overlap, embed_frames
+from .inference_pool import inference_pool
+
+
+class FrameBatcher:
+    """Collects frames from every session and embeds them in shared pool jobs"""
+
+    def __init__(self, max_batch: int, max_wait: float):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _ensure_running(self):
+        if self._runner is None or self._runner.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(max(1, settings.FACE_WORKERS))
+            self._runner = asyncio.create_task(self._run())
+
+    async def embed(self, frame: bytes, known_boxes: List[tuple]) -> List[dict]:
+        self._ensure_running()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(((frame, known_boxes), future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # One job per free worker, so batches overlap across processes
+            await self._slots.acquire()
+            asyncio.create_task(self._embed_batch(batch))
+
+    async def _embed_batch(self, batch):
+        try:
+            results = await inference_pool.submit(
+                embed_frames, [item for item, _ in batch], settings.ATTENDANCE_DETECTOR
+            )
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+
+frame_batcher = FrameBatcher(
+    settings.ATTENDANCE_BATCH_SIZE,
+    settings.ATTENDANCE_BATCH_WAIT_MS / 1000
+)
+
+
+class AttendanceSession:
+    def __init__(self, course_id: str, day: date):
+        self.course_id = course_id
+        self.day = day
+        self.index = FaceIndex(initial_capacity=64)
+        self.enrolled: Set[str] = set()
+        self.marked: Set[str] = set()
+        self.tracked: List[Tuple[tuple, str]] = []  # (box, student_id) from the last frame
+
+    def load(self) -> bool:
+        """Blocking: read the course roster and today's marks. False if no such course."""
+        db = SessionLocal()
+        try:
+            if db.get(models.Course, self.course_id) is None:
+                return False
+            students = db.query(models.User).join(
+                models.Enrollment, models.Enrollment.student_id == models.User.id
+            ).filter(
+                models.Enrollment.course_id == self.course_id,
+                current_embedding_clause()
+            ).all()
+            self.enrolled = {s.id for s in students}
+            self.marked = {
+                student_id for (student_id,) in db.query(models.Attendance.student_id).filter(
+                    models.Attendance.course_id == self.course_id,
+                    models.Attendance.date == self.day
+                )
+            }
+            # Marked students stay in the index: without them their faces
+            # would match the nearest classmate instead
+            self.index.load((s.id, get_user_embedding(s)) for s in students)
+            return True
+        finally:
+            db.close()
+
+    def mark(self, student_id: str, distance: float):
+        """Blocking: record one attendance mark"""
+        db = SessionLocal()
+        try:
+            db.add(models.Attendance(
+                course_id=self.course_id,
+                student_id=student_id,
+                date=self.day,
+                distance=distance
+            ))
+            db.commit()
+        except IntegrityError:
+            db.rollback()  # already marked by another camera in the same room
+        finally:
+            db.close()
+
+    @property
+    def known_boxes(self) -> List[tuple]:
+        return [box for box, _ in self.tracked]
+
+    async def handle_faces(self, faces: List[dict]) -> Dict[str, list]:
+        tracked = []
+        recognized = []
+        newly_marked = []
+        for face in faces:
+            box = tuple(face["box"])
+            if face["embedding"] is None:
+                # Same face as last frame; reuse its identity
+                student_id = self._closest_tracked(box)
+                if student_id:
+                    tracked.append((box, student_id))
+                    recognized.append(student_id)
+                continue
+
+            match = self.index.find_match(face["embedding"], settings.ATTENDANCE_THRESHOLD)
+            if not match:
+                continue
+            student_id, distance = match
+            tracked.append((box, student_id))
+            recognized.append(student_id)
+            if student_id not in self.marked:
+                self.marked.add(student_id)
+                newly_marked.append(student_id)
+                await run_in_threadpool(self.mark, student_id, distance)
+
+        self.tracked = tracked
+        return {"recognized": recognized, "marked": newly_marked}
+
+    def _closest_tracked(self, box: tuple) -> Optional[str]:
+        best = max(self.tracked, key=lambda t: box_overlap(box, t[0]), default=None)
+        return best[1] if best else None
+
+
+async def run_attendance_session(websocket: WebSocket, course_id: str):
+    """
+    Protocol: the client sends JPEG frames as binary messages; the server
+    answers each processed frame with JSON listing recognized students and
+    the ones newly marked present.
+    """
+    await websocket.accept()
+    session = AttendanceSession(course_id, date.today())
+    if not await run_in_threadpool(session.load):
+        await websocket.close(code=4404, reason="Course not found")
+        return
+    await websocket.send_json({
+        "type": "ready",
+        "course_id": course_id,
+        "enrolled": len(session.enrolled),
+        "already_marked": sorted(session.marked),
+    })
+
+    latest = {"frame": None, "dropped": 0}
+    frame_ready = asyncio.Event()
+
+    async def receive_frames():
+        while True:
+            frame = await websocket.receive_bytes()
+            if latest["frame"] is not None:
+                latest["dropped"] += 1  # the previous frame was never processed
+            latest["frame"] = frame
+            frame_ready.set()
+
+    async def process_frames():
+        while True:
+            await frame_ready.wait()
+            frame_ready.clear()
+            frame, latest["frame"] = latest["frame"], None
+            if frame is None:
+                continue
+            if session.enrolled and session.marked >= session.enrolled:
+                await websocket.send_json({"type": "complete", "marked": sorted(session.marked)})
+                continue
+            try:
+                faces = await frame_batcher.embed(frame, session.known_boxes)
+            except Exception as e:
+                await websocket.send_json({"type": "error", "message": str(getattr(e, "detail", e))})
+                continue
+            result = await session.handle_faces(faces)
+            await websocket.send_json({
+                "type": "frame",
+                "faces": len(faces),
+                "recognized": result["recognized"],
+                "marked": result["marked"],
+                "dropped": latest["dropped"],
+            })
+
+    receiver = asyncio.create_task(receive_frames())
+    processor = asyncio.create_task(process_frames())
+    try:
+        done, _ = await asyncio.wait({receiver, processor}, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        processor.cancel()
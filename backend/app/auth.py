@@ -1,94 +1,192 @@
-#/backend/app/auth.py
-from datetime import datetime, timedelta
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from fastapi.security import OAuth2PasswordBearer , HTTPBearer, HTTPAuthorizationCredentials
-from fastapi import Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from . import crud, models
-from .config import settings
-from .schemas import TokenData
-from typing import Dict
-from .database import get_db
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-security = HTTPBearer()
-
-
-def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password: str):
-    return pwd_context.hash(password)
-
-
-token_blacklist: Dict[str, datetime] = {}
-
-def add_to_blacklist(token: str, expires: datetime):
-    token_blacklist[token] = expires
-
-def is_blacklisted(token: str) -> bool:
-    expiry = token_blacklist.get(token)
-    return expiry and expiry > datetime.utcnow()
-
-# Add to existing auth.py
-def create_24h_token(data: dict):
-    """Specifically for 24-hour sessions"""
-    to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(hours=24)
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-
-def detect_user_role(user: models.User) -> str:
-    """Enhanced role detection from ID pattern"""
-    if user.role == "admin":
-        return "admin"
-    # Check ID pattern: YYYYRRDDDXXX
-    role_code = user.id[4:6]
-    return {
-        "01": "admin",
-        "02": "teacher",
-        "03": "student"
-    }.get(role_code, "student")  # Default to student if unknown
-def create_password_reset_token(email: str):
-    """Token specifically for password reset (1 hour expiry)"""
-    expire = datetime.utcnow() + timedelta(hours=1)
-    to_encode = {"sub": email, "exp": expire, "type": "reset"}
-    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-
-def create_access_token(data: dict, expires_delta: timedelta = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire, "type": "access"})  # Add token type
-    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-
-
-
-
-
-async def get_current_user(token: str = Depends(oauth2_scheme),db: Session = Depends(get_db)):
-    """Now uses verify_token_type dependency"""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
-    except JWTError:
-        raise credentials_exception
-    
-    user = crud.get_user_by_email(db= db, email=token_data.email)
-    if user is None:
-        raise credentials_exception
-    return user
+#/backend/app/auth.py
+from datetime import date, datetime, timedelta
+import time
+from jose import JWTError, jwt
+from passlib.context import CryptContext
+from fastapi.security import OAuth2PasswordBearer , HTTPBearer, HTTPAuthorizationCredentials
+from fastapi import Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from . import crud, models
+from .config import settings
+from .schemas import TokenData
+from typing import NamedTuple, Optional
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import get_async_db
+from .revocation import revocation_store
+from .ttl_cache import TTLCache
+
+# Password hashing
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+security = HTTPBearer()
+
+
+def verify_password(plain_password: str, hashed_password: str):
+    return pwd_context.verify(plain_password, hashed_password)
+
+def get_password_hash(password: str):
+    return pwd_context.hash(password)
+
+
+def add_to_blacklist(token: str, expires: datetime):
+    revocation_store.revoke(token, expires)
+    token_cache.pop(token)
+
+def is_blacklisted(token: str) -> bool:
+    return revocation_store.is_revoked(token)
+
+# Add to existing auth.py
+def create_24h_token(data: dict):
+    """Specifically for 24-hour sessions"""
+    to_encode = data.copy()
+    expire = datetime.utcnow() + timedelta(hours=24)
+    to_encode.update({"exp": expire})
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+def detect_user_role(user: models.User) -> str:
+    """Enhanced role detection from ID pattern"""
+    if user.role == "admin":
+        return "admin"
+    # Check ID pattern: YYYYRRDDDXXX
+    role_code = user.id[4:6]
+    return {
+        "01": "admin",
+        "02": "teacher",
+        "03": "student"
+    }.get(role_code, "student")  # Default to student if unknown
+def create_password_reset_token(email: str):
+    """Token specifically for password reset (1 hour expiry)"""
+    expire = datetime.utcnow() + timedelta(hours=1)
+    to_encode = {"sub": email, "exp": expire, "type": "reset"}
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+def create_access_token(data: dict, expires_delta: timedelta = None):
+    to_encode = data.copy()
+    if expires_delta:
+        expire = datetime.utcnow() + expires_delta
+    else:
+        expire = datetime.utcnow() + timedelta(minutes=15)
+    to_encode.update({"exp": expire, "type": "access"})  # Add token type
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+
+
+
+class Principal(NamedTuple):
+    """
+    The authenticated user, reduced to what authorization and /profile need.
+
+    get_current_user always returns this, cached or not: it is detached
+    from any session, so handlers get no relationships or lazy loads and
+    must load the models.User row themselves (by id) to use one.
+    """
+    id: str
+    email: str
+    full_name: Optional[str]
+    role: str
+    department_code: Optional[str]
+    date_of_enrollment: Optional[date]
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            role=user.role,
+            department_code=user.department_code,
+            date_of_enrollment=user.date_of_enrollment
+        )
+
+
+# token -> decoded payload, and email -> Principal
+token_cache = TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+principal_cache = TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+
+
+def invalidate_principal(email: str):
+    """Drop a cached user; call when role, email or password changes"""
+    principal_cache.pop(email)
+
+
+def auth_cache_stats() -> dict:
+    return {
+        "enabled": settings.AUTH_CACHE_ENABLED,
+        "tokens": token_cache.stats(),
+        "principals": principal_cache.stats(),
+    }
+
+
+_AUTH_FIELDS = ("email", "role", "hashed_password")
+
+
+@event.listens_for(models.User, "after_update")
+def _invalidate_changed_user(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[field].history.has_changes() for field in _AUTH_FIELDS):
+        return
+    emails = {target.email, *state.attrs["email"].history.deleted}
+    for email in emails:
+        invalidate_principal(email)
+    # Invalidate again after commit, in case a request re-cached the old row meanwhile
+    state.session.info.setdefault("invalidate_principals", set()).update(emails)
+
+
+@event.listens_for(models.User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target):
+    invalidate_principal(target.email)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    for email in session.info.pop("invalidate_principals", ()):
+        invalidate_principal(email)
+
+
+def _decode_token(token: str) -> dict:
+    if settings.AUTH_CACHE_ENABLED:
+        payload = token_cache.get(token)
+        if payload is not None:
+            return payload
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    if settings.AUTH_CACHE_ENABLED:
+        expires_in = payload.get("exp", 0) - time.time()
+        if expires_in > 0:
+            token_cache.set(token, payload, ttl=expires_in)
+    return payload
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme),db: AsyncSession = Depends(get_async_db)) -> Principal:
+    """The caller as a Principal, whether or not AUTH_CACHE_ENABLED"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    if is_blacklisted(token):
+        raise credentials_exception
+
+    try:
+        payload = _decode_token(token)
+        email: str = payload.get("sub")
+        if email is None:
+            raise credentials_exception
+        token_data = TokenData(email=email)
+    except JWTError:
+        raise credentials_exception
+    
+    if settings.AUTH_CACHE_ENABLED:
+        principal = principal_cache.get(token_data.email)
+        if principal is not None:
+            return principal
+
+    user = await crud.get_user_by_email_async(db= db, email=token_data.email)
+    if user is None:
+        raise credentials_exception
+    principal = Principal.from_user(user)
+    if settings.AUTH_CACHE_ENABLED:
+        principal_cache.set(token_data.email, principal)
+    return principal
@@ -0,0 +1,285 @@
+#/backend/app/bulk_register.py
+"""
+Bulk user registration from a CSV file plus a ZIP of face images.
+
+CSV columns: email, full_name, role, department_code, date_of_enrollment, image
+(`image` is the file name inside the ZIP).
+
+Rows are streamed in chunks. For each chunk the images are embedded in
+batches on the inference pool, checked against the existing faces and
+against the rest of the import, given IDs in bulk and inserted in one
+transaction.
+
+    python -m app.bulk_register students.csv images.zip --report report.json
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import posixpath
+import time
+import uuid
+import zipfile
+from itertools import islice
+from typing import Iterable, List, Optional
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from . import auth, models, schemas
+from .crud import UPLOAD_DIR
+from .email_service import queue_welcome_email
+from .embedding_cache import embedding_cache
+from .embeddings import EMBEDDING_MODEL, set_user_embedding
+from .face_index import FaceIndex, face_index, find_face_match
+from .face_pipeline import FaceAnalysis, compute_faces, record_inference
+from .inference_pool import inference_pool
+from .outbox import outbox_sender
+from .utils import UserIdAllocator
+
+DEFAULT_PASSWORD = "000000"
+
+
+def _chunks(iterable: Iterable, size: int):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BulkRegistration:
+    def __init__(self, db: Session, images: zipfile.ZipFile, chunk_size: int = 256,
+                 batch_size: int = 16, threshold: float = 0.3):
+        self.db = db
+        self.images = images
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.threshold = threshold
+        self.results: List[dict] = []
+        self.created: List[dict] = []  # plain values, safe to use after commit
+
+        # ZIP members by base name, so archives with a top-level folder work too
+        self._members = {
+            posixpath.basename(info.filename): info
+            for info in images.infolist() if not info.is_dir()
+        }
+        self._departments = {code for (code,) in db.query(models.Department.code)}
+        self._seen_emails = set()
+        self._import_faces = FaceIndex()  # faces accepted earlier in this import
+        self._ids = UserIdAllocator(db)
+        # Every account starts with the same temporary password, hash it once
+        self._password_hash = auth.get_password_hash(DEFAULT_PASSWORD)
+
+    def _result(self, row: int, status: str, email: Optional[str] = None,
+                user_id: Optional[str] = None, message: Optional[str] = None):
+        self.results.append({
+            "row": row, "email": email, "status": status,
+            "user_id": user_id, "message": message
+        })
+
+    def _validate(self, numbered_rows):
+        """Parse rows and drop ones that can be rejected without a model run"""
+        parsed = []
+        for row_number, raw in numbered_rows:
+            try:
+                row = schemas.BulkUserRow(**{k.strip(): (v or "").strip() for k, v in raw.items() if k})
+            except ValidationError as e:
+                self._result(row_number, "failed", raw.get("email"), message=str(e.errors()[0]["msg"]))
+                continue
+            if row.email in self._seen_emails:
+                self._result(row_number, "skipped", row.email, message="Duplicate email in this file")
+                continue
+            self._seen_emails.add(row.email)
+            if row.department_code not in self._departments:
+                self._result(row_number, "failed", row.email, message="Department not found")
+                continue
+            if posixpath.basename(row.image) not in self._members:
+                self._result(row_number, "failed", row.email, message=f"Image {row.image} not in archive")
+                continue
+            parsed.append((row_number, row))
+
+        # One query for the whole chunk instead of one per row
+        emails = [row.email for _, row in parsed]
+        existing = {
+            email for (email,) in
+            self.db.query(models.User.email).filter(models.User.email.in_(emails))
+        } if emails else set()
+        accepted = []
+        for row_number, row in parsed:
+            if row.email in existing:
+                self._result(row_number, "skipped", row.email, message="A user with this email already exists")
+            else:
+                accepted.append((row_number, row))
+        return accepted
+
+    def _extract(self, row: schemas.BulkUserRow) -> str:
+        info = self._members[posixpath.basename(row.image)]
+        file_ext = info.filename.rsplit(".", 1)[-1]
+        file_path = os.path.join(UPLOAD_DIR, f"pending-{uuid.uuid4().hex}.{file_ext}")
+        with self.images.open(info) as src, open(file_path, "wb") as dst:
+            dst.write(src.read())
+        return file_path
+
+    def _embed(self, paths: List[str]) -> list:
+        """Analyses for every path; cached images skip the model entirely"""
+        results = [None] * len(paths)
+        keys = []
+        missing = []
+        for i, path in enumerate(paths):
+            with open(path, "rb") as f:
+                keys.append(embedding_cache.keys_for(f.read()))
+            results[i] = embedding_cache.get(keys[i])
+            if results[i] is None:
+                missing.append(i)
+
+        missing_paths = [paths[i] for i in missing]
+        batches = [missing_paths[i:i + self.batch_size] for i in range(0, len(missing_paths), self.batch_size)]
+        computed = [a for batch in inference_pool.map_batches(compute_faces, batches) for a in batch]
+        for i, analysis in zip(missing, computed):
+            results[i] = analysis
+            if isinstance(analysis, FaceAnalysis):
+                record_inference(analysis.inference_seconds)
+                embedding_cache.put(keys[i], analysis)
+        return results
+
+    def _process_chunk(self, numbered_rows):
+        rows = self._validate(numbered_rows)
+        if not rows:
+            return
+        paths = [self._extract(row) for _, row in rows]
+        analyses = self._embed(paths)
+
+        new_users = []
+        for (row_number, row), path, analysis in zip(rows, paths, analyses):
+            if not isinstance(analysis, FaceAnalysis):
+                os.remove(path)
+                self._result(row_number, "failed", row.email, message=f"No usable face: {analysis}")
+                continue
+
+            match = find_face_match(self.db, analysis.embedding, self.threshold) \
+                or self._import_faces.find_match(analysis.embedding, self.threshold)
+            if match:
+                os.remove(path)
+                self._result(row_number, "skipped", row.email,
+                             message=f"A user with this face already exists ({match[0]})")
+                continue
+
+            user_id = self._ids.allocate(row.date_of_enrollment.year, row.department_code, row.role.value)
+            file_path = os.path.join(UPLOAD_DIR, f"{user_id}.{path.rsplit('.', 1)[-1]}")
+            os.replace(path, file_path)
+
+            db_user = models.User(
+                id=user_id,
+                email=row.email,
+                full_name=row.full_name,
+                role=row.role.value,
+                department_code=row.department_code,
+                date_of_enrollment=row.date_of_enrollment,
+                image_path=file_path,
+                hashed_password=self._password_hash
+            )
+            set_user_embedding(db_user, analysis.embedding, EMBEDDING_MODEL)
+            self._import_faces.add(user_id, analysis.embedding)
+            new_users.append((row_number, db_user, analysis.embedding))
+
+        if not new_users:
+            return
+        # Read what we need now; committed objects are expired and would reload one by one
+        committed = [
+            (row_number, {"id": user.id, "email": user.email,
+                          "full_name": user.full_name, "role": user.role}, embedding)
+            for row_number, user, embedding in new_users
+        ]
+        try:
+            self.db.add_all([user for _, user, _ in new_users])
+            for _, created, _ in committed:
+                queue_welcome_email(
+                    self.db,
+                    email=created["email"],
+                    user_id=created["id"],
+                    user_fullname=created["full_name"],
+                    user_role=created["role"]
+                )
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            for row_number, user, _ in new_users:
+                self._import_faces.remove(user.id)
+                if os.path.exists(user.image_path):
+                    os.remove(user.image_path)
+                self._result(row_number, "failed", user.email, message=f"Insert failed: {e}")
+            # IDs may have been taken concurrently; re-read them next chunk
+            self._ids = UserIdAllocator(self.db)
+            return
+
+        for row_number, created, embedding in committed:
+            face_index.add(created["id"], embedding)
+            self.created.append(created)
+            self._result(row_number, "created", created["email"], user_id=created["id"])
+        outbox_sender.notify()
+
+    def run(self, rows: Iterable[dict]) -> dict:
+        numbered = enumerate(rows, start=2)  # row 1 is the CSV header
+        for chunk in _chunks(numbered, self.chunk_size):
+            self._process_chunk(chunk)
+            print(f"[BULK] {len(self.results)} rows processed, {len(self.created)} created")
+
+        self.results.sort(key=lambda r: r["row"])
+        counts = {status: 0 for status in ("created", "skipped", "failed")}
+        for result in self.results:
+            counts[result["status"]] += 1
+        return {"total": len(self.results), **counts, "results": self.results}
+
+
+def run_bulk_registration(db: Session, csv_file, zip_file, **kwargs):
+    """
+    Import users from a binary CSV stream and a ZIP file object.
+    Returns (report, created users).
+    """
+    text_stream = io.TextIOWrapper(csv_file, encoding="utf-8-sig", newline="")
+    with zipfile.ZipFile(zip_file) as images:
+        job = BulkRegistration(db, images, **kwargs)
+        report = job.run(csv.DictReader(text_stream))
+    text_stream.detach()
+    return report, job.created
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk register users from CSV + ZIP")
+    parser.add_argument("csv_path")
+    parser.add_argument("zip_path")
+    parser.add_argument("--chunk-size", type=int, default=256, help="rows per transaction")
+    parser.add_argument("--batch-size", type=int, default=16, help="images per inference job")
+    parser.add_argument("--report", help="write the per-row report as JSON")
+    args = parser.parse_args()
+
+    from .database import Base, SessionLocal, engine
+    from .migrations import add_missing_columns
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+
+    db = SessionLocal()
+    start = time.perf_counter()
+    try:
+        with open(args.csv_path, "rb") as csv_file, open(args.zip_path, "rb") as zip_file:
+            report, _ = run_bulk_registration(
+                db, csv_file, zip_file,
+                chunk_size=args.chunk_size, batch_size=args.batch_size
+            )
+    finally:
+        db.close()
+        inference_pool.shutdown()
+
+    print(f"Processed {report['total']} rows in {time.perf_counter() - start:.1f}s: "
+          f"{report['created']} created, {report['skipped']} skipped, {report['failed']} failed")
+    print("Welcome emails are queued in the outbox (send with: python -m app.outbox --drain)")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,368 +1,779 @@
-#/backend/app/crud.py
-import base64
-import os
-from sqlite3 import IntegrityError
-from typing import List, Optional
-import uuid
-from fastapi.responses import JSONResponse
-from jose import jwt, JWTError
-from fastapi import BackgroundTasks, HTTPException, status
-from sqlalchemy import func
-from sqlalchemy.orm import Session
-
-from .email_service import send_welcome_email
-from . import models, schemas,auth
-from .utils import check_duplicate_face, generate_user_id
-from .config import settings
-from datetime import datetime, time, timedelta
-import secrets
-from deepface import DeepFace
-import json
-
-
-UPLOAD_DIR = "uploaded_images"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-
-
-def authenticate_user(db: Session, email: str, password: str):
-    """Add this if missing"""
-    user = get_user_by_email(db, email=email)
-    if not user or not auth.verify_password(password, user.hashed_password):
-        return False
-    return user
-def get_user_by_email(db: Session, email: str):
-    """Must exist for authentication"""
-    return db.query(models.User).filter(models.User.email == email).first()
-
-
-
-def create_user(db: Session, user: schemas.UserCreate, background_tasks: BackgroundTasks):
-    try:
-        if get_user_by_email(db, user.email):
-            return JSONResponse(
-                status_code=200, 
-                content={
-                    "status": "fail",
-                    "message": "A user with this email already exists"
-                    }
-            )
-
-        user_id = generate_user_id(
-            enrollment_year=user.date_of_enrollment.year,
-            department_code=user.department_code,
-            role=user.role,
-            db=db
-        )
-
-        image = user.image
-        file_ext = image.filename.split(".")[-1]
-        filename = f"{user_id}.{file_ext}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        
-        with open(file_path, "wb") as buffer:
-            buffer.write(image.file.read())
-
-        if check_duplicate_face(file_path, db):
-            os.remove(file_path)  # Cleanup temp image
-            return JSONResponse(
-                status_code=200, 
-                content={
-                    "status": "fail",
-                    "message": "A user with this face already exists"
-                    }
-            )
-        # ➤ Extract face embedding
-        representation = DeepFace.represent(
-            img_path=file_path,
-            model_name="VGG-Face",
-            enforce_detection=True
-        )[0]
-        embedding = representation["embedding"]
-        embedding_json = json.dumps(embedding)
-
-        db_user = models.User(
-            id=user_id,
-            email=user.email,
-            full_name=user.full_name,
-            role=user.role,
-            department_code=user.department_code,
-            date_of_enrollment=user.date_of_enrollment,
-            image_path=file_path,
-            hashed_password=auth.get_password_hash("000000"),
-            face_embedding=embedding_json
-        )
-
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
-        background_tasks.add_task(
-            send_welcome_email,
-            email=user.email,
-            user_id=user_id,
-            user_fullname=user.full_name,
-            user_role=user.role
-        )
-        return JSONResponse(
-                status_code=200, 
-                content={
-                    "status": "success",
-                    "message": "Registration Successfull"
-                    }
-            )
-
-    except Exception as e:
-        db.rollback()
-        raise e
-
-    
-    
-def get_all_departments(db: Session):
-    return db.query(models.Department).all()
-
-def create_department(db: Session, department):
-    db_department = models.Department(
-        code=department.code,
-        name=department.name,
-        short_name=department.short_name
-    )
-    db.add(db_department)
-    db.commit()
-    db.refresh(db_department)
-    return db_department
-
-def get_department(db: Session, code: str):
-    return db.query(models.Department).filter(models.Department.code == code).first()
-
-
-def get_course(db: Session, course_id: str):
-    return db.query(models.Course).filter(models.Course.id == course_id).first()
-
-
-def create_course(db: Session, course: schemas.CourseCreate):
-    # Generate course ID (e.g., CS-101)
-    department = db.query(models.Department).filter(
-        models.Department.code == course.department_code
-    ).first()
-    if not department:
-        raise ValueError("Department not found")
-    
-    # Check for duplicates
-    existing = db.query(models.Course).filter(
-        models.Course.name == course.name,
-        models.Course.semester == course.semester,
-        models.Course.teacher_id == course.teacher_id
-    ).first()
-    if existing:
-        raise ValueError("Course already exists with these parameters")
-
-    # Get next course number
-    max_num = db.query(func.max(models.Course.id)).filter(
-        models.Course.department_code == course.department_code,
-        models.Course.id.like(f"{department.short_name}-%")
-    ).scalar()
-    next_num = int(max_num.split('-')[1]) + 1 if max_num else 1
-    course_id = f"{department.short_name}-{next_num:03d}"
-
-    db_course = models.Course(
-        id=course_id,
-        **course.dict()
-    )
-    db.add(db_course)
-    db.commit()
-    return db_course
-
-
-
-def create_schedule(db: Session, schedule: models.Schedule):
-    db.add(schedule)
-    db.commit()
-    db.refresh(schedule)
-    return schedule
-
-def get_schedules(
-    db: Session,
-    academic_year: Optional[int] = None,
-    semester: Optional[str] = None,
-    teacher_id: Optional[str] = None,
-    course_id: Optional[str] = None,
-    skip: int = 0,
-    limit: int = 100
-):
-    query = db.query(models.Schedule)
-    
-    if academic_year:
-        query = query.filter(models.Schedule.academic_year_id == academic_year)
-    if semester:
-        query = query.filter(models.Schedule.semester == semester)
-    if teacher_id:
-        query = query.filter(models.Schedule.teacher_id == teacher_id)
-    if course_id:
-        query = query.filter(models.Schedule.course_id == course_id)
-        
-    return query.offset(skip).limit(limit).all()
-
-
-
-
-
-
-def get_teacher_schedules(db: Session, teacher_id: str, academic_year: int, semester: str):
-    return (
-        db.query(models.Schedule)
-        .join(models.Course, models.Schedule.course_id == models.Course.id)
-        .filter(
-            models.Course.teacher_id == teacher_id,
-            models.Schedule.academic_year == academic_year,
-            models.Schedule.semester == semester
-        )
-        .all()
-    )
-
-def get_student_schedules(db: Session, student_id: str, academic_year: int, semester: str):
-    # Get the student record to find department_code
-    student = db.query(models.User).filter(models.User.id == student_id).first()
-    if not student:
-        return []  # Student not found
-    
-    # Extract year (first 4 digits of student_id)
-    year = student_id[:4]
-    
-    # Construct group_code as year + department_code
-    group_code = f"{year}{student.department_code}"
-    
-    # Query schedules with this group_code, academic_year, and semester
-    schedules = db.query(models.Schedule).filter(
-        models.Schedule.group_code == group_code,
-        models.Schedule.academic_year == academic_year,
-        models.Schedule.semester == semester
-    ).all()
-
-    return schedules
-
-
-
-def times_overlap(start1: time, end1: time, start2: time, end2: time) -> bool:
-    return max(start1, start2) < min(end1, end2)
-
-
-
-def update_group_schedule(
-    db: Session,
-    group_code: str,
-    schedule_data: list,
-    academic_year: int,
-    semester: str
-) -> bool:
-    try:
-        # Validate that the group_code is not empty (optional)
-        if not group_code:
-            return False
-
-        # Fetch all courses related to this group by extracting year and dept from group_code
-        # Assuming group_code format: "2025CSE"
-        year = group_code[:4]
-        dept_code = group_code[4:]
-
-        # Find all students in this group
-        students = db.query(models.User).filter(
-            models.User.id.like(f"{year}%"),
-            models.User.department_code == dept_code,
-            models.User.role == "student"
-        ).all()
-
-        if not students:
-            return False
-
-        # Collect all enrolled course_ids for these students
-        all_enrolled_course_ids = set()
-        for student in students:
-            all_enrolled_course_ids.update(e.course_id for e in student.enrollments)
-
-        # Filter only schedule items for courses that all students are enrolled in
-        valid_schedule_data = [
-            item for item in schedule_data
-            if item.course_id in all_enrolled_course_ids
-        ]
-
-        if not valid_schedule_data:
-            return False
-
-        for item in valid_schedule_data:
-            course_id = item.course_id
-            day = item.day_of_week
-            start = item.start_time
-            end = item.end_time
-            course = db.query(models.Course).filter(models.Course.id == course_id).first()
-            if not course or not course.teacher_id:
-                raise ValueError(f"Invalid or unassigned course {course_id}")
-
-            teacher_id = course.teacher_id
-
-            # Check for teacher time conflict
-            conflict = db.query(models.Schedule).join(models.Course).filter(
-                models.Course.teacher_id == teacher_id,
-                models.Schedule.academic_year == academic_year,
-                models.Schedule.semester == semester,
-                models.Schedule.day_of_week == day,
-                models.Schedule.start_time < end,
-                models.Schedule.end_time > start
-            ).first()
-
-            if conflict:
-                day_name = schemas.DayOfWeek(conflict.day_of_week).name.capitalize()
-                start_str = conflict.start_time.strftime("%H:%M").lstrip('0') or '0'
-                end_str = conflict.end_time.strftime("%H:%M").lstrip('0') or '0'
-
-                message = f"Teacher already has course at: {day_name} {start_str}-{end_str}"
-                raise HTTPException(status_code=400, detail=message)
-            # Check if an existing schedule needs to be updated
-            existing = db.query(models.Schedule).filter_by(
-                course_id=course_id,
-                academic_year=academic_year,
-                semester=semester,
-                day_of_week=day,
-                group_code=group_code
-            ).first()
-
-            if existing:
-                existing.start_time = start
-                existing.end_time = end
-                db.add(existing)
-            else:
-                new_schedule = models.Schedule(
-                    course_id=course_id,
-                    academic_year=academic_year,
-                    semester=semester,
-                    day_of_week=day,
-                    start_time=start,
-                    end_time=end,
-                    is_active=True,
-                    group_code=group_code
-                )
-                db.add(new_schedule)
-
-        db.commit()
-        return True
-    except HTTPException as http_exc:
-        db.rollback()
-        # re-raise without modification to preserve message but avoid nested status code
-        raise http_exc
-    except Exception as e:
-        db.rollback()
-        return False
-        
-
-
-def get_group_schedule(
-    db: Session,
-    group_code: str,
-    academic_year: int,
-    semester: str
-) -> list[models.Schedule]:
-    return db.query(models.Schedule).filter_by(
-        group_code=group_code,
-        academic_year=academic_year,
-        semester=semester
-    ).order_by(models.Schedule.day_of_week, models.Schedule.start_time).all()
-
+#/backend/app/crud.py
+import asyncio
+import base64
+import os
+from collections import defaultdict
+from sqlite3 import IntegrityError
+from typing import List, Optional
+import uuid
+import weakref
+from fastapi.responses import JSONResponse
+from jose import jwt, JWTError
+from fastapi import BackgroundTasks, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Column, MetaData, String, Table, exc, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .email_service import queue_welcome_email
+from .outbox import outbox_sender
+from . import models, schemas,auth
+from .database import SessionLocal
+from .utils import check_duplicate_face, generate_user_id, generate_user_id_async, role_code_for
+from .password_pool import password_pool
+from .face_index import face_index
+from .embeddings import EMBEDDING_MODEL, set_user_embedding
+from .face_pipeline import FaceAnalysis, analyze_face
+from .schedule_conflicts import Conflict, ConflictIndex, Slot
+from .timetable_solver import Meeting, TimetableSolver
+from .config import settings
+from datetime import date, datetime, time, timedelta
+import secrets
+from deepface import DeepFace
+import json
+
+
+UPLOAD_DIR = "uploaded_images"
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+# create_user_async: one lock per YYYYRRDDD prefix (asyncio locks belong to
+# one event loop), and how many IDs to try when other worker processes keep
+# taking the one allocated
+_user_id_locks = weakref.WeakKeyDictionary()
+USER_ID_ATTEMPTS = 3
+
+
+def _user_id_lock(prefix: str) -> asyncio.Lock:
+    locks = _user_id_locks.setdefault(asyncio.get_running_loop(), defaultdict(asyncio.Lock))
+    return locks[prefix]
+
+
+
+def authenticate_user(db: Session, email: str, password: str):
+    """Add this if missing"""
+    user = get_user_by_email(db, email=email)
+    if not user or not auth.verify_password(password, user.hashed_password):
+        return False
+    return user
+def get_user_by_email(db: Session, email: str):
+    """Must exist for authentication"""
+    return db.query(models.User).filter(models.User.email == email).first()
+
+async def get_user_by_email_async(db: AsyncSession, email: str):
+    return await db.scalar(select(models.User).where(models.User.email == email).limit(1))
+
+
+
+def save_upload_image(filename: str, contents: bytes) -> str:
+    """Write an uploaded image under a temporary name until the user ID is known"""
+    file_ext = filename.split(".")[-1]
+    file_path = os.path.join(UPLOAD_DIR, f"pending-{uuid.uuid4().hex}.{file_ext}")
+    with open(file_path, "wb") as buffer:
+        buffer.write(contents)
+    return file_path
+
+
+def create_user(
+    db: Session,
+    user: schemas.UserCreate,
+    background_tasks: BackgroundTasks,
+    uploaded_path: Optional[str] = None,
+    analysis: Optional[FaceAnalysis] = None
+):
+    """
+    Register a user. When the caller already saved the image
+    (`uploaded_path`) and ran face inference (`analysis`), neither is
+    repeated here.
+    """
+    try:
+        if get_user_by_email(db, user.email):
+            if uploaded_path:
+                os.remove(uploaded_path)
+            return JSONResponse(
+                status_code=200, 
+                content={
+                    "status": "fail",
+                    "message": "A user with this email already exists"
+                    }
+            )
+
+        user_id = generate_user_id(
+            enrollment_year=user.date_of_enrollment.year,
+            department_code=user.department_code,
+            role=user.role,
+            db=db
+        )
+
+        image = user.image
+        file_ext = image.filename.split(".")[-1]
+        filename = f"{user_id}.{file_ext}"
+        file_path = os.path.join(UPLOAD_DIR, filename)
+        
+        if uploaded_path:
+            os.replace(uploaded_path, file_path)
+        else:
+            with open(file_path, "wb") as buffer:
+                buffer.write(image.file.read())
+
+        # ➤ Detect + embed once; reused for the duplicate check and storage
+        if analysis is None:
+            try:
+                analysis = analyze_face(file_path)
+            except ValueError:
+                os.remove(file_path)  # No usable face in the image
+                raise
+        embedding = analysis.embedding
+
+        if check_duplicate_face(file_path, db, embedding=embedding):
+            os.remove(file_path)  # Cleanup temp image
+            return JSONResponse(
+                status_code=200, 
+                content={
+                    "status": "fail",
+                    "message": "A user with this face already exists"
+                    }
+            )
+
+        db_user = models.User(
+            id=user_id,
+            email=user.email,
+            full_name=user.full_name,
+            role=user.role,
+            department_code=user.department_code,
+            date_of_enrollment=user.date_of_enrollment,
+            image_path=file_path,
+            hashed_password=auth.get_password_hash("000000")
+        )
+        set_user_embedding(db_user, embedding, EMBEDDING_MODEL)
+
+        db.add(db_user)
+        # Welcome email goes out via the outbox, committed with the user
+        queue_welcome_email(
+            db,
+            email=user.email,
+            user_id=user_id,
+            user_fullname=user.full_name,
+            user_role=user.role
+        )
+        db.commit()
+        db.refresh(db_user)
+        face_index.add(db_user.id, embedding)
+        outbox_sender.notify()
+        return JSONResponse(
+                status_code=200, 
+                content={
+                    "status": "success",
+                    "message": "Registration Successfull"
+                    }
+            )
+
+    except Exception as e:
+        db.rollback()
+        raise e
+
+
+async def create_user_async(
+    db: AsyncSession,
+    user: schemas.UserCreate,
+    uploaded_path: str,
+    analysis: FaceAnalysis
+):
+    """
+    create_user for async endpoints; the image is already saved and
+    analyzed. The ID is allocated and committed under a lock per ID prefix,
+    so concurrent registrations in this process never draw the same ID;
+    an ID taken meanwhile by another worker process is allocated again.
+    """
+    try:
+        if await get_user_by_email_async(db, user.email):
+            os.remove(uploaded_path)
+            return JSONResponse(
+                status_code=200,
+                content={
+                    "status": "fail",
+                    "message": "A user with this email already exists"
+                    }
+            )
+
+        embedding = analysis.embedding
+        # The face index loads and refreshes through a blocking sync session
+        if await run_in_threadpool(_is_duplicate_face, uploaded_path, embedding):
+            os.remove(uploaded_path)
+            return JSONResponse(
+                status_code=200,
+                content={
+                    "status": "fail",
+                    "message": "A user with this face already exists"
+                    }
+            )
+
+        hashed_password = await password_pool.hash("000000")
+        file_ext = user.image.filename.split(".")[-1]
+        prefix = f"{user.date_of_enrollment.year}{role_code_for(user.role)}{user.department_code}"
+        async with _user_id_lock(prefix):
+            for attempt in range(USER_ID_ATTEMPTS):
+                user_id = await generate_user_id_async(
+                    enrollment_year=user.date_of_enrollment.year,
+                    department_code=user.department_code,
+                    role=user.role,
+                    db=db
+                )
+                file_path = os.path.join(UPLOAD_DIR, f"{user_id}.{file_ext}")
+                db_user = models.User(
+                    id=user_id,
+                    email=user.email,
+                    full_name=user.full_name,
+                    role=user.role,
+                    department_code=user.department_code,
+                    date_of_enrollment=user.date_of_enrollment,
+                    image_path=file_path,
+                    hashed_password=hashed_password
+                )
+                set_user_embedding(db_user, embedding, EMBEDDING_MODEL)
+
+                db.add(db_user)
+                queue_welcome_email(
+                    db,
+                    email=user.email,
+                    user_id=user_id,
+                    user_fullname=user.full_name,
+                    user_role=user.role
+                )
+                try:
+                    await db.commit()
+                    break
+                except exc.IntegrityError:
+                    await db.rollback()
+                    if await get_user_by_email_async(db, user.email):
+                        os.remove(uploaded_path)
+                        return JSONResponse(
+                            status_code=200,
+                            content={
+                                "status": "fail",
+                                "message": "A user with this email already exists"
+                                }
+                        )
+                    if attempt == USER_ID_ATTEMPTS - 1:
+                        raise
+                    print(f"[REGISTER] User ID {user_id} was taken by another worker, allocating again")
+
+        # Renamed only once the ID is ours; an earlier rename could
+        # overwrite the image of the user that took the ID
+        os.replace(uploaded_path, file_path)
+        face_index.add(user_id, embedding)
+        outbox_sender.notify()
+        return JSONResponse(
+                status_code=200,
+                content={
+                    "status": "success",
+                    "message": "Registration Successfull"
+                    }
+            )
+
+    except Exception as e:
+        await db.rollback()
+        if os.path.exists(uploaded_path):
+            os.remove(uploaded_path)
+        raise e
+
+
+def _is_duplicate_face(image_path: str, embedding) -> bool:
+    """Blocking: check_duplicate_face with its own sync session"""
+    db = SessionLocal()
+    try:
+        return check_duplicate_face(image_path, db, embedding=embedding)
+    finally:
+        db.close()
+
+    
+    
+def get_all_departments(db: Session):
+    return db.query(models.Department).all()
+
+def create_department(db: Session, department):
+    db_department = models.Department(
+        code=department.code,
+        name=department.name,
+        short_name=department.short_name
+    )
+    db.add(db_department)
+    db.commit()
+    db.refresh(db_department)
+    return db_department
+
+def get_department(db: Session, code: str):
+    return db.query(models.Department).filter(models.Department.code == code).first()
+
+
+def get_course(db: Session, course_id: str):
+    return db.query(models.Course).filter(models.Course.id == course_id).first()
+
+
+# Ids per IN (...) query / rows per executemany, well under SQLite's variable limit
+ENROLL_CHUNK_SIZE = 500
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# Larger student sets are matched through a temporary table instead of IN (...)
+COMMON_COURSES_INLINE_LIMIT = 500
+
+_student_ids_table = Table(
+    "tmp_student_ids", MetaData(),
+    Column("student_id", String, primary_key=True),
+    prefixes=["TEMPORARY"]
+)
+
+
+def get_common_courses(db: Session, student_ids: List[str]) -> List[models.Course]:
+    """Courses every one of `student_ids` is enrolled in, in a single query"""
+    student_ids = list(dict.fromkeys(student_ids))
+    if not student_ids:
+        return []
+
+    if len(student_ids) <= COMMON_COURSES_INLINE_LIMIT:
+        enrolled = models.Enrollment.student_id.in_(student_ids)
+        temp_table = None
+    else:
+        temp_table = _student_ids_table
+        conn = db.connection()
+        temp_table.create(conn, checkfirst=True)
+        conn.execute(temp_table.delete())
+        for chunk in _chunks(student_ids, ENROLL_CHUNK_SIZE):
+            conn.execute(temp_table.insert(), [{"student_id": sid} for sid in chunk])
+        enrolled = models.Enrollment.student_id.in_(select(temp_table.c.student_id))
+
+    common_ids = select(models.Enrollment.course_id).where(enrolled).group_by(
+        models.Enrollment.course_id
+    ).having(func.count(func.distinct(models.Enrollment.student_id)) == len(student_ids))
+    courses = db.query(models.Course).filter(models.Course.id.in_(common_ids)).all()
+
+    if temp_table is not None:
+        temp_table.drop(db.connection())
+    return courses
+
+
+async def enroll_students(db: AsyncSession, course_id: str, student_ids: List[str]):
+    """
+    Enroll many students in one course in a single transaction.
+
+    Existing enrollments and unknown students are found with one IN query
+    per chunk; the rest are inserted with executemany. Returns
+    (enrolled_count, errors) with one error per skipped student id.
+    """
+    if await db.scalar(select(models.Course.id).where(models.Course.id == course_id)) is None:
+        raise HTTPException(status_code=404, detail=f"Course {course_id} not found")
+
+    # A concurrent enrollment can win the unique index between our check and
+    # insert; the transaction is then rolled back and the check redone once.
+    for attempt in range(2):
+        known, enrolled_ids = set(), set()
+        unique_ids = list(dict.fromkeys(student_ids))
+        for chunk in _chunks(unique_ids, ENROLL_CHUNK_SIZE):
+            known.update(await db.scalars(select(models.User.id).where(
+                models.User.id.in_(chunk), models.User.role == "student"
+            )))
+            enrolled_ids.update(await db.scalars(select(models.Enrollment.student_id).where(
+                models.Enrollment.course_id == course_id, models.Enrollment.student_id.in_(chunk)
+            )))
+
+        errors, to_enroll, seen = [], [], set()
+        for student_id in student_ids:
+            if student_id not in known:
+                errors.append(f"Student {student_id} not found")
+            elif student_id in enrolled_ids or student_id in seen:
+                errors.append(f"Student {student_id} already enrolled")
+            else:
+                seen.add(student_id)
+                to_enroll.append(student_id)
+
+        try:
+            for chunk in _chunks(to_enroll, ENROLL_CHUNK_SIZE):
+                await db.execute(
+                    insert(models.Enrollment),
+                    [{"student_id": student_id, "course_id": course_id} for student_id in chunk]
+                )
+            await db.commit()
+            return len(to_enroll), errors
+        except exc.IntegrityError:
+            await db.rollback()
+            if attempt:
+                raise
+
+
+def create_course(db: Session, course: schemas.CourseCreate):
+    # Generate course ID (e.g., CS-101)
+    department = db.query(models.Department).filter(
+        models.Department.code == course.department_code
+    ).first()
+    if not department:
+        raise ValueError("Department not found")
+    
+    # Check for duplicates
+    existing = db.query(models.Course).filter(
+        models.Course.name == course.name,
+        models.Course.semester == course.semester,
+        models.Course.teacher_id == course.teacher_id
+    ).first()
+    if existing:
+        raise ValueError("Course already exists with these parameters")
+
+    # Get next course number
+    max_num = db.query(func.max(models.Course.id)).filter(
+        models.Course.department_code == course.department_code,
+        models.Course.id.like(f"{department.short_name}-%")
+    ).scalar()
+    next_num = int(max_num.split('-')[1]) + 1 if max_num else 1
+    course_id = f"{department.short_name}-{next_num:03d}"
+
+    db_course = models.Course(
+        id=course_id,
+        **course.dict()
+    )
+    db.add(db_course)
+    db.commit()
+    return db_course
+
+
+
+def create_schedule(db: Session, schedule: models.Schedule):
+    db.add(schedule)
+    db.commit()
+    db.refresh(schedule)
+    return schedule
+
+def get_schedules(
+    db: Session,
+    academic_year: Optional[int] = None,
+    semester: Optional[str] = None,
+    teacher_id: Optional[str] = None,
+    course_id: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100
+):
+    query = db.query(models.Schedule)
+    
+    if academic_year:
+        query = query.filter(models.Schedule.academic_year_id == academic_year)
+    if semester:
+        query = query.filter(models.Schedule.semester == semester)
+    if teacher_id:
+        query = query.filter(models.Schedule.teacher_id == teacher_id)
+    if course_id:
+        query = query.filter(models.Schedule.course_id == course_id)
+        
+    return query.offset(skip).limit(limit).all()
+
+
+
+
+
+
+def get_teacher_schedules(db: Session, teacher_id: str, academic_year: int, semester: str):
+    return (
+        db.query(models.Schedule)
+        .join(models.Course, models.Schedule.course_id == models.Course.id)
+        .filter(
+            models.Course.teacher_id == teacher_id,
+            models.Schedule.academic_year == academic_year,
+            models.Schedule.semester == semester
+        )
+        .all()
+    )
+
+def get_student_schedules(db: Session, student_id: str, academic_year: int, semester: str):
+    # Get the student record to find department_code
+    student = db.query(models.User).filter(models.User.id == student_id).first()
+    if not student:
+        return []  # Student not found
+    
+    # Extract year (first 4 digits of student_id)
+    year = student_id[:4]
+    
+    # Construct group_code as year + department_code
+    group_code = f"{year}{student.department_code}"
+    
+    # Query schedules with this group_code, academic_year, and semester
+    schedules = db.query(models.Schedule).filter(
+        models.Schedule.group_code == group_code,
+        models.Schedule.academic_year == academic_year,
+        models.Schedule.semester == semester
+    ).all()
+
+    return schedules
+
+
+
+def times_overlap(start1: time, end1: time, start2: time, end2: time) -> bool:
+    return max(start1, start2) < min(end1, end2)
+
+
+
+def _group_course_ids(db: Session, group_code: str) -> set:
+    # Fetch all courses related to this group by extracting year and dept from group_code
+    # Assuming group_code format: "2025CSE"
+    year = group_code[:4]
+    dept_code = group_code[4:]
+
+    # Courses any student of the group is enrolled in (one query, no per-student loads)
+    return {
+        course_id for (course_id,) in db.query(models.Enrollment.course_id).join(
+            models.User, models.Enrollment.student_id == models.User.id
+        ).filter(
+            models.User.id.like(f"{year}%"),
+            models.User.department_code == dept_code,
+            models.User.role == "student"
+        ).distinct()
+    }
+
+
+def _prepare_group_schedule(
+    db: Session,
+    group_code: str,
+    schedule_data: list,
+    academic_year: int,
+    semester: str
+):
+    """
+    The items the group can be scheduled for, their courses, the group's
+    current rows keyed by (course_id, day_of_week) and the ids of the rows
+    the items replace. None when there is nothing to schedule.
+    """
+    # Validate that the group_code is not empty (optional)
+    if not group_code:
+        return None
+
+    all_enrolled_course_ids = _group_course_ids(db, group_code)
+    if not all_enrolled_course_ids:
+        return None
+
+    # Filter only schedule items for courses that all students are enrolled in
+    valid_schedule_data = [
+        item for item in schedule_data
+        if item.course_id in all_enrolled_course_ids
+    ]
+
+    if not valid_schedule_data:
+        return None
+
+    courses = {
+        course.id: course for course in db.query(models.Course).filter(
+            models.Course.id.in_({item.course_id for item in valid_schedule_data})
+        )
+    }
+    for item in valid_schedule_data:
+        course = courses.get(item.course_id)
+        if not course or not course.teacher_id:
+            raise ValueError(f"Invalid or unassigned course {item.course_id}")
+
+    # The group's current rows, keyed like the upsert in update_group_schedule
+    existing = {
+        (row.course_id, row.day_of_week): row for row in db.query(models.Schedule).filter_by(
+            group_code=group_code,
+            academic_year=academic_year,
+            semester=semester
+        )
+    }
+    replaced_ids = {
+        existing[(item.course_id, item.day_of_week)].id
+        for item in valid_schedule_data if (item.course_id, item.day_of_week) in existing
+    }
+    return valid_schedule_data, courses, existing, replaced_ids
+
+
+def _group_schedule_conflicts(
+    db: Session,
+    group_code: str,
+    items: list,
+    courses: dict,
+    replaced_ids: set,
+    academic_year: int,
+    semester: str
+) -> List[Conflict]:
+    # Every slot of the group and its teachers this term, checked in memory
+    index = ConflictIndex.load(
+        db, academic_year, semester,
+        teacher_ids={c.teacher_id for c in courses.values()},
+        group_codes=[group_code],
+        exclude_ids=replaced_ids
+    )
+    return index.check(
+        Slot(item.course_id, item.day_of_week, item.start_time, item.end_time,
+             courses[item.course_id].teacher_id, group_code)
+        for item in items
+    )
+
+
+def validate_group_schedule(
+    db: Session,
+    group_code: str,
+    schedule_data: list,
+    academic_year: int,
+    semester: str
+) -> Optional[List[Conflict]]:
+    """Dry run of update_group_schedule: every conflict, nothing written"""
+    try:
+        prepared = _prepare_group_schedule(db, group_code, schedule_data, academic_year, semester)
+    except ValueError:
+        return None
+    if prepared is None:
+        return None
+    items, courses, _, replaced_ids = prepared
+    return _group_schedule_conflicts(db, group_code, items, courses, replaced_ids, academic_year, semester)
+
+
+def update_group_schedule(
+    db: Session,
+    group_code: str,
+    schedule_data: list,
+    academic_year: int,
+    semester: str
+) -> bool:
+    try:
+        prepared = _prepare_group_schedule(db, group_code, schedule_data, academic_year, semester)
+        if prepared is None:
+            return False
+        valid_schedule_data, courses, existing, replaced_ids = prepared
+
+        conflicts = _group_schedule_conflicts(
+            db, group_code, valid_schedule_data, courses, replaced_ids, academic_year, semester
+        )
+        if conflicts:
+            raise HTTPException(status_code=400, detail="; ".join(c.message for c in conflicts))
+
+        updates, inserts = [], []
+        for item in valid_schedule_data:
+            current = existing.get((item.course_id, item.day_of_week))
+            if current:
+                updates.append({"id": current.id, "start_time": item.start_time, "end_time": item.end_time})
+            else:
+                inserts.append({
+                    "course_id": item.course_id,
+                    "academic_year": academic_year,
+                    "semester": semester,
+                    "day_of_week": item.day_of_week,
+                    "start_time": item.start_time,
+                    "end_time": item.end_time,
+                    "is_active": True,
+                    "group_code": group_code
+                })
+
+        # Bulk upsert: one executemany each for changed and new rows
+        if updates:
+            db.execute(update(models.Schedule), updates)
+        if inserts:
+            db.execute(insert(models.Schedule), inserts)
+        db.commit()
+        return True
+    except HTTPException as http_exc:
+        db.rollback()
+        # re-raise without modification to preserve message but avoid nested status code
+        raise http_exc
+    except Exception as e:
+        db.rollback()
+        return False
+        
+
+
+def generate_group_timetable(
+    db: Session,
+    group_code: str,
+    academic_year: int,
+    semester: str,
+    days: Optional[List[str]] = None,
+    day_start: Optional[time] = None,
+    day_end: Optional[time] = None,
+    period_minutes: Optional[int] = None,
+    max_per_day: Optional[int] = None,
+    seed: int = 0,
+    time_budget: Optional[float] = None
+) -> dict:
+    """
+    A conflict-free week for the group: one session per course credit, on
+    the grid's free cells. The group's current rows for these courses are
+    ignored (the result replaces them); every other row of the group and
+    of its teachers this term is respected. Nothing is saved.
+    """
+    days = days or settings.TIMETABLE_DAYS.split(",")
+    day_start = day_start or settings.TIMETABLE_DAY_START
+    day_end = day_end or settings.TIMETABLE_DAY_END
+    period = timedelta(minutes=period_minutes or settings.TIMETABLE_PERIOD_MINUTES)
+    max_per_day = max_per_day or settings.TIMETABLE_MAX_PER_DAY
+    time_budget = time_budget if time_budget is not None else settings.TIMETABLE_TIME_BUDGET_SECONDS
+
+    course_ids = _group_course_ids(db, group_code) if group_code else set()
+    courses = db.query(models.Course).filter(models.Course.id.in_(course_ids)).order_by(models.Course.id).all()
+    schedulable = [c for c in courses if c.teacher_id]
+    if not schedulable:
+        raise HTTPException(status_code=400, detail="No courses with a teacher to schedule for this group")
+
+    periods = []
+    slot_start = datetime.combine(date.today(), day_start)
+    last_end = datetime.combine(date.today(), day_end)
+    while slot_start + period <= last_end:
+        periods.append((slot_start.time(), (slot_start + period).time()))
+        slot_start += period
+
+    replaced_ids = {
+        schedule_id for (schedule_id,) in db.query(models.Schedule.id).filter(
+            models.Schedule.group_code == group_code,
+            models.Schedule.academic_year == academic_year,
+            models.Schedule.semester == semester,
+            models.Schedule.course_id.in_([c.id for c in schedulable])
+        )
+    }
+    index = ConflictIndex.load(
+        db, academic_year, semester,
+        teacher_ids={c.teacher_id for c in schedulable},
+        group_codes=[group_code],
+        exclude_ids=replaced_ids
+    )
+
+    meetings, domains = [], []
+    for course in schedulable:
+        free = {
+            (d, p) for d, day in enumerate(days) for p, (start, end) in enumerate(periods)
+            if not index.conflicts_for(Slot(course.id, day, start, end, course.teacher_id, group_code))
+        }
+        for number in range(max(course.credits or 1, 1)):
+            meetings.append(Meeting(course.id, course.teacher_id, number))
+            domains.append(free)
+
+    result = TimetableSolver(meetings, domains, max_per_day, seed=seed, time_budget=time_budget).solve()
+    schedule = sorted((
+        {
+            "course_id": meeting.course_id,
+            "academic_year": academic_year,
+            "semester": semester,
+            "day_of_week": days[d],
+            "start_time": periods[p][0],
+            "end_time": periods[p][1],
+        }
+        for meeting, (d, p) in result.assignment.items()
+    ), key=lambda item: (item["day_of_week"], item["start_time"]))
+    return {
+        "group_code": group_code,
+        "status": result.status,
+        "schedule": schedule,
+        "unscheduled_courses": [c.id for c in courses if not c.teacher_id],
+        "meetings": len(meetings),
+        "nodes": result.nodes,
+        "elapsed_ms": round(result.elapsed * 1000, 1),
+    }
+
+
+def get_group_schedule(
+    db: Session,
+    group_code: str,
+    academic_year: int,
+    semester: str
+) -> list[models.Schedule]:
+    return db.query(models.Schedule).filter_by(
+        group_code=group_code,
+        academic_year=academic_year,
+        semester=semester
+    ).order_by(models.Schedule.day_of_week, models.Schedule.start_time).all()
+
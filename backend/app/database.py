@@ -1,20 +1,114 @@
-# backend/app/database.py
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-
-SQLALCHEMY_DATABASE_URL = "sqlite:///./database.db"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}  # Required for SQLite
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-Base = declarative_base()
+# backend/app/database.py
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+
+from .config import settings
+
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+
+
+def sqlite_pragmas(profile: str) -> list:
+    """Connect-time PRAGMAs for a SQLite profile ("wal" or "default")"""
+    pragmas = [f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}"]
+    if profile == "wal":
+        # Readers no longer block the writer, and commits skip most fsyncs
+        pragmas += [
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA synchronous=NORMAL",
+            f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+            f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}",
+        ]
+    return pragmas
+
+
+def _run_on_connect(engine: Engine, statements: list):
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.close()
+
+
+def make_engine(url: str, read_only: bool = False, sqlite_profile: str = None) -> Engine:
+    """Engine for `url` with the pool and SQLite settings from config"""
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False},  # Required for SQLite
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT
+        )
+        pragmas = sqlite_pragmas(sqlite_profile or settings.SQLITE_PROFILE)
+        if read_only:
+            pragmas.append("PRAGMA query_only=ON")
+        _run_on_connect(engine, pragmas)
+        return engine
+
+    engine = create_engine(
+        url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=True
+    )
+    if read_only:
+        _run_on_connect(engine, ["SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY"])
+    return engine
+
+
+# Async drivers for the same databases: aiosqlite and asyncpg
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def make_async_engine(url: str) -> AsyncEngine:
+    """Async engine for the same database as `url`, with the same pool and PRAGMAs"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    engine = create_async_engine(
+        url.set(drivername=ASYNC_DRIVERS[backend]),
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=backend != "sqlite"
+    )
+    if backend == "sqlite":
+        _run_on_connect(engine.sync_engine, sqlite_pragmas(settings.SQLITE_PROFILE))
+    return engine
+
+
+engine = make_engine(SQLALCHEMY_DATABASE_URL)
+# Reporting endpoints (/stats) read through this engine; without
+# DATABASE_READ_URL it is a read-only connection to the main database
+read_engine = make_engine(settings.DATABASE_READ_URL or SQLALCHEMY_DATABASE_URL, read_only=True)
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Async endpoints use this engine so queries do not block the event loop
+async_engine = make_async_engine(SQLALCHEMY_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+Base = declarative_base()
@@ -1,58 +1,87 @@
-
-#/backend/app/email_service.py
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from .config import settings
-import uuid
-
-def send_welcome_email(email: str, user_id: str, user_fullname: str, user_role: str):
-    # Generate password reset token (24h expiry)
-    reset_token = str(uuid.uuid4())
-    reset_link = f"http://127.0.0.1/reset-password?token={reset_token}"
-
-    # Email content
-    subject = "Welcome to Smart Campus"
-    body = f"""
-    <h2>Account Created Successfully</h2>
-    <p> Dear {user_fullname},</br> </p>
-    <p>Your account details:</p>
-    <ul>
-        <li>{user_role} ID: {user_id}</li>
-        <li>Temporary Password: 000000</li>
-    </ul>
-    <p>Please <a href="{reset_link}">reset your password</a> within 24 hours.</p>
-    """
-
-    # Create message
-    msg = MIMEMultipart()
-    msg['From'] = settings.EMAIL_FROM
-    msg['To'] = email
-    msg['Subject'] = subject
-    msg.attach(MIMEText(body, 'html'))
-
-    # Send email (using MailDev for development)
-    with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-        if settings.SMTP_USER and settings.SMTP_PASSWORD:
-            server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-        server.send_message(msg)
-
-
-
-def send_password_reset_email(email: str, reset_link: str):
-    subject = "Password Reset Request"
-    body = f"""
-    <h2>Password Reset</h2>
-    <p>You requested a password reset. This link will expire in 24 hours.</p>
-    <p><a href="{reset_link}">Reset Password</a></p>
-    <p>If you didn't request this, please ignore this email.</p>
-    """
-    
-    msg = MIMEMultipart()
-    msg['From'] = settings.EMAIL_FROM
-    msg['To'] = email
-    msg['Subject'] = subject
-    msg.attach(MIMEText(body, 'html'))
-    
-    with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-        server.send_message(msg)
\ No newline at end of file
+#/backend/app/email_service.py
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from string import Template
+from sqlalchemy.orm import Session
+from . import models
+from .config import settings
+import uuid
+
+# Templates are parsed once at import; each message only substitutes values.
+WELCOME_SUBJECT = "Welcome to Smart Campus"
+WELCOME_TEMPLATE = Template("""
+    <h2>Account Created Successfully</h2>
+    <p> Dear $user_fullname,</br> </p>
+    <p>Your account details:</p>
+    <ul>
+        <li>$user_role ID: $user_id</li>
+        <li>Temporary Password: 000000</li>
+    </ul>
+    <p>Please <a href="$reset_link">reset your password</a> within 24 hours.</p>
+    """)
+
+PASSWORD_RESET_SUBJECT = "Password Reset Request"
+PASSWORD_RESET_TEMPLATE = Template("""
+    <h2>Password Reset</h2>
+    <p>You requested a password reset. This link will expire in 24 hours.</p>
+    <p><a href="$reset_link">Reset Password</a></p>
+    <p>If you didn't request this, please ignore this email.</p>
+    """)
+
+
+def build_message(recipient: str, subject: str, body_html: str) -> MIMEMultipart:
+    msg = MIMEMultipart()
+    msg['From'] = settings.EMAIL_FROM
+    msg['To'] = recipient
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body_html, 'html'))
+    return msg
+
+
+def queue_email(db: Session, recipient: str, subject: str, body_html: str) -> models.EmailOutbox:
+    """Add a message to the outbox; it is sent once the caller commits"""
+    message = models.EmailOutbox(recipient=recipient, subject=subject, body_html=body_html)
+    db.add(message)
+    return message
+
+
+def queue_welcome_email(db: Session, email: str, user_id: str, user_fullname: str, user_role: str):
+    # Generate password reset token (24h expiry)
+    reset_token = str(uuid.uuid4())
+    reset_link = f"http://127.0.0.1/reset-password?token={reset_token}"
+    body = WELCOME_TEMPLATE.substitute(
+        user_fullname=user_fullname,
+        user_role=user_role,
+        user_id=user_id,
+        reset_link=reset_link
+    )
+    return queue_email(db, email, WELCOME_SUBJECT, body)
+
+
+def queue_password_reset_email(db: Session, email: str, reset_link: str):
+    body = PASSWORD_RESET_TEMPLATE.substitute(reset_link=reset_link)
+    return queue_email(db, email, PASSWORD_RESET_SUBJECT, body)
+
+
+def _queue_and_commit(queue_fn, **kwargs):
+    from .database import SessionLocal
+    from .outbox import outbox_sender
+    db = SessionLocal()
+    try:
+        queue_fn(db, **kwargs)
+        db.commit()
+    finally:
+        db.close()
+    outbox_sender.notify()
+
+
+def send_welcome_email(email: str, user_id: str, user_fullname: str, user_role: str):
+    """Queue a welcome email in its own transaction (for callers without a session)"""
+    _queue_and_commit(
+        queue_welcome_email,
+        email=email, user_id=user_id, user_fullname=user_fullname, user_role=user_role
+    )
+
+
+def send_password_reset_email(email: str, reset_link: str):
+    _queue_and_commit(queue_password_reset_email, email=email, reset_link=reset_link)
@@ -0,0 +1,161 @@
+#/backend/app/embedding_backfill.py
+"""
+Background backfill of missing or stale face embeddings.
+
+Finds users with an image but no embedding (or one produced by a
+different model), embeds them in batches on the inference pool and
+commits each batch, so an interrupted run simply resumes with whatever
+is still missing. Users that fail are recorded in `embedding_failures`
+and skipped by later runs unless `retry_failed` is set.
+
+    python -m app.embedding_backfill --batch-size 64
+"""
+import argparse
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal
+from .embeddings import EMBEDDING_MODEL, set_user_embedding
+from .face_index import face_index
+from .face_pipeline import FaceAnalysis, compute_faces, record_inference
+from .inference_pool import inference_pool
+
+
+def needs_embedding_clause():
+    """Users with a stored image whose embedding is missing or stale"""
+    return models.User.image_path.isnot(None) & or_(
+        models.User.face_embedding_blob.is_(None) & models.User.face_embedding.is_(None),
+        models.User.face_embedding_model.isnot(None) & (models.User.face_embedding_model != EMBEDDING_MODEL)
+    )
+
+
+def pending_query(db: Session, retry_failed: bool = False):
+    query = db.query(models.User).filter(needs_embedding_clause())
+    if not retry_failed:
+        failed_ids = db.query(models.EmbeddingFailure.user_id)
+        query = query.filter(models.User.id.notin_(failed_ids))
+    return query
+
+
+class BackfillJob:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.state = {
+            "running": False,
+            "started_at": None,
+            "finished_at": None,
+            "processed": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "last_user_id": None,
+            "error": None,
+        }
+
+    def run(self, batch_size: int = 64, retry_failed: bool = False, worker_batch: int = 8):
+        """Blocking run; returns the final state"""
+        self.state.update(
+            running=True, started_at=datetime.now().isoformat(), finished_at=None,
+            processed=0, succeeded=0, failed=0, last_user_id=None, error=None
+        )
+        last_id = ""
+        try:
+            while True:
+                db = SessionLocal()
+                try:
+                    users = pending_query(db, retry_failed).filter(
+                        models.User.id > last_id
+                    ).order_by(models.User.id).limit(batch_size).all()
+                    if not users:
+                        break
+                    last_id = users[-1].id
+                    self._process_batch(db, users, worker_batch)
+                finally:
+                    db.close()
+                self.state["last_user_id"] = last_id
+                print(f"[BACKFILL] {self.state['processed']} processed, "
+                      f"{self.state['succeeded']} embedded, {self.state['failed']} failed")
+        except Exception as e:
+            self.state["error"] = str(e)
+            raise
+        finally:
+            self.state["running"] = False
+            self.state["finished_at"] = datetime.now().isoformat()
+        return dict(self.state)
+
+    def _process_batch(self, db: Session, users, worker_batch: int):
+        paths = [user.image_path for user in users]
+        batches = [paths[i:i + worker_batch] for i in range(0, len(paths), worker_batch)]
+        analyses = [a for batch in inference_pool.map_batches(compute_faces, batches) for a in batch]
+
+        embedded = []
+        for user, analysis in zip(users, analyses):
+            failure = db.get(models.EmbeddingFailure, user.id)
+            if isinstance(analysis, FaceAnalysis):
+                record_inference(analysis.inference_seconds)
+                set_user_embedding(user, analysis.embedding, EMBEDDING_MODEL)
+                if failure:
+                    db.delete(failure)
+                embedded.append((user.id, analysis.embedding))
+            elif failure:
+                failure.error = analysis
+                failure.attempts += 1
+                failure.last_attempt = datetime.now()
+            else:
+                db.add(models.EmbeddingFailure(user_id=user.id, error=analysis))
+        db.commit()
+
+        for user_id, embedding in embedded:
+            face_index.add(user_id, embedding)
+        self.state["processed"] += len(users)
+        self.state["succeeded"] += len(embedded)
+        self.state["failed"] += len(users) - len(embedded)
+
+    def start(self, **kwargs) -> bool:
+        """Run in a daemon thread; False if a run is already in progress"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._thread = threading.Thread(target=self.run, kwargs=kwargs, daemon=True)
+            self._thread.start()
+            return True
+
+    def status(self, db: Session) -> dict:
+        return {
+            **self.state,
+            "pending": pending_query(db).count(),
+            "recorded_failures": db.query(models.EmbeddingFailure).count(),
+        }
+
+
+backfill_job = BackfillJob()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute missing or stale face embeddings")
+    parser.add_argument("--batch-size", type=int, default=64, help="users per commit")
+    parser.add_argument("--retry-failed", action="store_true", help="retry users that failed before")
+    args = parser.parse_args()
+
+    from .database import Base, engine
+    from .migrations import add_missing_columns
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+
+    start = time.perf_counter()
+    try:
+        state = backfill_job.run(batch_size=args.batch_size, retry_failed=args.retry_failed)
+    finally:
+        inference_pool.shutdown()
+    print(f"Embedded {state['succeeded']} of {state['processed']} users "
+          f"in {time.perf_counter() - start:.1f}s ({state['failed']} failed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#/backend/app/embedding_cache.py
+"""
+Cache of face analyses keyed by the uploaded image content.
+
+Exact copies are found by SHA-256 of the image bytes. Optionally
+(EMBEDDING_CACHE_PHASH_DISTANCE >= 0, off by default), re-encoded or
+resized copies are found by a 64-bit perceptual hash (dHash) within a
+small Hamming distance; such a hit is another image's analysis, which
+for registration can store the wrong embedding or flag a new person as
+a duplicate. Recent entries live in an in-memory LRU; entries
+evicted from it spill to files on disk, which are pruned oldest-first.
+
+get() and put() may read, write and prune those files while holding the
+cache lock: call them from a thread, not on the event loop.
+"""
+import hashlib
+import json
+import os
+import struct
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from .config import settings
+from .embeddings import EMBEDDING_MODEL
+from .face_pipeline import FaceAnalysis
+
+
+class CacheKeys(NamedTuple):
+    digest: str
+    phash: Optional[int]
+
+
+def perceptual_hash(data: bytes) -> Optional[int]:
+    """64-bit difference hash of the image, stable across re-encoding and resizing"""
+    import cv2
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        return None
+    small = cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+class EmbeddingCache:
+    def __init__(self, max_entries: int, disk_dir: Optional[str], max_disk_entries: int,
+                 phash_distance: int):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self.phash_distance = phash_distance
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, FaceAnalysis]" = OrderedDict()
+        self._phashes = {}  # digest -> phash for memory and disk entries
+        self._disk_scanned = False
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "perceptual_hits": 0, "misses": 0}
+
+    def keys_for(self, data: bytes) -> CacheKeys:
+        digest = hashlib.sha256(EMBEDDING_MODEL.encode() + b"\0" + data).hexdigest()
+        phash = perceptual_hash(data) if self.phash_distance >= 0 else None
+        return CacheKeys(digest, phash)
+
+    # ---- disk spill -------------------------------------------------
+
+    def _disk_path(self, digest: str, phash: Optional[int]) -> str:
+        suffix = f"{phash:016x}" if phash is not None else "none"
+        return os.path.join(self.disk_dir, f"{digest}_{suffix}.emb")
+
+    def _scan_disk(self):
+        """Rebuild the phash index from file names (no file reads)"""
+        if self._disk_scanned or not self.disk_dir:
+            return
+        os.makedirs(self.disk_dir, exist_ok=True)
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".emb"):
+                digest, _, suffix = name[:-4].partition("_")
+                self._phashes.setdefault(digest, None if suffix == "none" else int(suffix, 16))
+        self._disk_scanned = True
+
+    def _write_disk(self, digest: str, analysis: FaceAnalysis):
+        meta = json.dumps({
+            "facial_area": analysis.facial_area,
+            "confidence": analysis.confidence,
+            "inference_seconds": analysis.inference_seconds,
+        }).encode()
+        vector = np.asarray(analysis.embedding, dtype="<f4").tobytes()
+        path = self._disk_path(digest, self._phashes.get(digest))
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(struct.pack("<I", len(meta)) + meta + vector)
+        os.replace(f"{path}.tmp", path)
+
+    def _read_disk(self, digest: str) -> Optional[FaceAnalysis]:
+        path = self._disk_path(digest, self._phashes.get(digest))
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        (meta_len,) = struct.unpack_from("<I", data)
+        meta = json.loads(data[4:4 + meta_len])
+        embedding = np.frombuffer(data[4 + meta_len:], dtype="<f4").tolist()
+        os.utime(path)  # keep recently used files from being pruned
+        return FaceAnalysis(embedding, meta["facial_area"], meta["confidence"], meta["inference_seconds"])
+
+    def _prune_disk(self):
+        files = [os.path.join(self.disk_dir, n) for n in os.listdir(self.disk_dir) if n.endswith(".emb")]
+        if len(files) <= self.max_disk_entries:
+            return
+        files.sort(key=os.path.getmtime)
+        # Prune down to 90% so this does not run on every spill
+        for path in files[:len(files) - int(self.max_disk_entries * 0.9)]:
+            digest = os.path.basename(path).partition("_")[0]
+            if digest not in self._memory:
+                self._phashes.pop(digest, None)
+            os.remove(path)
+
+    # ---- lookups ----------------------------------------------------
+
+    def _lookup(self, digest: str) -> Optional[FaceAnalysis]:
+        analysis = self._memory.get(digest)
+        if analysis is not None:
+            self._memory.move_to_end(digest)
+            self.counters["memory_hits"] += 1
+            return analysis
+        if self.disk_dir and digest in self._phashes:
+            analysis = self._read_disk(digest)
+            if analysis is not None:
+                self.counters["disk_hits"] += 1
+                self._remember(digest, analysis)
+                return analysis
+        return None
+
+    def _nearest_by_phash(self, phash: int) -> Optional[str]:
+        candidates = [(d, p) for d, p in self._phashes.items() if p is not None]
+        if not candidates:
+            return None
+        hashes = np.array([p for _, p in candidates], dtype=np.uint64)
+        distances = np.unpackbits(
+            (hashes ^ np.uint64(phash)).view(np.uint8).reshape(-1, 8), axis=1
+        ).sum(axis=1)
+        best = int(np.argmin(distances))
+        if distances[best] <= self.phash_distance:
+            return candidates[best][0]
+        return None
+
+    def _remember(self, digest: str, analysis: FaceAnalysis):
+        self._memory[digest] = analysis
+        self._memory.move_to_end(digest)
+        while len(self._memory) > self.max_entries:
+            evicted, evicted_analysis = self._memory.popitem(last=False)
+            if self.disk_dir:
+                self._write_disk(evicted, evicted_analysis)
+            else:
+                self._phashes.pop(evicted, None)
+
+    def get(self, keys: CacheKeys) -> Optional[FaceAnalysis]:
+        with self._lock:
+            self._scan_disk()
+            analysis = self._lookup(keys.digest)
+            if analysis is None and keys.phash is not None:
+                near = self._nearest_by_phash(keys.phash)
+                if near is not None:
+                    analysis = self._lookup(near)
+                    if analysis is not None:
+                        self.counters["perceptual_hits"] += 1
+            if analysis is None:
+                self.counters["misses"] += 1
+            return analysis
+
+    def put(self, keys: CacheKeys, analysis: FaceAnalysis):
+        with self._lock:
+            self._scan_disk()
+            self._phashes[keys.digest] = keys.phash
+            self._remember(keys.digest, analysis)
+            if self.disk_dir and len(self._phashes) > self.max_disk_entries + self.max_entries:
+                self._prune_disk()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            lookups = hits + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "known_entries": len(self._phashes),
+            }
+
+
+embedding_cache = EmbeddingCache(
+    max_entries=settings.EMBEDDING_CACHE_SIZE,
+    disk_dir=settings.EMBEDDING_CACHE_DIR or None,
+    max_disk_entries=settings.EMBEDDING_CACHE_DISK_SIZE,
+    phash_distance=settings.EMBEDDING_CACHE_PHASH_DISTANCE
+)
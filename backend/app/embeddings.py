@@ -0,0 +1,77 @@
+#/backend/app/embeddings.py
+import json
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+from . import models
+
+EMBEDDING_MODEL = "VGG-Face"
+EMBEDDING_DTYPE = np.dtype("<f4")  # little-endian float32
+
+
+def to_blob(embedding) -> bytes:
+    """Pack an embedding as raw little-endian float32 bytes"""
+    return np.asarray(embedding, dtype=EMBEDDING_DTYPE).ravel().tobytes()
+
+
+def from_blob(blob: bytes, dim: Optional[int] = None) -> np.ndarray:
+    """Read a packed embedding straight into NumPy without copying"""
+    vector = np.frombuffer(blob, dtype=EMBEDDING_DTYPE)
+    if dim is not None and vector.shape[0] != dim:
+        raise ValueError(f"Stored embedding has {vector.shape[0]} values, expected {dim}")
+    return vector
+
+
+def decode_embedding(blob: Optional[bytes], dim: Optional[int], legacy_json: Optional[str]) -> Optional[np.ndarray]:
+    """Decode whichever format a row has: binary first, then legacy JSON"""
+    if blob:
+        return from_blob(blob, dim)
+    if legacy_json:
+        return np.asarray(json.loads(legacy_json), dtype=np.float32)
+    return None
+
+
+def set_user_embedding(user: models.User, embedding, model_name: str = EMBEDDING_MODEL):
+    """
+    Store an embedding on a user in the binary format. The updated_at stamp
+    moves only when the vector or its model changes: re-encoding a legacy
+    JSON row must not send every worker's face index to re-read it.
+    """
+    vector = np.asarray(embedding, dtype=EMBEDDING_DTYPE).ravel()
+    try:
+        previous = get_user_embedding(user)
+    except ValueError:
+        previous = None
+    changed = (
+        previous is None
+        or (user.face_embedding_model or EMBEDDING_MODEL) != model_name  # legacy JSON rows are VGG-Face
+        or not np.array_equal(np.asarray(previous, dtype=EMBEDDING_DTYPE), vector)
+    )
+    user.face_embedding_blob = vector.tobytes()
+    user.face_embedding_model = model_name
+    user.face_embedding_dim = int(vector.shape[0])
+    user.face_embedding = None
+    if changed:
+        user.face_embedding_updated_at = datetime.now()
+
+
+def get_user_embedding(user: models.User) -> Optional[np.ndarray]:
+    return decode_embedding(
+        user.face_embedding_blob,
+        user.face_embedding_dim,
+        user.face_embedding
+    )
+
+
+def has_embedding_clause():
+    """SQL filter for users that have an embedding in either format"""
+    return (models.User.face_embedding_blob.isnot(None)) | (models.User.face_embedding.isnot(None))
+
+
+def current_embedding_clause():
+    """Users with an embedding from the current model (legacy JSON rows are VGG-Face)"""
+    return has_embedding_clause() & (
+        models.User.face_embedding_model.is_(None) | (models.User.face_embedding_model == EMBEDDING_MODEL)
+    )
@@ -0,0 +1,188 @@
+#/backend/app/enrollment_rollup.py
+"""
+Monthly enrollment rollup (the enrollment_monthly table).
+
+Every enrollment insert or delete made through the ORM adjusts the row of
+its (year, month, department, course) in the same transaction: flushed
+objects are upserted after the flush, bulk session.execute(insert(...))
+statements just before they run. Trend queries then read O(months) rows
+instead of scanning enrollments.
+
+backfill() rebuilds the table from enrollments in one statement; run it
+after raw-SQL imports or bulk deletes:
+    python -m app.migrations rollup
+"""
+from collections import Counter
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Integer, bindparam, cast, delete, event, extract, func, select, text, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import engine as default_engine
+
+GRANULARITIES = {"month": 1, "quarter": 3, "year": 12}
+
+# (year, month, course_id) -> enrollments added (negative: removed)
+RollupKey = Tuple[int, int, str]
+
+_DIALECT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def rollup_key(enrollment_date: Optional[datetime], course_id: str) -> RollupKey:
+    when = enrollment_date or datetime.now()  # the column default
+    return when.year, when.month, course_id
+
+
+def apply_counts(conn: Connection, counts: Counter):
+    """Upsert `counts` into enrollment_monthly on `conn`, inside its transaction"""
+    rows = [
+        {"y": year, "m": month, "c": course_id, "n": n}
+        for (year, month, course_id), n in counts.items() if n and course_id is not None
+    ]
+    if not rows:
+        return
+    table = models.EnrollmentMonthly.__table__
+    department = select(func.coalesce(models.Course.department_code, "")).where(
+        models.Course.id == bindparam("c")
+    ).scalar_subquery()
+    stmt = _DIALECT_INSERTS[conn.dialect.name](table).values(
+        year=bindparam("y"), month=bindparam("m"), course_id=bindparam("c"), count=bindparam("n"),
+        department_code=func.coalesce(department, "")
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.year, table.c.month, table.c.department_code, table.c.course_id],
+        set_={"count": table.c.count + stmt.excluded.count}
+    )
+    conn.execute(stmt, rows)
+
+
+def backfill(engine: Engine = default_engine) -> int:
+    """Rebuild enrollment_monthly from enrollments; returns the number of rollup rows"""
+    enrollment, course = models.Enrollment, models.Course
+    year = cast(extract("year", enrollment.enrollment_date), Integer)
+    month = cast(extract("month", enrollment.enrollment_date), Integer)
+    department = func.coalesce(course.department_code, "")
+    aggregated = select(
+        year, month, department, enrollment.course_id, func.count(enrollment.id)
+    ).select_from(enrollment).outerjoin(
+        course, enrollment.course_id == course.id
+    ).where(
+        enrollment.enrollment_date.isnot(None), enrollment.course_id.isnot(None)
+    ).group_by(year, month, department, enrollment.course_id)
+    table = models.EnrollmentMonthly.__table__
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Hold off enrollment writes until the new rollup is in place
+            conn.execute(text("LOCK TABLE enrollments IN SHARE MODE"))
+        conn.execute(delete(table))
+        conn.execute(table.insert().from_select(
+            ["year", "month", "department_code", "course_id", "count"], aggregated
+        ))
+        rows = conn.execute(select(func.count()).select_from(table)).scalar()
+    print(f"[ROLLUP] Rebuilt enrollment_monthly: {rows} rows")
+    return rows
+
+
+def needs_backfill(db: Session) -> bool:
+    """Enrollments exist but the rollup is empty (first start after upgrading)"""
+    has_rollup = db.query(models.EnrollmentMonthly.year).limit(1).first() is not None
+    return not has_rollup and db.query(models.Enrollment.id).limit(1).first() is not None
+
+
+def _period_index(year: int, month: int) -> int:
+    return year * 12 + month - 1
+
+
+def _period_label(index: int, granularity: str) -> str:
+    year, month = divmod(index, 12)
+    if granularity == "year":
+        return f"{year}"
+    if granularity == "quarter":
+        return f"{year}-Q{month // 3 + 1}"
+    return f"{year}-{month + 1:02d}"
+
+
+def get_trend(
+    db: Session,
+    start: date,
+    end: date,
+    granularity: str = "month",
+    department_code: Optional[str] = None,
+    course_id: Optional[str] = None
+) -> List[dict]:
+    """
+    Enrollments per month, quarter or year from `start` to `end`
+    (inclusive, by month), with empty periods as 0.
+    """
+    step = GRANULARITIES[granularity]
+    first, last = _period_index(start.year, start.month), _period_index(end.year, end.month)
+    first -= first % step  # align to the start of the quarter/year
+    rollup = models.EnrollmentMonthly
+    # (year, month) comparisons so the primary key serves the range
+    query = db.query(rollup.year, rollup.month, func.sum(rollup.count)).filter(
+        tuple_(rollup.year, rollup.month) >= (first // 12, first % 12 + 1),
+        tuple_(rollup.year, rollup.month) <= (last // 12, last % 12 + 1)
+    )
+    if department_code:
+        query = query.filter(rollup.department_code == department_code)
+    if course_id:
+        query = query.filter(rollup.course_id == course_id)
+    totals = Counter()
+    for year, month, count in query.group_by(rollup.year, rollup.month):
+        index = _period_index(year, month)
+        totals[index - (index - first) % step] += count
+    return [
+        {"period": _period_label(index, granularity), "count": totals[index]}
+        for index in range(first, last + 1, step)
+    ]
+
+
+# --- Maintenance from ORM writes ---------------------------------------------------------
+
+def _pending(session: Session) -> Counter:
+    return session.info.setdefault("rollup_counts", Counter())
+
+
+@event.listens_for(models.Enrollment, "after_insert")
+def _enrollment_inserted(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        _pending(session)[rollup_key(target.enrollment_date, target.course_id)] += 1
+
+
+@event.listens_for(models.Enrollment, "after_delete")
+def _enrollment_deleted(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        _pending(session)[rollup_key(target.enrollment_date, target.course_id)] -= 1
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_after_flush(session, flush_context):
+    counts = session.info.pop("rollup_counts", None)
+    if counts:
+        apply_counts(session.connection(), counts)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("rollup_counts", None)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bulk_insert(orm_execute_state):
+    """session.execute(insert(models.Enrollment), rows) skips the mapper events"""
+    if not orm_execute_state.is_insert:
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if getattr(table, "name", None) != models.Enrollment.__tablename__:
+        return
+    rows = orm_execute_state.parameters
+    rows = rows if isinstance(rows, list) else [rows] if rows else []
+    apply_counts(orm_execute_state.session.connection(), Counter(
+        rollup_key(row.get("enrollment_date"), row.get("course_id")) for row in rows
+    ))
@@ -0,0 +1,153 @@
+#/backend/app/exports.py
+"""
+Keyset pagination and streaming exports for rosters, enrollments and
+schedules.
+
+Pages are ordered by primary key and continue from the last key of the
+previous page (`WHERE id > :after ORDER BY id LIMIT n`), so every page
+costs the same index range scan however deep the client has paged, and
+rows inserted or deleted meanwhile never shift later pages.
+
+Exports write CSV or NDJSON while the rows are fetched: the query runs
+with yield_per (a server-side cursor on Postgres), and the output is
+sent in chunks of about EXPORT_CHUNK_BYTES, so memory stays the same for
+50 rows or 500,000.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime, time
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Query, Session, sessionmaker
+
+from . import models
+from .config import settings
+from .database import ReadSessionLocal
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def keyset_page(query: Query, key, after: Optional[str], limit: int) -> Tuple[list, Optional[str]]:
+    """
+    Up to `limit` rows of `query` with `key` greater than `after`, in key
+    order, and the cursor for the next page (None on the last page).
+    """
+    if after:
+        query = query.filter(key > after)
+    # One extra row tells whether another page exists without a COUNT
+    rows = query.order_by(key).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, str(getattr(rows[-1], key.key))
+
+
+def student_roster(db: Session, department: Optional[str], year: Optional[str] = None) -> Query:
+    """Students of `department` whose id contains `year` ("-1" or None: any year)"""
+    students = db.query(
+        models.User.id,
+        models.User.full_name,
+        models.User.email,
+        models.User.department_code
+    ).filter(
+        models.User.role == "student",
+        models.User.department_code == department
+    )
+    if year and year != "-1":
+        students = students.filter(models.User.id.ilike(f"%{year}%"))
+    return students
+
+
+def enrollment_rows(db: Session, course_id: Optional[str] = None, department: Optional[str] = None) -> Query:
+    """Enrollments with student and course names; `department` is the course's"""
+    enrollments = db.query(
+        models.Enrollment.id,
+        models.Enrollment.student_id,
+        models.User.full_name.label("student_name"),
+        models.Enrollment.course_id,
+        models.Course.name.label("course_name"),
+        models.Course.department_code,
+        models.Enrollment.enrollment_date
+    ).join(
+        models.User, models.Enrollment.student_id == models.User.id
+    ).join(
+        models.Course, models.Enrollment.course_id == models.Course.id
+    )
+    if course_id:
+        enrollments = enrollments.filter(models.Enrollment.course_id == course_id)
+    if department:
+        enrollments = enrollments.filter(models.Course.department_code == department)
+    return enrollments
+
+
+def schedule_rows(
+    db: Session,
+    academic_year: Optional[int] = None,
+    semester: Optional[str] = None,
+    department: Optional[str] = None
+) -> Query:
+    """Schedule entries with course names; `department` is the course's"""
+    schedules = db.query(
+        models.Schedule.id,
+        models.Schedule.course_id,
+        models.Course.name.label("course_name"),
+        models.Course.department_code,
+        models.Schedule.group_code,
+        models.Schedule.academic_year,
+        models.Schedule.semester,
+        models.Schedule.day_of_week,
+        models.Schedule.start_time,
+        models.Schedule.end_time,
+        models.Schedule.is_active
+    ).join(models.Course, models.Schedule.course_id == models.Course.id)
+    if academic_year is not None:
+        schedules = schedules.filter(models.Schedule.academic_year == academic_year)
+    if semester:
+        schedules = schedules.filter(models.Schedule.semester == semester)
+    if department:
+        schedules = schedules.filter(models.Course.department_code == department)
+    return schedules
+
+
+def _plain(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    return value
+
+
+def stream_rows(
+    build: Callable[[Session], Query],
+    key,
+    fmt: str = "csv",
+    session_factory: sessionmaker = ReadSessionLocal,
+    yield_per: int = settings.EXPORT_YIELD_PER,
+    chunk_bytes: int = settings.EXPORT_CHUNK_BYTES
+) -> Iterator[str]:
+    """
+    The rows of `build(session)` ordered by `key`, as CSV (with a header
+    line) or NDJSON text chunks. Opens its own session: the generator runs
+    after the endpoint has returned, while the response is being sent.
+    """
+    db = session_factory()
+    try:
+        query = build(db).order_by(key)
+        columns: List[str] = [column["name"] for column in query.column_descriptions]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if fmt == "csv" else None
+        if writer:
+            writer.writerow(columns)
+        for row in query.execution_options(yield_per=yield_per):
+            if writer:
+                writer.writerow([_plain(value) for value in row])
+            else:
+                buffer.write(json.dumps(dict(zip(columns, map(_plain, row)))))
+                buffer.write("\n")
+            if buffer.tell() >= chunk_bytes:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db.close()
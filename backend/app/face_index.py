@@ -0,0 +1,288 @@
+#/backend/app/face_index.py
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .embeddings import current_embedding_clause, decode_embedding
+
+# refresh() re-reads embeddings stamped this long before the newest one it
+# has seen: a registration is stamped before its transaction commits
+REFRESH_OVERLAP = timedelta(seconds=30)
+
+
+class FaceIndex:
+    """
+    In-memory index of every stored face embedding.
+
+    All vectors live in one L2-normalized float32 matrix, so a nearest
+    neighbour lookup is a single matrix-vector product instead of a
+    Python loop over users.
+
+    Every API worker has its own copy. refresh() picks up embeddings other
+    workers stored, replaced or moved to another model since the last load,
+    by face_embedding_updated_at. Deleted users leave no stamp; refresh()
+    drops them by checking every indexed id against the users table each
+    FACE_INDEX_RECONCILE_SECONDS.
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        self._lock = threading.RLock()
+        self._initial_capacity = initial_capacity
+        self._matrix: Optional[np.ndarray] = None
+        self._ids: List[str] = []
+        self._positions = {}
+        self._size = 0
+        self.loaded = False
+        self.source = None  # ANN index this one is the delta of, if any
+        self._watermark: Optional[datetime] = None  # newest face_embedding_updated_at read
+        self._versions: Dict[str, datetime] = {}  # updated_at of embeddings read by refresh()
+        self._reconciled_at = 0.0  # time.monotonic() of the last full id check
+
+    def __len__(self):
+        return self._size
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            raise ValueError("Cannot index an all-zero embedding")
+        return vector / norm
+
+    def _ensure_capacity(self, dim: int, needed: int):
+        if self._matrix is None:
+            capacity = max(self._initial_capacity, needed)
+            self._matrix = np.empty((capacity, dim), dtype=np.float32)
+            return
+        if self._matrix.shape[1] != dim:
+            raise ValueError(
+                f"Embedding dimension {dim} does not match index dimension {self._matrix.shape[1]}"
+            )
+        if needed > self._matrix.shape[0]:
+            capacity = max(needed, self._matrix.shape[0] * 2)
+            grown = np.empty((capacity, dim), dtype=np.float32)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+
+    def add(self, user_id: str, embedding):
+        """Insert or replace a single user's embedding"""
+        vector = self._normalize(embedding)
+        with self._lock:
+            position = self._positions.get(user_id)
+            if position is not None:
+                self._matrix[position] = vector
+                return
+            self._ensure_capacity(vector.shape[0], self._size + 1)
+            self._matrix[self._size] = vector
+            self._positions[user_id] = self._size
+            self._ids.append(user_id)
+            self._size += 1
+
+    def remove(self, user_id: str):
+        with self._lock:
+            position = self._positions.pop(user_id, None)
+            if position is None:
+                return
+            last = self._size - 1
+            if position != last:
+                # Move the last row into the hole to keep the matrix dense
+                self._matrix[position] = self._matrix[last]
+                moved_id = self._ids[last]
+                self._ids[position] = moved_id
+                self._positions[moved_id] = position
+            self._ids.pop()
+            self._size -= 1
+
+    def load(self, rows: Iterable[Tuple[str, object]]):
+        """Replace the whole index with (user_id, embedding) rows"""
+        ids = []
+        vectors = []
+        for user_id, embedding in rows:
+            try:
+                vectors.append(self._normalize(embedding))
+                ids.append(user_id)
+            except (TypeError, ValueError):
+                continue
+
+        with self._lock:
+            self._matrix = None
+            self._ids = []
+            self._positions = {}
+            self._size = 0
+            if vectors:
+                matrix = np.vstack(vectors).astype(np.float32, copy=False)
+                self._ensure_capacity(matrix.shape[1], matrix.shape[0])
+                self._matrix[:matrix.shape[0]] = matrix
+                self._ids = ids
+                self._positions = {user_id: i for i, user_id in enumerate(ids)}
+                self._size = len(ids)
+            self.loaded = True
+
+    def rebuild_from_db(self, db: Session, exclude: Optional[Set[str]] = None):
+        """
+        Reload stored embeddings from the users table.
+
+        Users in `exclude` (e.g. already covered by the ANN index file)
+        are skipped without reading their embeddings.
+        """
+        columns = (
+            models.User.id,
+            models.User.face_embedding_blob,
+            models.User.face_embedding_dim,
+            models.User.face_embedding
+        )
+        has_embedding = current_embedding_clause()
+        # Taken before reading, so anything stored during the load is refreshed later
+        watermark = db.query(func.max(models.User.face_embedding_updated_at)).scalar()
+
+        if exclude:
+            wanted = [
+                user_id for (user_id,) in db.query(models.User.id).filter(has_embedding)
+                if user_id not in exclude
+            ]
+            rows = []
+            for start in range(0, len(wanted), 500):
+                rows.extend(db.query(*columns).filter(models.User.id.in_(wanted[start:start + 500])))
+        else:
+            rows = db.query(*columns).filter(has_embedding).yield_per(1000)
+
+        self.load(
+            (user_id, decode_embedding(blob, dim, legacy_json))
+            for user_id, blob, dim, legacy_json in rows
+        )
+        self._watermark = watermark
+        self._versions = {}
+        self._reconciled_at = time.monotonic()
+
+    def refresh(self, db: Session):
+        """
+        Apply embedding changes since the last load or refresh, e.g. users
+        registered on another worker: new and replaced embeddings are
+        added, and users whose embedding was cleared or is from another
+        model are removed. Costs one indexed range query when nothing
+        changed, plus the periodic reconcile().
+        """
+        if time.monotonic() - self._reconciled_at >= settings.FACE_INDEX_RECONCILE_SECONDS:
+            self.reconcile(db)
+        updated_at = models.User.face_embedding_updated_at
+        changed = db.query(models.User.id, updated_at).filter(updated_at.isnot(None))
+        if self._watermark is not None:
+            changed = changed.filter(updated_at >= self._watermark - REFRESH_OVERLAP)
+        changed = [
+            (user_id, stamp) for user_id, stamp in changed
+            if self._versions.get(user_id) != stamp
+        ]
+        if not changed:
+            return
+        stamps = dict(changed)
+        rows = []
+        for start in range(0, len(changed), 500):
+            rows.extend(db.query(
+                models.User.id,
+                models.User.face_embedding_blob,
+                models.User.face_embedding_dim,
+                models.User.face_embedding
+            ).filter(
+                models.User.id.in_([user_id for user_id, _ in changed[start:start + 500]]),
+                current_embedding_clause()
+            ))
+        with self._lock:
+            current = set()
+            for user_id, blob, dim, legacy_json in rows:
+                try:
+                    self.add(user_id, decode_embedding(blob, dim, legacy_json))
+                    current.add(user_id)
+                except (TypeError, ValueError):
+                    continue
+            for user_id in stamps.keys() - current:
+                self.remove(user_id)
+            self._versions.update(stamps)
+            newest = max(stamps.values())
+            if self._watermark is None or newest > self._watermark:
+                self._watermark = newest
+            # Stamps older than the overlap are never read again
+            horizon = self._watermark - REFRESH_OVERLAP
+            self._versions = {k: v for k, v in self._versions.items() if v >= horizon}
+
+    def reconcile(self, db: Session):
+        """Remove indexed users that were deleted or no longer have a current embedding"""
+        current = {user_id for (user_id,) in db.query(models.User.id).filter(current_embedding_clause())}
+        with self._lock:
+            for user_id in [user_id for user_id in self._ids if user_id not in current]:
+                self.remove(user_id)
+                # Committed after the id query: the next refresh adds it back
+                self._versions.pop(user_id, None)
+            self._reconciled_at = time.monotonic()
+
+    def ensure_loaded(self, db: Session, exclude: Optional[Set[str]] = None):
+        if not self.loaded:
+            with self._lock:
+                if not self.loaded:
+                    self.rebuild_from_db(db, exclude)
+
+    def reset(self):
+        """Drop the contents; the next ensure_loaded() reloads from the DB"""
+        with self._lock:
+            self.loaded = False
+
+    def nearest(self, embedding) -> Optional[Tuple[str, float]]:
+        """Return (user_id, cosine distance) of the closest stored face"""
+        query = self._normalize(embedding)
+        with self._lock:
+            if self._size == 0:
+                return None
+            if query.shape[0] != self._matrix.shape[1]:
+                raise ValueError("Embedding dimension does not match index dimension")
+            similarities = self._matrix[:self._size] @ query
+            best = int(np.argmax(similarities))
+            return self._ids[best], float(1.0 - similarities[best])
+
+    def find_match(self, embedding, threshold: float = 0.3) -> Optional[Tuple[str, float]]:
+        """Return the nearest stored face if its cosine distance is below threshold"""
+        match = self.nearest(embedding)
+        if match and match[1] < threshold:
+            return match
+        return None
+
+
+# Process-wide index shared by every request in this worker
+face_index = FaceIndex()
+
+
+def find_face_match(db: Session, embedding, threshold: float = 0.3) -> Optional[Tuple[str, float]]:
+    """
+    Closest stored face below the cosine distance threshold.
+
+    With the ANN index enabled, the memory-mapped IVF file is searched
+    first and `face_index` only holds users registered after the file was
+    built; otherwise `face_index` holds every embedding and is exact.
+    Either way it is refreshed first with faces other workers stored.
+    """
+    from .ann_index import get_ann_index
+
+    ann = get_ann_index()
+    if ann is not None:
+        if face_index.source is not ann:
+            # New or rebuilt index file: reload only the users it does not cover
+            face_index.reset()
+            face_index.source = ann
+        match = ann.find_match(embedding, threshold)
+        face_index.ensure_loaded(db, exclude=ann.id_set)
+        face_index.refresh(db)
+        delta_match = face_index.find_match(embedding, threshold)
+        candidates = [m for m in (match, delta_match) if m]
+        return min(candidates, key=lambda m: m[1]) if candidates else None
+
+    if face_index.source is not None:
+        face_index.reset()
+        face_index.source = None
+    face_index.ensure_loaded(db)
+    face_index.refresh(db)
+    return face_index.find_match(embedding, threshold)
@@ -0,0 +1,146 @@
+#/backend/app/face_pipeline.py
+import threading
+import time
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+from deepface import DeepFace
+
+from .embeddings import EMBEDDING_MODEL
+
+# One detection policy for the whole registration flow: a registration
+# photo must contain a detectable face.
+ENFORCE_DETECTION = True
+
+
+class FaceAnalysis(NamedTuple):
+    embedding: list
+    facial_area: Optional[dict]
+    confidence: Optional[float]
+    inference_seconds: float
+
+
+_stats_lock = threading.Lock()
+inference_stats = {"count": 0, "total_seconds": 0.0}
+
+
+def record_inference(seconds: float):
+    with _stats_lock:
+        inference_stats["count"] += 1
+        inference_stats["total_seconds"] += seconds
+    print(f"[FACE] {EMBEDDING_MODEL} inference took {seconds * 1000:.0f} ms")
+
+
+def warm_up():
+    """Load the model weights by embedding a blank image"""
+    import numpy as np
+    DeepFace.represent(
+        img_path=np.zeros((224, 224, 3), dtype=np.uint8),
+        model_name=EMBEDDING_MODEL,
+        enforce_detection=False,
+        detector_backend="skip"
+    )
+
+
+def compute_face(image_path: str) -> FaceAnalysis:
+    """Model run only, without touching this process's stats (used by pool workers)"""
+    start = time.perf_counter()
+    representation = DeepFace.represent(
+        img_path=image_path,
+        model_name=EMBEDDING_MODEL,
+        enforce_detection=ENFORCE_DETECTION
+    )[0]
+    elapsed = time.perf_counter() - start
+    return FaceAnalysis(
+        embedding=representation["embedding"],
+        facial_area=representation.get("facial_area"),
+        confidence=representation.get("face_confidence"),
+        inference_seconds=elapsed
+    )
+
+
+def compute_faces(image_paths: List[str]) -> List[Union[FaceAnalysis, str]]:
+    """
+    Embed a batch of images in one worker call. Failures are returned as
+    error strings so one bad photo does not sink the batch.
+    """
+    results = []
+    for image_path in image_paths:
+        try:
+            results.append(compute_face(image_path))
+        except Exception as e:
+            results.append(str(e))
+    return results
+
+
+def analyze_face(image_path: str) -> FaceAnalysis:
+    """
+    Detect the face and compute its embedding in a single model run.
+
+    The result is shared by the duplicate check, the validity check and
+    the stored embedding. Raises ValueError if no face is detected.
+    """
+    from .embedding_cache import embedding_cache
+
+    with open(image_path, "rb") as f:
+        keys = embedding_cache.keys_for(f.read())
+    analysis = embedding_cache.get(keys)
+    if analysis is not None:
+        return analysis
+    analysis = compute_face(image_path)
+    record_inference(analysis.inference_seconds)
+    embedding_cache.put(keys, analysis)
+    return analysis
+
+
+def box_overlap(a: tuple, b: tuple) -> float:
+    """Intersection over union of two (x, y, w, h) boxes"""
+    ix = max(0, min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union else 0.0
+
+
+def embed_frames(frames: List[Tuple[bytes, List[tuple]]], detector_backend: str = "opencv",
+                 skip_overlap: float = 0.5) -> List[List[dict]]:
+    """
+    Detect and embed the faces in a batch of JPEG frames (pool worker side).
+
+    Each frame comes with the boxes of faces already recognized in the
+    previous frame of the same camera; a detected face overlapping one of
+    them is returned without an embedding, so known students are not
+    re-embedded on every frame.
+    """
+    import cv2
+    import numpy as np
+
+    results = []
+    for frame_bytes, known_boxes in frames:
+        image = cv2.imdecode(np.frombuffer(frame_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            results.append([])
+            continue
+        faces = DeepFace.extract_faces(
+            img_path=image,
+            detector_backend=detector_backend,
+            enforce_detection=False
+        )
+        frame_faces = []
+        for face in faces:
+            if not face.get("confidence"):
+                continue  # enforce_detection=False returns the whole frame when nothing is found
+            area = face["facial_area"]
+            box = (area["x"], area["y"], area["w"], area["h"])
+            if any(box_overlap(box, tuple(known)) >= skip_overlap for known in known_boxes):
+                frame_faces.append({"box": box, "embedding": None})
+                continue
+            crop = image[box[1]:box[1] + box[3], box[0]:box[0] + box[2]]
+            embedding = DeepFace.represent(
+                img_path=crop,
+                model_name=EMBEDDING_MODEL,
+                enforce_detection=False,
+                detector_backend="skip"
+            )[0]["embedding"]
+            frame_faces.append({"box": box, "embedding": embedding})
+        results.append(frame_faces)
+    return results
@@ -0,0 +1,118 @@
+#/backend/app/inference_pool.py
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from . import face_pipeline
+from .config import settings
+from .embedding_cache import embedding_cache
+
+
+def _init_worker():
+    """Runs once per worker process: load VGG-Face before the first job"""
+    face_pipeline.warm_up()
+
+
+class InferencePool:
+    """
+    Runs DeepFace inference outside the event loop.
+
+    Jobs go to a pool of worker processes that keep the model loaded, so
+    face work uses every core while the API keeps answering other
+    requests. At most `queue_depth` jobs may be in flight; beyond that
+    callers get a 503 instead of waiting indefinitely.
+    """
+
+    def __init__(self, workers: int, queue_depth: int):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def start(self):
+        if self.workers <= 0 or self._executor is not None:
+            return
+        with self._lock:
+            if self._executor is None:
+                # spawn: TensorFlow does not survive fork()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker
+                )
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _acquire(self):
+        with self._lock:
+            if self._in_flight >= self.queue_depth:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Face recognition is busy, please retry shortly",
+                    headers={"Retry-After": "5"}
+                )
+            self._in_flight += 1
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    async def submit(self, fn, *args):
+        """Run a picklable function on the pool and await its result"""
+        self._acquire()
+        try:
+            if self.workers <= 0:
+                return await run_in_threadpool(fn, *args)
+            self.start()
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self._release()
+
+    def map_batches(self, fn, batches: list) -> list:
+        """
+        Blocking: run fn over each batch, spread across the worker processes.
+        Meant for bulk jobs running in a thread, not on the event loop.
+        """
+        if self.workers <= 0:
+            return [fn(batch) for batch in batches]
+        self.start()
+        futures = [self._executor.submit(fn, batch) for batch in batches]
+        return [future.result() for future in futures]
+
+    async def analyze_face(self, image_path: str, image_bytes: Optional[bytes] = None) -> face_pipeline.FaceAnalysis:
+        """Embedding for an image, from the content cache when it was seen before"""
+        # Cache lookups and stores may read, spill and prune files on disk
+        keys, analysis = await run_in_threadpool(_cached_analysis, image_path, image_bytes)
+        if analysis is not None:
+            return analysis
+
+        analysis = await self.submit(face_pipeline.compute_face, image_path)
+        face_pipeline.record_inference(analysis.inference_seconds)
+        await run_in_threadpool(embedding_cache.put, keys, analysis)
+        return analysis
+
+
+def _cached_analysis(image_path: str, image_bytes: Optional[bytes]):
+    """Blocking: the image's cache keys and its cached analysis, if any"""
+    if image_bytes is None:
+        with open(image_path, "rb") as f:
+            image_bytes = f.read()
+    keys = embedding_cache.keys_for(image_bytes)
+    return keys, embedding_cache.get(keys)
+
+inference_pool = InferencePool(settings.FACE_WORKERS, settings.FACE_QUEUE_DEPTH)
@@ -0,0 +1,188 @@
+#/backend/app/migrations.py
+"""
+Small online schema/data migrations.
+
+The app creates tables with create_all(), which never alters existing
+tables, so new nullable columns and indexes are added here on startup. Data
+migrations run in short chunks so the API can keep serving while they run.
+
+    python -m app.migrations embeddings --batch-size 500
+    python -m app.migrations rollup
+    python -m app.migrations search-index
+    python -m app.migrations dedupe
+"""
+import argparse
+import json
+import time
+
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.engine import Engine
+
+from . import enrollment_rollup, models
+from .database import Base, SessionLocal, engine as default_engine
+from .embeddings import EMBEDDING_MODEL, set_user_embedding
+from .user_search import user_search
+
+
+def add_missing_columns(engine: Engine = default_engine):
+    """ALTER TABLE ... ADD COLUMN for model columns missing from existing tables"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(
+                    f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                ))
+                print(f"[MIGRATE] Added column {table.name}.{column.name}")
+
+
+# Indexes superseded by a model index, dropped once their replacement exists
+REPLACED_INDEXES = {
+    "users": ["ix_users_role_department"],  # by ix_users_role_department_id
+}
+
+
+def add_missing_indexes(engine: Engine = default_engine, remove_duplicate_rows: bool = False):
+    """
+    CREATE INDEX for model indexes missing from existing tables, then DROP
+    the REPLACED_INDEXES they supersede.
+
+    A unique index is not created while the table holds rows that would
+    violate it; the duplicate keys are logged instead. Deleting them is an
+    explicit step (`python -m app.migrations dedupe`), never a side effect
+    of starting the app.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            if index.name in existing:
+                continue
+            with engine.begin() as conn:
+                if index.unique:
+                    columns = list(index.columns)
+                    if remove_duplicate_rows:
+                        removed = remove_duplicates(conn, table, columns)
+                        if removed:
+                            print(f"[MIGRATE] Removed {removed} duplicate rows from {table.name}")
+                    else:
+                        duplicates = find_duplicates(conn, columns)
+                        if duplicates:
+                            names = ", ".join(c.name for c in columns)
+                            print(f"[MIGRATE] Not creating unique index {index.name}: "
+                                  f"{len(duplicates)} duplicate ({names}) keys in {table.name}, e.g. "
+                                  f"{duplicates[:5]}; run `python -m app.migrations dedupe` to keep "
+                                  f"the oldest row of each")
+                            continue
+                index.create(bind=conn)
+            print(f"[MIGRATE] Created index {index.name}")
+        for name in REPLACED_INDEXES.get(table.name, []):
+            if name in existing:
+                with engine.begin() as conn:
+                    conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+                print(f"[MIGRATE] Dropped index {name}")
+
+
+def find_duplicates(conn, columns) -> list:
+    """Values of `columns` shared by more than one row"""
+    return [tuple(row) for row in conn.execute(
+        select(*columns).group_by(*columns).having(func.count() > 1)
+    )]
+
+
+def remove_duplicates(conn, table, columns) -> int:
+    """Delete all but the oldest row of each group sharing `columns`"""
+    (pk,) = table.primary_key.columns
+    keep = select(func.min(pk)).group_by(*columns)
+    return conn.execute(table.delete().where(pk.not_in(keep))).rowcount
+
+
+def migrate_face_embeddings(batch_size: int = 500, pause: float = 0.0, vacuum: bool = False):
+    """
+    Convert legacy JSON face embeddings to the binary float32 column.
+
+    Rows are walked by primary key and each chunk is committed on its own,
+    so write locks are held only briefly.
+    """
+    converted = 0
+    failed = []
+    last_id = ""
+    while True:
+        db = SessionLocal()
+        try:
+            users = db.query(models.User).filter(
+                models.User.id > last_id,
+                models.User.face_embedding.isnot(None),
+                models.User.face_embedding_blob.is_(None)
+            ).order_by(models.User.id).limit(batch_size).all()
+            if not users:
+                break
+
+            for user in users:
+                last_id = user.id
+                try:
+                    set_user_embedding(user, json.loads(user.face_embedding), EMBEDDING_MODEL)
+                    converted += 1
+                except (TypeError, ValueError):
+                    failed.append(user.id)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        print(f"[MIGRATE] Converted {converted} embeddings (last id {last_id})")
+        if pause:
+            time.sleep(pause)
+
+    if vacuum and default_engine.dialect.name == "sqlite":
+        # Give the space freed by the JSON text back to the filesystem
+        with default_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM"))
+        # VACUUM may renumber the users rowids the search index points at
+        user_search.rebuild(default_engine)
+
+    return {"converted": converted, "failed": failed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Smart Campus data migrations")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    emb = sub.add_parser("embeddings", help="convert JSON face embeddings to float32 blobs")
+    emb.add_argument("--batch-size", type=int, default=500)
+    emb.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between chunks")
+    emb.add_argument("--vacuum", action="store_true", help="VACUUM the SQLite file afterwards")
+
+    sub.add_parser("rollup", help="rebuild the monthly enrollment rollup from enrollments")
+    sub.add_parser("search-index", help="rebuild the full-text user search index")
+    sub.add_parser("dedupe", help="delete rows blocking a unique index (keeps the oldest), then create it")
+
+    args = parser.parse_args()
+    Base.metadata.create_all(bind=default_engine)
+    add_missing_columns()
+    add_missing_indexes(remove_duplicate_rows=args.command == "dedupe")
+    if args.command == "embeddings":
+        result = migrate_face_embeddings(args.batch_size, args.pause, args.vacuum)
+        print(f"Converted: {result['converted']}, failed: {len(result['failed'])}")
+        for user_id in result["failed"]:
+            print(f"  could not convert {user_id}")
+    elif args.command == "rollup":
+        enrollment_rollup.backfill()
+    elif args.command == "search-index":
+        user_search.rebuild(default_engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,128 +1,209 @@
-# /backend/app/model.py
-from datetime import datetime
-from pydantic import validator
-from sqlalchemy import (
-    JSON, Boolean, CheckConstraint, Column, DateTime, String, 
-    Date, Integer, ForeignKey, Enum, Text, Time, UniqueConstraint
-)
-from .database import Base
-from sqlalchemy.orm import relationship
-from sqlalchemy import Enum as SQLEnum
-from enum import Enum as PyEnum
-
-class DayOfWeek(PyEnum):
-    MONDAY = 0
-    TUESDAY = 1
-    WEDNESDAY = 2
-    THURSDAY = 3
-    FRIDAY = 4
-
-
-class SemesterType(PyEnum):
-    FALL = "fall"
-    SPRING = "spring"
-
-
-class User(Base):
-    __tablename__ = "users"
-    
-    id = Column(String(11), primary_key=True, index=True)
-    email = Column(String, unique=True, index=True)
-    hashed_password = Column(String)
-    full_name = Column(String)
-    role = Column(String)
-    department_code = Column(String(3), ForeignKey("departments.code"))
-    date_of_enrollment = Column(Date)
-    image_path = Column(String)
-    face_embedding = Column(Text, nullable=True)
-    
-    # Relationships
-    department = relationship("Department", back_populates="users")
-    
-    # Teaching relationship (for teachers)
-    teaching_courses = relationship(
-        "Course", 
-        back_populates="teacher",
-        foreign_keys="Course.teacher_id"
-    )
-    
-    # Enrollment relationship (for students)
-    enrollments = relationship("Enrollment", back_populates="student")
-
-
-class Department(Base):
-    __tablename__ = "departments"
-    
-    code = Column(String(5), primary_key=True)
-    name = Column(String(50), unique=True)
-    short_name = Column(String(5))
-   
-    users = relationship("User", back_populates="department")
-    courses = relationship("Course", back_populates="department")
-
-
-class Course(Base):
-    __tablename__ = "courses"
-    
-    id = Column(String, primary_key=True, index=True)
-    name = Column(String(100))
-    credits = Column(Integer)
-    department_code = Column(String(3), ForeignKey("departments.code"))
-    semester = Column(String)
-    teacher_id = Column(String, ForeignKey("users.id"))
-
-    schedules = relationship("Schedule", back_populates="course")
-    
-    teacher = relationship(
-        "User", 
-        back_populates="teaching_courses",
-        foreign_keys=[teacher_id]
-    )
-    
-    enrollments = relationship("Enrollment", back_populates="course")
-    department = relationship("Department", back_populates="courses")
-
-
-class Enrollment(Base):
-    __tablename__ = "enrollments"
-    
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    student_id = Column(String, ForeignKey("users.id"))
-    course_id = Column(String, ForeignKey("courses.id"))
-    enrollment_date = Column(DateTime, default=datetime.now)
-    
-    student = relationship("User", back_populates="enrollments")
-    course = relationship("Course", back_populates="enrollments")
-
-
-
-
-class Schedule(Base):
-    __tablename__ = "schedules"
-    
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    course_id = Column(String, ForeignKey("courses.id"), nullable=False)
-    
-    academic_year = Column(Integer, nullable=False)
-    semester = Column(String, nullable=False)
-    day_of_week = Column(String, nullable=False)
-    start_time = Column(Time, nullable=False)
-    end_time = Column(Time, nullable=False)
-    is_active = Column(Boolean, default=True)
-
-    # New column: group code for linking multiple schedule entries together
-    group_code = Column(String(36), index=True, nullable=True)  # UUID recommended
-    
-    # Relationships
-    course = relationship("Course", back_populates="schedules")
-    
-    __table_args__ = (
-        CheckConstraint('end_time > start_time', name='check_time_slot'),
-        UniqueConstraint(
-            'course_id', 'academic_year', 'semester', 'day_of_week', 'start_time',
-            name='_course_schedule_unique'
-        ),
-    )
-
-
-
+# /backend/app/model.py
+from datetime import datetime
+from pydantic import validator
+from sqlalchemy import (
+    JSON, Boolean, CheckConstraint, Column, DateTime, String, 
+    Date, Float, Integer, ForeignKey, Enum, Index, LargeBinary, Text, Time, UniqueConstraint
+)
+from .database import Base
+from sqlalchemy.orm import relationship
+from sqlalchemy import Enum as SQLEnum
+from enum import Enum as PyEnum
+
+class DayOfWeek(PyEnum):
+    MONDAY = 0
+    TUESDAY = 1
+    WEDNESDAY = 2
+    THURSDAY = 3
+    FRIDAY = 4
+
+
+class SemesterType(PyEnum):
+    FALL = "fall"
+    SPRING = "spring"
+
+
+class User(Base):
+    __tablename__ = "users"
+    
+    id = Column(String(11), primary_key=True, index=True)
+    email = Column(String, unique=True, index=True)
+    hashed_password = Column(String)
+    full_name = Column(String)
+    role = Column(String)
+    department_code = Column(String(3), ForeignKey("departments.code"))
+    date_of_enrollment = Column(Date)
+    image_path = Column(String)
+    face_embedding = Column(Text, nullable=True)  # legacy JSON format
+    face_embedding_blob = Column(LargeBinary, nullable=True)  # little-endian float32
+    face_embedding_model = Column(String(32), nullable=True)
+    face_embedding_dim = Column(Integer, nullable=True)
+    face_embedding_updated_at = Column(DateTime, nullable=True, index=True)  # lets other workers' face indexes catch up
+    
+    # Relationships
+    department = relationship("Department", back_populates="users")
+    
+    # Teaching relationship (for teachers)
+    teaching_courses = relationship(
+        "Course", 
+        back_populates="teacher",
+        foreign_keys="Course.teacher_id"
+    )
+    
+    # Enrollment relationship (for students)
+    enrollments = relationship("Enrollment", back_populates="student")
+
+    __table_args__ = (
+        # Search endpoints and /stats filter on role, usually with a department;
+        # id last so a department's roster is read in keyset (id) order
+        Index("ix_users_role_department_id", "role", "department_code", "id"),
+    )
+
+
+class Department(Base):
+    __tablename__ = "departments"
+    
+    code = Column(String(5), primary_key=True)
+    name = Column(String(50), unique=True)
+    short_name = Column(String(5))
+   
+    users = relationship("User", back_populates="department")
+    courses = relationship("Course", back_populates="department")
+
+
+class Course(Base):
+    __tablename__ = "courses"
+    
+    id = Column(String, primary_key=True, index=True)
+    name = Column(String(100))
+    credits = Column(Integer)
+    department_code = Column(String(3), ForeignKey("departments.code"))
+    semester = Column(String)
+    teacher_id = Column(String, ForeignKey("users.id"), index=True)
+
+    schedules = relationship("Schedule", back_populates="course")
+    
+    teacher = relationship(
+        "User", 
+        back_populates="teaching_courses",
+        foreign_keys=[teacher_id]
+    )
+    
+    enrollments = relationship("Enrollment", back_populates="course")
+    department = relationship("Department", back_populates="courses")
+
+
+class Enrollment(Base):
+    __tablename__ = "enrollments"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    student_id = Column(String, ForeignKey("users.id"))
+    course_id = Column(String, ForeignKey("courses.id"))
+    enrollment_date = Column(DateTime, default=datetime.now)
+    
+    student = relationship("User", back_populates="enrollments")
+    course = relationship("Course", back_populates="enrollments")
+
+    __table_args__ = (
+        # A student is enrolled in a course once; also serves lookups by student
+        Index("ix_enrollments_student_course", "student_id", "course_id", unique=True),
+        Index("ix_enrollments_course_id", "course_id"),
+    )
+
+
+
+
+class Schedule(Base):
+    __tablename__ = "schedules"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    course_id = Column(String, ForeignKey("courses.id"), nullable=False)
+    
+    academic_year = Column(Integer, nullable=False)
+    semester = Column(String, nullable=False)
+    day_of_week = Column(String, nullable=False)
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
+    is_active = Column(Boolean, default=True)
+
+    # New column: group code for linking multiple schedule entries together
+    group_code = Column(String(36), index=True, nullable=True)  # UUID recommended
+    
+    # Relationships
+    course = relationship("Course", back_populates="schedules")
+    
+    __table_args__ = (
+        CheckConstraint('end_time > start_time', name='check_time_slot'),
+        UniqueConstraint(
+            'course_id', 'academic_year', 'semester', 'day_of_week', 'start_time',
+            name='_course_schedule_unique'
+        ),
+        Index("ix_schedules_group_term", "group_code", "academic_year", "semester"),
+    )
+
+
+
+
+
+class EmbeddingFailure(Base):
+    """Users whose face embedding could not be computed by the backfill job"""
+    __tablename__ = "embedding_failures"
+
+    user_id = Column(String(11), ForeignKey("users.id"), primary_key=True)
+    error = Column(Text)
+    attempts = Column(Integer, default=1)
+    last_attempt = Column(DateTime, default=datetime.now)
+
+
+class Attendance(Base):
+    __tablename__ = "attendance"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    course_id = Column(String, ForeignKey("courses.id"), nullable=False)
+    student_id = Column(String, ForeignKey("users.id"), nullable=False)
+    date = Column(Date, nullable=False)
+    marked_at = Column(DateTime, default=datetime.now)
+    distance = Column(Float, nullable=True)  # cosine distance of the recognizing match
+
+    __table_args__ = (
+        UniqueConstraint('course_id', 'student_id', 'date', name='_attendance_once_per_day'),
+    )
+
+
+class EmailOutbox(Base):
+    """Outgoing emails, written in the same transaction as the change that causes them"""
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body_html = Column(Text, nullable=False)
+    status = Column(String(10), default="pending", index=True)  # pending | sending | sent | failed
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.now, index=True)
+    claim_token = Column(String(32), nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    sent_at = Column(DateTime, nullable=True)
+
+
+class RevokedToken(Base):
+    """Revoked JWTs shared by all API workers; rows are purged once the token expires"""
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    token_hash = Column(String(64), unique=True, nullable=False)  # sha256 of the token
+    expires_at = Column(DateTime, nullable=False, index=True)  # UTC, from the token's exp
+    revoked_at = Column(DateTime, default=datetime.utcnow, index=True)  # other workers sync by this
+
+
+class EnrollmentMonthly(Base):
+    """Enrollments per calendar month, department and course; maintained by enrollment_rollup.py"""
+    __tablename__ = "enrollment_monthly"
+
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)  # 1-12
+    department_code = Column(String(5), primary_key=True, default="")  # the course's; "" if none
+    course_id = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
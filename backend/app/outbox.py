@@ -0,0 +1,241 @@
+#/backend/app/outbox.py
+"""
+Sender for the email outbox.
+
+Pending messages are claimed in batches (a conditional UPDATE, so several
+API workers can run senders without sending anything twice) and sent
+over one authenticated SMTP session that is kept open while there is
+work. Each message's outcome is committed as soon as it is known. Failed
+messages are retried with exponential backoff until EMAIL_MAX_ATTEMPTS,
+then marked failed.
+
+    python -m app.outbox          # run the sender in the foreground
+    python -m app.outbox --drain  # send everything pending and exit
+"""
+import argparse
+import smtplib
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func, or_
+
+from . import models
+from .config import settings
+from .database import SessionLocal
+from .email_service import build_message
+
+# Messages stuck in "sending" this long (sender crashed) are claimed again
+STALE_CLAIM = timedelta(minutes=10)
+
+
+class OutboxSender:
+    def __init__(self, batch_size: int = None, max_attempts: int = None,
+                 retry_base: int = None, poll_seconds: float = None):
+        self.batch_size = batch_size or settings.EMAIL_BATCH_SIZE
+        self.max_attempts = max_attempts or settings.EMAIL_MAX_ATTEMPTS
+        self.retry_base = retry_base if retry_base is not None else settings.EMAIL_RETRY_BASE_SECONDS
+        self.poll_seconds = poll_seconds or settings.EMAIL_POLL_SECONDS
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"sent": 0, "retried": 0, "failed": 0, "connections": 0}
+
+    # ---- SMTP session -------------------------------------------------
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except smtplib.SMTPException:
+                pass
+            self._close()
+        server = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=30)
+        if settings.SMTP_USER and settings.SMTP_PASSWORD:
+            server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        self._smtp = server
+        self.stats["connections"] += 1
+        return server
+
+    def _close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+    # ---- batches --------------------------------------------------------
+
+    def _claim(self, db) -> list:
+        now = datetime.now()
+        token = uuid.uuid4().hex
+        claimable = or_(
+            (models.EmailOutbox.status == "pending") & (models.EmailOutbox.next_attempt_at <= now),
+            (models.EmailOutbox.status == "sending") & (models.EmailOutbox.claimed_at < now - STALE_CLAIM)
+        )
+        candidate_ids = [
+            message_id for (message_id,) in db.query(models.EmailOutbox.id).filter(
+                claimable
+            ).order_by(models.EmailOutbox.id).limit(self.batch_size)
+        ]
+        if not candidate_ids:
+            return []
+        # Re-checking the condition in the UPDATE makes the claim exclusive
+        # when another sender grabbed some of the same rows in between
+        db.query(models.EmailOutbox).filter(
+            models.EmailOutbox.id.in_(candidate_ids),
+            claimable
+        ).update(
+            {"status": "sending", "claim_token": token, "claimed_at": now},
+            synchronize_session=False
+        )
+        db.commit()
+        return db.query(models.EmailOutbox).filter(
+            models.EmailOutbox.claim_token == token
+        ).order_by(models.EmailOutbox.id).all()
+
+    def _retry_later(self, message: models.EmailOutbox, error: str):
+        message.attempts += 1
+        message.last_error = error
+        message.claim_token = None
+        if message.attempts >= self.max_attempts:
+            message.status = "failed"
+            self.stats["failed"] += 1
+        else:
+            message.status = "pending"
+            message.next_attempt_at = datetime.now() + timedelta(
+                seconds=self.retry_base * 2 ** (message.attempts - 1)
+            )
+            self.stats["retried"] += 1
+
+    def send_batch(self) -> int:
+        """Claim and send one batch; returns the number of messages handled"""
+        db = SessionLocal()
+        try:
+            messages = self._claim(db)
+            if not messages:
+                return 0
+            try:
+                server = self._connection()
+            except (smtplib.SMTPException, OSError) as e:
+                # Server unreachable: the whole batch backs off
+                for message in messages:
+                    self._retry_later(message, f"connect: {e}")
+                db.commit()
+                return len(messages)
+
+            for position, message in enumerate(messages):
+                try:
+                    server.send_message(build_message(message.recipient, message.subject, message.body_html))
+                    message.status = "sent"
+                    message.sent_at = datetime.now()
+                    message.attempts += 1
+                    message.claim_token = None
+                    self.stats["sent"] += 1
+                except smtplib.SMTPRecipientsRefused as e:
+                    self._retry_later(message, str(e))
+                except (smtplib.SMTPException, OSError) as e:
+                    self._retry_later(message, str(e))
+                    self._close()
+                    try:
+                        server = self._connection()
+                    except (smtplib.SMTPException, OSError):
+                        # Give the rest of the batch back for a later round
+                        for rest in messages[position + 1:]:
+                            self._retry_later(rest, f"connect: {e}")
+                        db.commit()
+                        break
+                except Exception as e:
+                    # e.g. a message that cannot be built; the rest still go out
+                    self._retry_later(message, f"{type(e).__name__}: {e}")
+                # Recorded per message: a crash later in the batch must not
+                # leave sent mail in "sending", to be claimed and sent again
+                db.commit()
+            return len(messages)
+        finally:
+            db.close()
+
+    def drain(self) -> int:
+        """Send until nothing is due; returns the number of messages handled"""
+        total = 0
+        try:
+            while True:
+                handled = self.send_batch()
+                if not handled:
+                    return total
+                total += handled
+        finally:
+            self._close()
+
+    # ---- background thread ---------------------------------------------
+
+    def notify(self):
+        """Wake the sender right away (called after queueing mail)"""
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                handled = self.send_batch()
+            except Exception as e:
+                print(f"[OUTBOX] sender error: {e}")
+                handled = 0
+            if handled:
+                continue
+            # Idle: drop the SMTP session and wait for new mail or the next poll
+            self._close()
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+        self._close()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="email-outbox")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def status(self, db) -> dict:
+        counts = dict(
+            db.query(models.EmailOutbox.status, func.count(models.EmailOutbox.id))
+            .group_by(models.EmailOutbox.status).all()
+        )
+        return {"queue": counts, **self.stats}
+
+
+outbox_sender = OutboxSender()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send queued emails")
+    parser.add_argument("--drain", action="store_true", help="send everything due and exit")
+    args = parser.parse_args()
+
+    from .database import Base, engine
+    Base.metadata.create_all(bind=engine)
+    if args.drain:
+        start = time.perf_counter()
+        handled = outbox_sender.drain()
+        print(f"Handled {handled} messages in {time.perf_counter() - start:.1f}s: {outbox_sender.stats}")
+        return
+    outbox_sender.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        outbox_sender.stop()
+
+
+if __name__ == "__main__":
+    main()
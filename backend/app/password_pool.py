@@ -0,0 +1,76 @@
+#/backend/app/password_pool.py
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from . import auth
+from .config import settings
+
+
+class PasswordPool:
+    """
+    Runs bcrypt hashing and verification off the event loop.
+
+    bcrypt releases the GIL, so a small thread pool runs `workers` hashes
+    in parallel while the loop keeps serving other requests. Callers
+    wait at most `queue_timeout` seconds for a free slot; after that they
+    get a 429 instead of piling up behind a login storm.
+    """
+
+    def __init__(self, workers: int, queue_timeout: float):
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self.stats = {"completed": 0, "rejected": 0, "waiting": 0}
+
+    def _ensure_started(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._slots = asyncio.Semaphore(self.workers)
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="bcrypt"
+                    )
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self._slots = None
+
+    async def _run(self, fn, *args):
+        self._ensure_started()
+        slots = self._slots
+        self.stats["waiting"] += 1
+        try:
+            await asyncio.wait_for(slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.stats["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts in progress, please retry shortly",
+                headers={"Retry-After": "1"}
+            )
+        finally:
+            self.stats["waiting"] -= 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+            self.stats["completed"] += 1
+            return result
+        finally:
+            slots.release()
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(auth.verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(auth.get_password_hash, password)
+
+
+password_pool = PasswordPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_TIMEOUT)
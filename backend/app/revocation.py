@@ -0,0 +1,162 @@
+#/backend/app/revocation.py
+"""
+Store of revoked access tokens.
+
+Every worker keeps the revoked tokens it knows about in a local dict, so
+`is_revoked` never touches the database. Revocations are written to a
+shared backend (the revoked_tokens table by default) and a background
+thread pulls other workers' revocations every REVOCATION_SYNC_SECONDS.
+Expired entries are swept from both the dict and the backend.
+
+Other workers' revocations are found by revoked_at, not by id: purged
+rows let SQLite reuse low ids, and Postgres sequence ids are not handed
+out in commit order, so an id cursor can skip rows. Each sync re-reads
+the last SYNC_OVERLAP before the newest revoked_at it has seen.
+"""
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from . import models
+from .config import settings
+from .database import SessionLocal
+
+# Expired entries are swept at most this often
+SWEEP_SECONDS = 60
+# Revocations stamped this long before the newest one seen are read again,
+# for transactions that commit after a later-stamped one
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+def token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class MemoryRevocationBackend:
+    """Revocations visible to this process only (single-worker deployments)"""
+
+    def add(self, digest: str, expires_at: datetime):
+        pass
+
+    def changes_since(self, cursor: Optional[datetime]) -> Tuple[List[Tuple[str, datetime]], Optional[datetime]]:
+        return [], cursor
+
+    def purge(self, now: datetime) -> int:
+        return 0
+
+
+class SQLRevocationBackend:
+    """Revocations shared through the revoked_tokens table"""
+
+    def add(self, digest: str, expires_at: datetime):
+        db = SessionLocal()
+        try:
+            db.add(models.RevokedToken(token_hash=digest, expires_at=expires_at))
+            db.commit()
+        except IntegrityError:
+            db.rollback()  # already revoked
+        finally:
+            db.close()
+
+    def changes_since(self, cursor: Optional[datetime]) -> Tuple[List[Tuple[str, datetime]], Optional[datetime]]:
+        """Unexpired revocations stamped since `cursor` (minus the overlap), and the next cursor"""
+        revoked = models.RevokedToken
+        db = SessionLocal()
+        try:
+            rows = db.query(revoked.token_hash, revoked.expires_at, revoked.revoked_at).filter(
+                revoked.expires_at > datetime.utcnow()
+            )
+            if cursor is not None:
+                rows = rows.filter(revoked.revoked_at >= cursor - SYNC_OVERLAP)
+            rows = rows.all()
+        finally:
+            db.close()
+        stamps = [row.revoked_at for row in rows if row.revoked_at is not None]
+        if stamps and (cursor is None or max(stamps) > cursor):
+            cursor = max(stamps)
+        return [(row.token_hash, row.expires_at) for row in rows], cursor
+
+    def purge(self, now: datetime) -> int:
+        db = SessionLocal()
+        try:
+            deleted = db.query(models.RevokedToken).filter(
+                models.RevokedToken.expires_at <= now
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+
+class RevocationStore:
+    def __init__(self, backend, sync_seconds: float):
+        self.backend = backend
+        self.sync_seconds = sync_seconds
+        self._revoked: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self._cursor: Optional[datetime] = None  # newest revoked_at seen
+        self._last_sweep = datetime.utcnow()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def revoke(self, token: str, expires_at: datetime):
+        """Revoke a token until its expiry (naive UTC, like the JWT exp)"""
+        digest = token_hash(token)
+        with self._lock:
+            self._revoked[digest] = expires_at
+        self.backend.add(digest, expires_at)
+
+    def is_revoked(self, token: str) -> bool:
+        expires_at = self._revoked.get(token_hash(token))
+        return expires_at is not None and expires_at > datetime.utcnow()
+
+    def _merge(self, entries: Iterable[Tuple[str, datetime]]):
+        with self._lock:
+            self._revoked.update(entries)
+
+    def sync(self):
+        """Pull revocations made by other workers and sweep expired entries"""
+        entries, self._cursor = self.backend.changes_since(self._cursor)
+        self._merge(entries)
+        now = datetime.utcnow()
+        if (now - self._last_sweep).total_seconds() >= SWEEP_SECONDS:
+            with self._lock:
+                for digest in [d for d, exp in self._revoked.items() if exp <= now]:
+                    del self._revoked[digest]
+            self.backend.purge(now)
+            self._last_sweep = now
+
+    def _loop(self):
+        while not self._stop.wait(self.sync_seconds):
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"[REVOCATION] sync error: {e}")
+
+    def start(self):
+        """Load current revocations, then keep syncing in the background"""
+        self.sync()
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="token-revocation")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __len__(self):
+        return len(self._revoked)
+
+
+_BACKENDS = {
+    "memory": MemoryRevocationBackend,
+    "sql": SQLRevocationBackend,
+}
+
+revocation_store = RevocationStore(_BACKENDS[settings.REVOCATION_BACKEND](), settings.REVOCATION_SYNC_SECONDS)
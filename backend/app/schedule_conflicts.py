@@ -0,0 +1,182 @@
+#/backend/app/schedule_conflicts.py
+"""
+In-memory conflict detection for timetables.
+
+A term's schedule rows are loaded once into per-teacher and per-group
+interval lists for each day. Each list is kept sorted by start time with
+a running maximum of end times, so the overlaps of a new slot are found
+with two binary searches. A proposed timetable is checked in one pass;
+every slot is added to the index after it is checked, so clashes inside
+the proposal are reported as well as clashes with existing rows.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+
+
+class Slot(NamedTuple):
+    course_id: str
+    day_of_week: str
+    start_time: time
+    end_time: time
+    teacher_id: Optional[str]
+    group_code: Optional[str]
+    schedule_id: Optional[int] = None  # None for proposed slots
+
+
+class Conflict(NamedTuple):
+    kind: str  # "teacher" or "group"
+    slot: Slot  # the proposed slot
+    other: Slot  # the slot it overlaps
+
+    @property
+    def message(self) -> str:
+        day_name = schemas.DayOfWeek(self.other.day_of_week).name.capitalize()
+        start_str = self.other.start_time.strftime("%H:%M").lstrip('0') or '0'
+        end_str = self.other.end_time.strftime("%H:%M").lstrip('0') or '0'
+        if self.kind == "teacher":
+            return f"Teacher already has course at: {day_name} {start_str}-{end_str}"
+        return f"Group already has course {self.other.course_id} at: {day_name} {start_str}-{end_str}"
+
+    def as_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "course_id": self.slot.course_id,
+            "day_of_week": self.slot.day_of_week,
+            "start_time": self.slot.start_time,
+            "end_time": self.slot.end_time,
+            "conflicting_course_id": self.other.course_id,
+            "conflicting_group_code": self.other.group_code,
+            "conflicting_start_time": self.other.start_time,
+            "conflicting_end_time": self.other.end_time,
+            "message": self.message,
+        }
+
+
+class IntervalList:
+    """Intervals of one teacher or group on one day, sorted by start time"""
+
+    def __init__(self, slots: Iterable[Slot] = ()):
+        # Built in one sort; add() then inserts in place
+        self._items: List[Tuple[time, time, int, Slot]] = sorted(
+            (slot.start_time, slot.end_time, counter, slot) for counter, slot in enumerate(slots)
+        )
+        self._starts: List[time] = [item[0] for item in self._items]
+        self._max_end: List[time] = []  # max end time of items[0..i]
+        for _, end, _, _ in self._items:
+            self._max_end.append(max(end, self._max_end[-1]) if self._max_end else end)
+        self._counter = len(self._items)  # tie-breaker so Slots are never compared
+
+    def add(self, slot: Slot):
+        self._counter += 1
+        item = (slot.start_time, slot.end_time, self._counter, slot)
+        position = bisect_right(self._items, item)
+        self._items.insert(position, item)
+        self._starts.insert(position, slot.start_time)
+        end = slot.end_time
+        if position:
+            end = max(end, self._max_end[position - 1])
+        self._max_end.insert(position, end)
+        # Later running maxima only change up to the first one already >= end
+        for i in range(position + 1, len(self._max_end)):
+            if self._max_end[i] >= end:
+                break
+            self._max_end[i] = end
+
+    def overlapping(self, start: time, end: time) -> List[Slot]:
+        # Candidates start before `end`; everything before `first` ends by `start`
+        stop = bisect_left(self._starts, end)
+        first = bisect_right(self._max_end, start, hi=stop)
+        return [slot for s, e, _, slot in self._items[first:stop] if e > start]
+
+    def __len__(self):
+        return len(self._items)
+
+
+class ConflictIndex:
+    def __init__(self):
+        self._teachers: Dict[Tuple[str, str], IntervalList] = {}
+        self._groups: Dict[Tuple[str, str], IntervalList] = {}
+
+    @classmethod
+    def load(
+        cls,
+        db: Session,
+        academic_year: int,
+        semester: str,
+        teacher_ids: Optional[Iterable[str]] = None,
+        group_codes: Optional[Iterable[str]] = None,
+        exclude_ids: Set[int] = frozenset()
+    ) -> "ConflictIndex":
+        """
+        One query for the term's rows; limited to the given teachers and
+        groups when either is passed. `exclude_ids` are rows about to be
+        replaced.
+        """
+        query = db.query(models.Schedule, models.Course.teacher_id).join(
+            models.Course, models.Schedule.course_id == models.Course.id
+        ).filter(
+            models.Schedule.academic_year == academic_year,
+            models.Schedule.semester == semester
+        )
+        if teacher_ids is not None or group_codes is not None:
+            query = query.filter(or_(
+                models.Course.teacher_id.in_(list(teacher_ids or [])),
+                models.Schedule.group_code.in_(list(group_codes or []))
+            ))
+        teachers: Dict[Tuple[str, str], List[Slot]] = {}
+        groups: Dict[Tuple[str, str], List[Slot]] = {}
+        for row, teacher_id in query:
+            if row.id in exclude_ids:
+                continue
+            slot = Slot(
+                row.course_id, row.day_of_week, row.start_time, row.end_time,
+                teacher_id, row.group_code, row.id
+            )
+            if slot.teacher_id:
+                teachers.setdefault((slot.teacher_id, slot.day_of_week), []).append(slot)
+            if slot.group_code:
+                groups.setdefault((slot.group_code, slot.day_of_week), []).append(slot)
+        # Each list is sorted once rather than grown row by row
+        index = cls()
+        index._teachers = {key: IntervalList(slots) for key, slots in teachers.items()}
+        index._groups = {key: IntervalList(slots) for key, slots in groups.items()}
+        return index
+
+    def add(self, slot: Slot):
+        if slot.teacher_id:
+            self._teachers.setdefault((slot.teacher_id, slot.day_of_week), IntervalList()).add(slot)
+        if slot.group_code:
+            self._groups.setdefault((slot.group_code, slot.day_of_week), IntervalList()).add(slot)
+
+    def conflicts_for(self, slot: Slot) -> List[Conflict]:
+        conflicts = []
+        teacher_slots = self._teachers.get((slot.teacher_id, slot.day_of_week))
+        if slot.teacher_id and teacher_slots:
+            conflicts += [
+                Conflict("teacher", slot, other)
+                for other in teacher_slots.overlapping(slot.start_time, slot.end_time)
+            ]
+        group_slots = self._groups.get((slot.group_code, slot.day_of_week))
+        if slot.group_code and group_slots:
+            # A slot clashing on both teacher and group is reported once
+            reported = {id(c.other) for c in conflicts}
+            conflicts += [
+                Conflict("group", slot, other)
+                for other in group_slots.overlapping(slot.start_time, slot.end_time)
+                if id(other) not in reported
+            ]
+        return conflicts
+
+    def check(self, proposed: Iterable[Slot]) -> List[Conflict]:
+        """All conflicts of a proposed timetable, with existing rows and within itself"""
+        conflicts = []
+        for slot in proposed:
+            conflicts += self.conflicts_for(slot)
+            self.add(slot)
+        return conflicts
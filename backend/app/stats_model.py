@@ -0,0 +1,431 @@
+#/backend/app/stats_model.py
+"""
+Read model behind GET /stats.
+
+Counters and per-department distributions live in memory and follow the
+writes of this process: ORM events collect deltas per session, which
+are applied after commit and dropped on rollback. Bulk statements that
+cannot be attributed row by row (query.delete(), UPDATE ... WHERE) mark
+the model for a recompute instead.
+
+The recent-enrollment and upcoming-schedule lists depend on names and on
+the day of the week; they are queried when an enrollment or schedule is
+written, or after STATS_TTL_SECONDS. A background thread recomputes
+everything every STATS_RECONCILE_SECONDS, which corrects any drift and
+picks up writes made by other workers or outside the ORM.
+"""
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .enrollment_rollup import rollup_key
+from .database import ReadSessionLocal
+
+CHART_COLORS = ['#3b82f6', '#6366f1', '#8b5cf6', '#ec4899', '#f43f5e']
+TREND_MONTHS = 6  # this month and the five before it
+LIST_LIMIT = 10
+
+# (kind, key, value); see StatsReadModel.apply
+Delta = Tuple[str, object, object]
+
+
+class StatsReadModel:
+    def __init__(self, session_factory, ttl_seconds: float, reconcile_seconds: float):
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self.reconcile_seconds = reconcile_seconds
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._needs_reconcile = False
+        self._totals = Counter()  # students, teachers, active_schedules, enrollments
+        self._students_by_dept = Counter()
+        self._courses_by_dept = Counter()
+        self._enrollments_by_month = Counter()  # (year, month) -> count
+        self._departments: Dict[str, str] = {}  # code -> short_name
+        self._sections: Dict[str, Tuple[list, float]] = {}  # name -> (rows, expires at)
+        self._version = 0  # bumped by every write and recompute
+        self._response: Optional[dict] = None
+        self._response_expires = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def reconcile(self):
+        """Recompute every counter from the database"""
+        db = self.session_factory()
+        try:
+            totals = Counter({
+                f"{role}s": count for role, count in db.query(models.User.role, func.count(models.User.id)).filter(
+                    models.User.role.in_(["student", "teacher"])
+                ).group_by(models.User.role)
+            })
+            totals["active_schedules"] = db.query(func.count(models.Schedule.id)).join(
+                models.Course, models.Schedule.course_id == models.Course.id
+            ).filter(models.Schedule.is_active == True).scalar() or 0
+            totals["enrollments"] = db.query(func.count(models.Enrollment.id)).scalar() or 0
+            students_by_dept = Counter(dict(db.query(
+                models.User.department_code, func.count(models.User.id)
+            ).filter(models.User.role == "student").group_by(models.User.department_code).all()))
+            courses_by_dept = Counter(dict(db.query(
+                models.Course.department_code, func.count(models.Course.id)
+            ).group_by(models.Course.department_code).all()))
+            rollup = models.EnrollmentMonthly
+            enrollments_by_month = Counter({
+                (year, month): count for year, month, count in db.query(
+                    rollup.year, rollup.month, func.sum(rollup.count)
+                ).group_by(rollup.year, rollup.month)
+            })
+            departments = dict(db.query(models.Department.code, models.Department.short_name).all())
+        finally:
+            db.close()
+        with self._lock:
+            self._totals = totals
+            self._students_by_dept = students_by_dept
+            self._courses_by_dept = courses_by_dept
+            self._enrollments_by_month = enrollments_by_month
+            self._departments = departments
+            self._sections.clear()
+            self._response = None
+            self._version += 1
+            self._loaded = True
+            self._needs_reconcile = False
+
+    def apply(self, deltas: List[Delta]):
+        """Apply the deltas of a committed transaction"""
+        with self._lock:
+            for kind, key, value in deltas:
+                if kind == "department":
+                    if value is None:
+                        self._departments.pop(key, None)
+                    else:
+                        self._departments[key] = value
+                elif kind == "stale":
+                    self._sections.pop(key, None)
+                elif kind == "reconcile":
+                    self._needs_reconcile = True
+                else:
+                    getattr(self, f"_{kind}")[key] += value
+            self._response = None
+            self._version += 1
+
+    def snapshot(self) -> dict:
+        """The /stats response; rebuilt only after a write or when a list expires"""
+        response = self._response
+        if response is not None and time.monotonic() < self._response_expires:
+            return response
+        if not self._loaded or self._needs_reconcile:
+            self.reconcile()
+        version = self._version
+        recent = self._section("recent", self._recent_enrollments)
+        upcoming = self._section("upcoming", self._upcoming_schedules)
+        with self._lock:
+            response = self._build(recent[0], upcoming[0])
+            if self._version == version:
+                # Nothing was written while the lists were queried
+                self._sections.update(recent=recent, upcoming=upcoming)
+                self._response = response
+                self._response_expires = min(recent[1], upcoming[1])
+        return response
+
+    def _section(self, name: str, query) -> Tuple[list, float]:
+        cached = self._sections.get(name)
+        if cached is not None and time.monotonic() < cached[1]:
+            return cached
+        db = self.session_factory()
+        try:
+            return query(db), time.monotonic() + self.ttl_seconds
+        finally:
+            db.close()
+
+    def _by_short_name(self, counts: Counter) -> List[Tuple[str, int]]:
+        grouped = Counter()
+        for code, count in counts.items():
+            if code in self._departments and count > 0:
+                grouped[self._departments[code]] += count
+        return sorted(grouped.items(), key=lambda item: item[0] or "")
+
+    def _build(self, recent: list, upcoming: list) -> dict:
+        dept_data = self._by_short_name(self._students_by_dept)
+        course_data = self._by_short_name(self._courses_by_dept)
+        # Enrollment trend (last 6 calendar months, oldest first)
+        now = datetime.now()
+        current = now.year * 12 + now.month - 1
+        months = [divmod(index, 12) for index in range(current - TREND_MONTHS + 1, current + 1)]
+        trend_data = [
+            (month + 1, self._enrollments_by_month[(year, month + 1)]) for year, month in months
+            if self._enrollments_by_month[(year, month + 1)] > 0
+        ]
+        return {
+            "totalStudents": self._totals["students"],
+            "totalTeachers": self._totals["teachers"],
+            "activeCourses": self._totals["active_schedules"],
+            "currentEnrollments": self._totals["enrollments"],
+            "departmentDistribution": {
+                "labels": [short_name for short_name, _ in dept_data],
+                "datasets": [{
+                    "label": "Students by Department",
+                    "data": [count for _, count in dept_data],
+                    "backgroundColor": CHART_COLORS
+                }]
+            },
+            "enrollmentTrend": {
+                "labels": [f"Month {month}" for month, _ in trend_data],
+                "datasets": [{
+                    "label": "Enrollments",
+                    "data": [count for _, count in trend_data],
+                    "borderColor": '#10b981',
+                    "backgroundColor": '#a7f3d0',
+                    "tension": 0.3
+                }]
+            },
+            "courseDistribution": {
+                "labels": [short_name for short_name, _ in course_data],
+                "datasets": [{
+                    "data": [count for _, count in course_data],
+                    "backgroundColor": CHART_COLORS
+                }]
+            },
+            "recentEnrollments": recent,
+            "upcomingSchedules": upcoming,
+        }
+
+    @staticmethod
+    def _recent_enrollments(db: Session) -> list:
+        rows = db.query(
+            models.User.full_name.label("student_name"),
+            models.Course.name.label("course_name"),
+            models.Department.short_name.label("department"),
+            models.Enrollment.enrollment_date
+        ).select_from(
+            models.Enrollment
+        ).join(
+            models.User, models.Enrollment.student_id == models.User.id
+        ).join(
+            models.Course, models.Enrollment.course_id == models.Course.id
+        ).join(
+            models.Department, models.Course.department_code == models.Department.code
+        ).order_by(
+            models.Enrollment.enrollment_date.desc()
+        ).limit(LIST_LIMIT).all()
+        return [
+            {
+                "student_name": row.student_name,
+                "course_name": row.course_name,
+                "department": row.department,
+                "enrollment_date": row.enrollment_date.isoformat()
+            } for row in rows
+        ]
+
+    @staticmethod
+    def _upcoming_schedules(db: Session) -> list:
+        today = datetime.now().weekday()  # 0=Monday, ..., 6=Sunday
+        if today >= 5:  # Saturday or Sunday
+            # Show schedules starting Monday to Friday (0 to 4)
+            upcoming_days = [str(i) for i in range(0, 5)]
+        else:
+            # Show schedules from tomorrow till Friday (if today is Friday, no upcoming)
+            upcoming_days = [str(i) for i in range(today + 1, 5)]
+        rows = db.query(
+            models.Course.name.label("course_name"),
+            models.User.full_name.label("teacher_name"),
+            models.Schedule.day_of_week,
+            models.Schedule.start_time,
+            models.Schedule.end_time
+        ).join(
+            models.Course, models.Schedule.course_id == models.Course.id
+        ).join(
+            models.User, models.Course.teacher_id == models.User.id
+        ).filter(
+            models.Schedule.is_active == True,
+            models.Schedule.day_of_week.in_(upcoming_days)
+        ).order_by(
+            models.Schedule.day_of_week,
+            models.Schedule.start_time
+        ).limit(LIST_LIMIT).all()
+        return [
+            {
+                "course_name": row.course_name,
+                "teacher_name": row.teacher_name,
+                "day_of_week": row.day_of_week,
+                "start_time": row.start_time.strftime("%H:%M:%S"),
+                "end_time": row.end_time.strftime("%H:%M:%S")
+            } for row in rows
+        ]
+
+    def _loop(self):
+        while not self._stop.wait(self.reconcile_seconds):
+            try:
+                self.reconcile()
+            except Exception as e:
+                print(f"[STATS] reconcile error: {e}")
+
+    def start(self):
+        """Load the counters, then reconcile them in the background"""
+        self.reconcile()
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="stats-reconcile")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+stats_model = StatsReadModel(ReadSessionLocal, settings.STATS_TTL_SECONDS, settings.STATS_RECONCILE_SECONDS)
+
+
+# --- Deltas from ORM writes -----------------------------------------------------------
+
+def _record(target_or_session, *deltas: Delta):
+    session = target_or_session if isinstance(target_or_session, Session) else inspect(target_or_session).session
+    if session is not None:
+        session.info.setdefault("stats_deltas", []).extend(deltas)
+
+
+def _old(target, field):
+    """Value of `field` before this flush"""
+    history = inspect(target).attrs[field].history
+    return history.deleted[0] if history.deleted else getattr(target, field)
+
+
+def _user_deltas(role, department_code, sign) -> List[Delta]:
+    if role not in ("student", "teacher"):
+        return []
+    deltas = [("totals", f"{role}s", sign)]
+    if role == "student":
+        deltas.append(("students_by_dept", department_code, sign))
+    return deltas
+
+
+def _enrollment_month(value) -> tuple:
+    return rollup_key(value, None)[:2]
+
+
+@event.listens_for(models.User, "after_insert")
+def _user_inserted(mapper, connection, target):
+    _record(target, *_user_deltas(target.role, target.department_code, 1))
+
+
+@event.listens_for(models.User, "after_delete")
+def _user_deleted(mapper, connection, target):
+    _record(target, *_user_deltas(target.role, target.department_code, -1),
+            ("stale", "recent", None), ("stale", "upcoming", None))
+
+
+@event.listens_for(models.User, "after_update")
+def _user_updated(mapper, connection, target):
+    deltas = [("stale", "recent", None), ("stale", "upcoming", None)]  # names
+    old = (_old(target, "role"), _old(target, "department_code"))
+    if old != (target.role, target.department_code):
+        deltas += _user_deltas(*old, -1) + _user_deltas(target.role, target.department_code, 1)
+    _record(target, *deltas)
+
+
+@event.listens_for(models.Department, "after_insert")
+@event.listens_for(models.Department, "after_update")
+def _department_saved(mapper, connection, target):
+    _record(target, ("department", target.code, target.short_name), ("stale", "recent", None))
+
+
+@event.listens_for(models.Department, "after_delete")
+def _department_deleted(mapper, connection, target):
+    _record(target, ("department", target.code, None), ("stale", "recent", None))
+
+
+@event.listens_for(models.Course, "after_insert")
+def _course_inserted(mapper, connection, target):
+    _record(target, ("courses_by_dept", target.department_code, 1))
+
+
+@event.listens_for(models.Course, "after_delete")
+def _course_deleted(mapper, connection, target):
+    _record(target, ("courses_by_dept", target.department_code, -1), ("reconcile", None, None))
+
+
+@event.listens_for(models.Course, "after_update")
+def _course_updated(mapper, connection, target):
+    _record(target, ("courses_by_dept", _old(target, "department_code"), -1),
+            ("courses_by_dept", target.department_code, 1),
+            ("stale", "recent", None), ("stale", "upcoming", None))
+
+
+@event.listens_for(models.Enrollment, "after_insert")
+def _enrollment_inserted(mapper, connection, target):
+    _record(target, ("totals", "enrollments", 1),
+            ("enrollments_by_month", _enrollment_month(target.enrollment_date), 1), ("stale", "recent", None))
+
+
+@event.listens_for(models.Enrollment, "after_delete")
+def _enrollment_deleted(mapper, connection, target):
+    _record(target, ("totals", "enrollments", -1),
+            ("enrollments_by_month", _enrollment_month(target.enrollment_date), -1), ("stale", "recent", None))
+
+
+@event.listens_for(models.Schedule, "after_insert")
+def _schedule_inserted(mapper, connection, target):
+    _record(target, ("totals", "active_schedules", 1 if target.is_active else 0), ("stale", "upcoming", None))
+
+
+@event.listens_for(models.Schedule, "after_delete")
+def _schedule_deleted(mapper, connection, target):
+    _record(target, ("totals", "active_schedules", -1 if target.is_active else 0), ("stale", "upcoming", None))
+
+
+@event.listens_for(models.Schedule, "after_update")
+def _schedule_updated(mapper, connection, target):
+    _record(target, ("totals", "active_schedules", int(bool(target.is_active)) - int(bool(_old(target, "is_active")))),
+            ("stale", "upcoming", None))
+
+
+_TRACKED_TABLES = {
+    model.__tablename__ for model in (models.User, models.Department, models.Course, models.Enrollment, models.Schedule)
+}
+# Bulk schedule updates that touch only these columns leave the counters alone
+_SCHEDULE_TIME_FIELDS = {"id", "day_of_week", "start_time", "end_time"}
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bulk_statement(orm_execute_state):
+    """session.execute(insert/update/delete(Model), ...), which skips the mapper events"""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    # The statement holds an annotated copy of the Table, so compare names
+    table = getattr(getattr(orm_execute_state.statement, "table", None), "name", None)
+    if table not in _TRACKED_TABLES:
+        return
+    rows = orm_execute_state.parameters
+    rows = rows if isinstance(rows, list) else [rows] if rows else []
+    session = orm_execute_state.session
+    if orm_execute_state.is_insert and rows and table == models.Enrollment.__tablename__:
+        _record(session, ("totals", "enrollments", len(rows)), ("stale", "recent", None), *(
+            ("enrollments_by_month", _enrollment_month(row.get("enrollment_date")), 1) for row in rows
+        ))
+    elif orm_execute_state.is_insert and rows and table == models.Schedule.__tablename__:
+        _record(session, ("totals", "active_schedules", sum(1 for row in rows if row.get("is_active", True))),
+                ("stale", "upcoming", None))
+    elif (orm_execute_state.is_update and rows and table == models.Schedule.__tablename__
+          and all(set(row) <= _SCHEDULE_TIME_FIELDS for row in rows)):
+        _record(session, ("stale", "upcoming", None))
+    else:
+        _record(session, ("reconcile", None, None))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_after_commit(session):
+    deltas = session.info.pop("stats_deltas", None)
+    if deltas:
+        stats_model.apply(deltas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("stats_deltas", None)
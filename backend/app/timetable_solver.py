@@ -0,0 +1,144 @@
+#/backend/app/timetable_solver.py
+"""
+Constraint search for weekly group timetables.
+
+A problem is a list of meetings (one per weekly session of a course) and,
+for each, the grid cells (day, period) it may use: cells where its
+teacher or the group is already busy are removed up front. The search
+assigns the meeting with the smallest domain first (ties broken by a
+seeded shuffle) and propagates every assignment to the remaining
+domains:
+  - no two meetings of the group share a cell
+  - meetings of one course fall on different days
+  - at most `max_per_day` meetings a day
+and fails early when the unassigned meetings outnumber the cells left
+to them all. Removals are recorded on a trail and undone on backtrack, so propagation
+is incremental. The search stops when the time budget runs out.
+"""
+import random
+import time
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+Cell = Tuple[int, int]  # (day index, period index) in the grid
+
+
+class Meeting(NamedTuple):
+    course_id: str
+    teacher_id: str
+    number: int  # 0 .. meetings per week - 1
+
+
+class SolveResult(NamedTuple):
+    status: str  # "solved", "infeasible" or "timeout"
+    assignment: Dict[Meeting, Cell]
+    nodes: int  # assignments tried
+    elapsed: float  # seconds
+
+
+class _Timeout(Exception):
+    pass
+
+
+class TimetableSolver:
+    def __init__(
+        self,
+        meetings: List[Meeting],
+        domains: List[Set[Cell]],
+        max_per_day: int,
+        seed: int = 0,
+        time_budget: float = 10.0
+    ):
+        self.meetings = meetings
+        self.domains = [set(domain) for domain in domains]
+        self.max_per_day = max_per_day
+        self.time_budget = time_budget
+        rng = random.Random(seed)
+        # Deterministic per-seed preference among otherwise equal cells and meetings
+        self._rank = {}
+        for i, domain in enumerate(self.domains):
+            cells = sorted(domain)
+            rng.shuffle(cells)
+            self._rank[i] = {cell: r for r, cell in enumerate(cells)}
+        self._tiebreak = list(range(len(meetings)))
+        rng.shuffle(self._tiebreak)
+        self._same_course = [
+            [j for j, other in enumerate(meetings) if j != i and other.course_id == s.course_id]
+            for i, s in enumerate(meetings)
+        ]
+        self._assigned: Dict[int, Cell] = {}
+        self._day_load: Dict[int, int] = {}
+        self._trail: List[Tuple[int, Cell]] = []
+        self._nodes = 0
+        self._deadline = 0.0
+
+    def solve(self) -> SolveResult:
+        start = time.monotonic()
+        self._deadline = start + self.time_budget
+        if any(not domain for domain in self.domains) or not self._enough_cells():
+            status = "infeasible"
+        else:
+            try:
+                status = "solved" if self._search() else "infeasible"
+            except _Timeout:
+                status = "timeout"
+        assignment = (
+            {self.meetings[i]: cell for i, cell in self._assigned.items()}
+            if status == "solved" else {}
+        )
+        return SolveResult(status, assignment, self._nodes, time.monotonic() - start)
+
+    def _search(self) -> bool:
+        if len(self._assigned) == len(self.meetings):
+            return True
+        if time.monotonic() > self._deadline:
+            raise _Timeout()
+
+        # Most constrained meeting first
+        var = min(
+            (i for i in range(len(self.meetings)) if i not in self._assigned),
+            key=lambda i: (len(self.domains[i]), self._tiebreak[i])
+        )
+        # Spread the week: lightly loaded days first
+        values = sorted(
+            self.domains[var],
+            key=lambda cell: (self._day_load.get(cell[0], 0), self._rank[var][cell])
+        )
+        for cell in values:
+            self._nodes += 1
+            mark = len(self._trail)
+            self._assigned[var] = cell
+            self._day_load[cell[0]] = self._day_load.get(cell[0], 0) + 1
+            if self._propagate(var, cell) and self._search():
+                return True
+            self._day_load[cell[0]] -= 1
+            del self._assigned[var]
+            self._undo(mark)
+        return False
+
+    def _propagate(self, var: int, cell: Cell) -> bool:
+        """Prune the unassigned domains; False as soon as one is empty"""
+        day = cell[0]
+        day_full = self._day_load[day] >= self.max_per_day
+        same_course = set(self._same_course[var])
+        for i, domain in enumerate(self.domains):
+            if i in self._assigned:
+                continue
+            if day_full or i in same_course:
+                removed = [c for c in domain if c[0] == day]
+            else:
+                removed = [cell] if cell in domain else []
+            for c in removed:
+                domain.discard(c)
+                self._trail.append((i, c))
+            if not domain:
+                return False
+        return self._enough_cells()
+
+    def _enough_cells(self) -> bool:
+        unassigned = [d for i, d in enumerate(self.domains) if i not in self._assigned]
+        return len(set().union(*unassigned)) >= len(unassigned) if unassigned else True
+
+    def _undo(self, mark: int):
+        while len(self._trail) > mark:
+            i, cell = self._trail.pop()
+            self.domains[i].add(cell)
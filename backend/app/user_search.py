@@ -0,0 +1,196 @@
+#/backend/app/user_search.py
+"""
+Full-text search over users' names, ids and emails for /teachers/search
+and /students/search.
+
+SQLite: an external-content FTS5 table (users_fts) with the trigram
+tokenizer, kept in sync with users by triggers. Postgres: a pg_trgm GIN
+index on the same text, which the database maintains itself. Both match
+any substring of 3+ characters through the index; matches starting with
+the query rank first, then by bm25 / trigram similarity. When a query
+has fewer than `limit` substring matches, the rest is filled with fuzzy
+matches so typos still find the user: rows containing one of up to
+three pieces of the query on SQLite, pg_trgm similarity on Postgres.
+Shorter queries and other databases fall back to ILIKE.
+
+Ranked results are a top `limit`; unranked ones (an empty or short query,
+or the ILIKE backend) come in id order and page with `after`, the last
+id of the previous page (see exports.keyset_page).
+
+users has no INTEGER PRIMARY KEY, so VACUUM may renumber its rowids;
+rebuild the index afterwards:
+    python -m app.migrations search-index
+"""
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+
+MIN_QUERY_LENGTH = 3  # shortest query a trigram index can serve
+
+_SQLITE_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+        full_name, id, email, content='users', content_rowid='rowid', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN
+        INSERT INTO users_fts(rowid, full_name, id, email) VALUES (new.rowid, new.full_name, new.id, new.email);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, full_name, id, email)
+        VALUES ('delete', old.rowid, old.full_name, old.id, old.email);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF full_name, id, email ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, full_name, id, email)
+        VALUES ('delete', old.rowid, old.full_name, old.id, old.email);
+        INSERT INTO users_fts(rowid, full_name, id, email) VALUES (new.rowid, new.full_name, new.id, new.email);
+    END""",
+]
+
+# The indexed text on Postgres; queries must use the same expression to hit the index
+_PG_DOCUMENT = "(coalesce(full_name, '') || ' ' || id || ' ' || coalesce(email, ''))"
+_PG_SCHEMA = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_users_search_trgm ON users USING gin ({_PG_DOCUMENT} gin_trgm_ops)",
+]
+
+
+def _fts_phrase(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
+
+
+def _segments(query: str) -> List[str]:
+    """
+    The query cut into up to 3 equal pieces of 3+ characters: a query with
+    fewer typos than pieces still contains one piece verbatim, and long
+    pieces keep the candidate set small.
+    """
+    count = max(1, min(3, len(query) // MIN_QUERY_LENGTH))
+    size = -(-len(query) // count)
+    pieces = [query[i:i + size] for i in range(0, len(query), size)]
+    return [piece for piece in pieces if len(piece.strip()) >= MIN_QUERY_LENGTH] or [query]
+
+
+class UserSearchIndex:
+    def __init__(self, backend: str = "auto"):
+        self.backend = backend
+        self.kind = "like"  # "fts5", "trgm" or "like"; set by ensure()
+
+    def ensure(self, engine: Engine):
+        """Create the index (and its triggers) if missing; fills it on first creation"""
+        if self.backend == "like":
+            return
+        dialect = engine.dialect.name
+        try:
+            with engine.begin() as conn:
+                if dialect == "sqlite":
+                    created = not conn.execute(text(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'"
+                    )).first()
+                    for statement in _SQLITE_SCHEMA:
+                        conn.execute(text(statement))
+                    if created:
+                        conn.execute(text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+                    self.kind = "fts5"
+                elif dialect == "postgresql":
+                    for statement in _PG_SCHEMA:
+                        conn.execute(text(statement))
+                    self.kind = "trgm"
+        except Exception as e:
+            # e.g. SQLite built without FTS5, or no permission to create pg_trgm
+            print(f"[SEARCH] full-text index unavailable, using ILIKE: {e}")
+            self.kind = "like"
+
+    def rebuild(self, engine: Engine):
+        """Re-read every user into the index (after VACUUM or bulk changes made without triggers)"""
+        self.ensure(engine)
+        if self.kind == "fts5":
+            with engine.begin() as conn:
+                conn.execute(text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+        elif self.kind == "trgm":
+            with engine.begin() as conn:
+                conn.execute(text("REINDEX INDEX ix_users_search_trgm"))
+
+    def search(
+        self,
+        db: Session,
+        role: str,
+        department_code: Optional[str],
+        query: Optional[str],
+        limit: int = 20,
+        after: Optional[str] = None
+    ) -> list:
+        """
+        Users of `role` (in `department_code` unless None) matching `query`,
+        best first; in id order after `after` when not ranked(query).
+        """
+        query = (query or "").strip()
+        if not self.ranked(query):
+            return self._like(db, role, department_code, query, limit, after)
+        if self.kind == "fts5":
+            rows = self._fts5(db, role, department_code, _fts_phrase(query), query, limit)
+            if len(rows) < limit:
+                fuzzy = " OR ".join(_fts_phrase(piece) for piece in _segments(query))
+                seen = {row.id for row in rows}
+                rows += [
+                    row for row in self._fts5(db, role, department_code, fuzzy, query, limit + len(rows))
+                    if row.id not in seen
+                ][:limit - len(rows)]
+            return rows
+        return self._trgm(db, role, department_code, query, limit)
+
+    def ranked(self, query: Optional[str]) -> bool:
+        """Whether search() orders `query`'s matches by relevance rather than by id"""
+        return self.kind != "like" and len((query or "").strip()) >= MIN_QUERY_LENGTH
+
+    def _like(self, db: Session, role: str, department_code: Optional[str], query: str, limit: int,
+              after: Optional[str] = None) -> list:
+        users = db.query(
+            models.User.id,
+            models.User.full_name,
+            models.User.email,
+            models.User.department_code
+        ).filter(models.User.role == role)
+        if department_code is not None:
+            users = users.filter(models.User.department_code == department_code)
+        if query:
+            users = users.filter(
+                models.User.full_name.ilike(f"%{query}%") |
+                models.User.id.ilike(f"%{query}%")
+            )
+        if after:
+            users = users.filter(models.User.id > after)
+        return users.order_by(models.User.id).limit(limit).all()
+
+    def _fts5(self, db: Session, role: str, department_code: Optional[str], match: str, query: str,
+              limit: int) -> list:
+        department_filter = "AND u.department_code = :department" if department_code is not None else ""
+        return db.execute(text(f"""
+            SELECT u.id, u.full_name, u.email, u.department_code
+            FROM users_fts JOIN users u ON u.rowid = users_fts.rowid
+            WHERE users_fts MATCH :match AND u.role = :role {department_filter}
+            ORDER BY (u.full_name LIKE :prefix OR u.id LIKE :prefix) DESC, bm25(users_fts)
+            LIMIT :limit
+        """), {"match": match, "role": role, "department": department_code,
+               "prefix": f"{query}%", "limit": limit}).all()
+
+    def _trgm(self, db: Session, role: str, department_code: Optional[str], query: str, limit: int) -> list:
+        department_filter = "AND department_code = :department" if department_code is not None else ""
+        # Substring matches first, then fuzzy ones (pg_trgm's % similarity operator)
+        return db.execute(text(f"""
+            SELECT id, full_name, email, department_code
+            FROM users
+            WHERE role = :role {department_filter}
+              AND ({_PG_DOCUMENT} ILIKE :contains OR {_PG_DOCUMENT} % :query)
+            ORDER BY {_PG_DOCUMENT} ILIKE :contains DESC,
+                     (full_name ILIKE :prefix OR id ILIKE :prefix) DESC,
+                     similarity({_PG_DOCUMENT}, :query) DESC
+            LIMIT :limit
+        """), {"role": role, "department": department_code, "contains": f"%{query}%",
+               "prefix": f"{query}%", "query": query, "limit": limit}).all()
+
+
+user_search = UserSearchIndex(settings.USER_SEARCH_BACKEND)
@@ -1,74 +1,90 @@
-#/backend/app/utils.py
-from deepface import DeepFace
-from sqlalchemy.orm import Session
-from . import models
-import os
-import json
-from scipy.spatial.distance import cosine
-
-import json
-from scipy.spatial.distance import cosine
-
-def check_duplicate_face(image_path: str, db: Session, threshold: float = 0.3) -> bool:
-    """
-    Check for duplicate face:
-    1. First try embedding match (fast).
-    2. If a user's embedding is missing, fallback to image-to-image match.
-    """
-    try:
-        # Generate embedding for the new image
-        target_repr = DeepFace.represent(
-            img_path=image_path,
-            model_name="VGG-Face",
-            enforce_detection=False
-        )[0]["embedding"]
-
-        # Loop through all existing users
-        for user in db.query(models.User).all():
-            if user.face_embedding:
-                # Compare embeddings
-                try:
-                    stored_repr = json.loads(user.face_embedding)
-                    distance = cosine(target_repr, stored_repr)
-                    if distance < threshold:
-                        print(f"[MATCH] Embedding match with cosine distance: {distance}")
-                        return True
-                except Exception as e:
-                    continue
-            else:
-                # No embedding stored — fallback to image-to-image comparison
-                try:
-                    result = DeepFace.verify(
-                        img1_path=image_path,
-                        img2_path=user.image_path,
-                        model_name="VGG-Face",
-                        enforce_detection=False,
-                        detector_backend="skip"
-                    )
-                    if result["verified"]:
-                        return True
-                except Exception as e:
-                    continue
-
-    except Exception as e:
-        raise e
-
-    return False
-
-def generate_user_id(enrollment_year: int, department_code: str, role: str, db: Session):
-    """Generate ID in format: YYYYRRDDDXXX"""
-    role_code = {
-        "admin": "01",
-        "teacher": "02",
-        "student": "03"
-    }.get(role.lower(), "99")
-    
-    # Find last user in same department/year/role
-    last_user = db.query(models.User).filter(
-        models.User.id.like(f"{enrollment_year}{role_code}{department_code}%")
-    ).order_by(models.User.id.desc()).first()
-    
-    seq = int(last_user.id[-3:]) + 1 if last_user else 1
-    
-    return f"{enrollment_year}{role_code}{department_code}{seq:03d}"
-
+#/backend/app/utils.py
+from deepface import DeepFace
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from . import models
+from .face_index import find_face_match
+from .face_pipeline import analyze_face
+import os
+
+def check_duplicate_face(image_path: str, db: Session, threshold: float = 0.3, embedding=None) -> bool:
+    """
+    Check for duplicate face by embedding match against the face index.
+
+    Users without an embedding are not compared image-to-image here; the
+    embedding backfill job (embedding_backfill.py) fills them in off the
+    request path.
+
+    Pass `embedding` when it has already been computed for this image so
+    the model is not run a second time.
+    """
+    try:
+        # Generate embedding for the new image
+        if embedding is None:
+            embedding = analyze_face(image_path).embedding
+        target_repr = embedding
+
+        # Compare against the stored embeddings (exact index or ANN + exact re-rank)
+        match = find_face_match(db, target_repr, threshold)
+        if match:
+            print(f"[MATCH] Embedding match with {match[0]}, cosine distance: {match[1]}")
+            return True
+
+    except Exception as e:
+        raise e
+
+    return False
+
+def role_code_for(role: str) -> str:
+    return {
+        "admin": "01",
+        "teacher": "02",
+        "student": "03"
+    }.get(role.lower(), "99")
+
+async def generate_user_id_async(enrollment_year: int, department_code: str, role: str, db: AsyncSession):
+    """generate_user_id for an AsyncSession"""
+    prefix = f"{enrollment_year}{role_code_for(role)}{department_code}"
+    last_id = await db.scalar(
+        select(models.User.id).where(models.User.id.like(f"{prefix}%"))
+        .order_by(models.User.id.desc()).limit(1)
+    )
+    seq = int(last_id[-3:]) + 1 if last_id else 1
+    return f"{prefix}{seq:03d}"
+
+
+def generate_user_id(enrollment_year: int, department_code: str, role: str, db: Session):
+    """Generate ID in format: YYYYRRDDDXXX"""
+    role_code = role_code_for(role)
+    
+    # Find last user in same department/year/role
+    last_user = db.query(models.User).filter(
+        models.User.id.like(f"{enrollment_year}{role_code}{department_code}%")
+    ).order_by(models.User.id.desc()).first()
+    
+    seq = int(last_user.id[-3:]) + 1 if last_user else 1
+    
+    return f"{enrollment_year}{role_code}{department_code}{seq:03d}"
+
+
+class UserIdAllocator:
+    """
+    Allocate many IDs (same YYYYRRDDDXXX format) with one query per
+    year/role/department prefix instead of one query per user.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._next_seq = {}
+
+    def allocate(self, enrollment_year: int, department_code: str, role: str) -> str:
+        prefix = f"{enrollment_year}{role_code_for(role)}{department_code}"
+        if prefix not in self._next_seq:
+            last_id = self.db.query(func.max(models.User.id)).filter(
+                models.User.id.like(f"{prefix}%")
+            ).scalar()
+            self._next_seq[prefix] = int(last_id[-3:]) + 1 if last_id else 1
+        seq = self._next_seq[prefix]
+        self._next_seq[prefix] += 1
+        return f"{prefix}{seq:03d}"
@@ -0,0 +1,75 @@
+#/backend/benchmarks/bench_ann_recall.py
+"""
+Report IVF latency and recall against brute force per nprobe, at sizes
+too large for the test suite (tests/test_ann_recall.py asserts recall).
+
+Queries are noisy copies of stored faces (what a duplicate registration
+looks like), so recall@1 is the share of duplicates the ANN path finds.
+
+Run from the backend directory:
+    python -m benchmarks.bench_ann_recall --users 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.ann_index import IVFIndex
+from app.config import settings
+from app.face_index import FaceIndex
+
+DIM = 2622  # VGG-Face
+
+
+def clustered_embeddings(rng, n, dim, clusters=200):
+    """Face embeddings are not uniform; model that with a mixture of clusters"""
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    labels = rng.integers(0, clusters, n)
+    return centers[labels] + 0.8 * rng.standard_normal((n, dim), dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--noise", type=float, default=0.3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    embeddings = clustered_embeddings(rng, args.users, DIM)
+    ids = [f"{i:011d}" for i in range(args.users)]
+    picked = rng.choice(args.users, args.queries, replace=False)
+    queries = embeddings[picked] + args.noise * rng.standard_normal((args.queries, DIM), dtype=np.float32)
+
+    exact = FaceIndex()
+    exact.load(zip(ids, embeddings))
+    start = time.perf_counter()
+    truth = [exact.nearest(q)[0] for q in queries]
+    exact_ms = (time.perf_counter() - start) / args.queries * 1000
+
+    start = time.perf_counter()
+    built = IVFIndex.build(ids, embeddings, nlist=args.nlist)
+    build_s = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "faces.ivf")
+        built.save(path)
+        index = IVFIndex.open(path)
+
+        print(f"users: {args.users}, lists: {index.nlist}, build: {build_s:.1f}s")
+        print(f"brute force: {exact_ms:.2f} ms/query")
+        for nprobe in sorted({1, 2, 4, 8, 16, 32, settings.FACE_ANN_NPROBE}):
+            start = time.perf_counter()
+            found = [index.search(q, k=1, nprobe=nprobe)[0][0] for q in queries]
+            ms = (time.perf_counter() - start) / args.queries * 1000
+            recall = np.mean([f == t for f, t in zip(found, truth)])
+            default = "  (FACE_ANN_NPROBE)" if nprobe == settings.FACE_ANN_NPROBE else ""
+            print(f"nprobe={nprobe:3d}  recall@1={recall:.3f}  {ms:.2f} ms/query{default}")
+        del index
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#/backend/benchmarks/bench_async_load.py
+"""
+Throughput of the DB-backed async endpoints at high concurrency.
+
+Start the API first (uvicorn app.main:app), then from the backend directory:
+    python -m benchmarks.bench_async_load --connections 200 --seconds 20
+    python -m benchmarks.bench_async_load --scenario enroll --course-id CSE101
+
+Run it once against the previous build and once against this one to
+compare. "profile" logs in once and calls /profile with the cache off
+on the server (AUTH_CACHE_ENABLED=false) to exercise the DB path;
+"enroll" posts /enrollments/ for generated student ids.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from collections import Counter
+
+import httpx
+
+from .bench_register_latency import report
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenario", choices=["profile", "enroll"], default="profile")
+    parser.add_argument("--email", default="admin@campus.edu")
+    parser.add_argument("--password", default="secret")
+    parser.add_argument("--course-id", default="BENCH101")
+    parser.add_argument("--connections", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=20)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(base_url=args.url, timeout=60, limits=limits) as client:
+        headers = {}
+        if args.scenario == "profile":
+            response = await client.post("/token", data={"username": args.email, "password": args.password})
+            response.raise_for_status()
+            headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+        latencies, statuses = [], Counter()
+        deadline = time.perf_counter() + args.seconds
+
+        async def connection():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                if args.scenario == "profile":
+                    response = await client.get("/profile", headers=headers)
+                else:
+                    response = await client.post("/enrollments/", json={
+                        "course_id": args.course_id,
+                        "student_id": f"bench-{uuid.uuid4().hex[:12]}"
+                    })
+                statuses[response.status_code] += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(connection() for _ in range(args.connections)))
+        elapsed = time.perf_counter() - start
+
+    print(f"{args.scenario}: {len(latencies) / elapsed:.0f} req/s over {args.connections} connections, "
+          f"statuses: {dict(statuses)}")
+    report(args.scenario, latencies)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+#/backend/benchmarks/bench_bulk_enroll.py
+"""
+Compare the set-based bulk enrollment with the old per-student loop
+(one existence query and one commit per student).
+
+Runs against a scratch SQLite database. From the backend directory:
+    python -m benchmarks.bench_bulk_enroll --sizes 10 100 1000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_enroll.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import select  # noqa: E402
+
+from app import crud, models  # noqa: E402
+from app.database import AsyncSessionLocal, Base, SessionLocal, engine  # noqa: E402
+
+
+def seed(students: int, courses: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add_all(
+        models.User(id=f"202403101{i:04d}", email=f"s{i}@campus.edu", full_name=f"Student {i}",
+                    hashed_password="x", role="student", department_code="101")
+        for i in range(students)
+    )
+    db.add_all(models.Course(id=f"BEN-{c:03d}", name=f"Course {c}", credits=3) for c in range(courses))
+    db.commit()
+    db.close()
+
+
+async def per_student(db, course_id, student_ids):
+    """The previous /enrollments/bulk implementation"""
+    enrolled = 0
+    for student_id in student_ids:
+        existing = await db.scalar(select(models.Enrollment.id).where(
+            models.Enrollment.course_id == course_id,
+            models.Enrollment.student_id == student_id).limit(1))
+        if existing:
+            continue
+        db.add(models.Enrollment(student_id=student_id, course_id=course_id))
+        await db.commit()
+        enrolled += 1
+    return enrolled
+
+
+async def set_based(db, course_id, student_ids):
+    enrolled, _ = await crud.enroll_students(db, course_id, student_ids)
+    return enrolled
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+    seed(max(args.sizes), 2 * len(args.sizes))
+
+    course = 0
+    for size in args.sizes:
+        student_ids = [f"202403101{i:04d}" for i in range(size)]
+        timings = {}
+        for name, fn in (("per-student", per_student), ("set-based", set_based)):
+            async with AsyncSessionLocal() as db:
+                start = time.perf_counter()
+                enrolled = await fn(db, f"BEN-{course:03d}", student_ids)
+                timings[name] = time.perf_counter() - start
+            assert enrolled == size, (name, enrolled)
+            course += 1
+        print(f"{size:>5} students: per-student {timings['per-student'] * 1000:8.1f} ms, "
+              f"set-based {timings['set-based'] * 1000:7.1f} ms "
+              f"({timings['per-student'] / timings['set-based']:.0f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
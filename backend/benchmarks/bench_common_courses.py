@@ -0,0 +1,90 @@
+#/backend/benchmarks/bench_common_courses.py
+"""
+Latency of /courses/common-courses for large student groups: the
+aggregated query (and temp table above COMMON_COURSES_INLINE_LIMIT ids)
+against the old one-query-per-student intersection.
+
+Runs against a scratch SQLite database. From the backend directory:
+    python -m benchmarks.bench_common_courses --sizes 10 200 2000 10000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_common.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import crud, models  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+
+SHARED_COURSES = 3  # every student takes these
+OWN_COURSES = 4  # plus a few of the other courses
+
+
+def seed(students: int, courses: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.execute(insert(models.Course), [
+        {"id": f"BEN-{c:03d}", "name": f"Course {c}", "credits": 3} for c in range(courses)
+    ])
+    db.execute(insert(models.User), [
+        {"id": f"20240310{i:05d}", "email": f"s{i}@campus.edu", "full_name": f"Student {i}",
+         "hashed_password": "x", "role": "student", "department_code": "101"}
+        for i in range(students)
+    ])
+    rows = []
+    for i in range(students):
+        course_ids = set(range(SHARED_COURSES))
+        course_ids.update(SHARED_COURSES + (i * 7 + k * 13) % (courses - SHARED_COURSES) for k in range(OWN_COURSES))
+        rows.extend({"student_id": f"20240310{i:05d}", "course_id": f"BEN-{c:03d}"} for c in course_ids)
+    db.execute(insert(models.Enrollment), rows)
+    db.commit()
+    db.close()
+
+
+def per_student(db, student_ids):
+    """The previous /courses/common-courses implementation"""
+    course_sets = []
+    for sid in student_ids:
+        course_ids = db.query(models.Enrollment.course_id).filter(models.Enrollment.student_id == sid).all()
+        course_sets.append({cid[0] for cid in course_ids})
+    common_ids = set.intersection(*course_sets) if course_sets else set()
+    if not common_ids:
+        return []
+    return db.query(models.Course).filter(models.Course.id.in_(common_ids)).all()
+
+
+def timed(fn, student_ids, repeat):
+    samples, result = [], None
+    for _ in range(repeat):
+        db = SessionLocal()
+        start = time.perf_counter()
+        result = fn(db, student_ids)
+        samples.append((time.perf_counter() - start) * 1000)
+        db.close()
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 200, 2000, 10000])
+    parser.add_argument("--courses", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    seed(max(args.sizes), args.courses)
+
+    for size in args.sizes:
+        student_ids = [f"20240310{i:05d}" for i in range(size)]
+        old_ms, old = timed(per_student, student_ids, args.repeat)
+        new_ms, new = timed(crud.get_common_courses, student_ids, args.repeat)
+        assert {c.id for c in old} == {c.id for c in new}, size
+        print(f"{size:>6} students: per-student {old_ms:8.1f} ms, aggregated {new_ms:7.1f} ms "
+              f"({len(new)} common courses)")
+
+
+if __name__ == "__main__":
+    main()
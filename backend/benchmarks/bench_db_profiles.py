@@ -0,0 +1,113 @@
+#/backend/benchmarks/bench_db_profiles.py
+"""
+Compare SQLite engine profiles under concurrent writers and readers.
+
+Each profile gets a fresh database file. Writer threads insert users one
+transaction at a time (like /register and /enroll); reader threads run
+the /stats style counts at the same time. From the backend directory:
+    python -m benchmarks.bench_db_profiles --writers 8 --readers 4 --seconds 10
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import Base, make_engine
+
+
+def run_profile(profile, args):
+    path = os.path.join(tempfile.mkdtemp(), f"bench-{profile}.db")
+    url = f"sqlite:///{path}"
+    engine = make_engine(url, sqlite_profile=profile)
+    read_engine = make_engine(url, read_only=True, sqlite_profile=profile)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    ReadSession = sessionmaker(bind=read_engine)
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    counts = {"writes": 0, "reads": 0, "locked": 0}
+    write_latencies, read_latencies = [], []
+
+    def writer():
+        while not stop.is_set():
+            db = Session()
+            start = time.perf_counter()
+            try:
+                db.add(models.User(
+                    id=uuid.uuid4().hex[:12],
+                    email=f"{uuid.uuid4().hex}@bench.edu",
+                    full_name="Bench User",
+                    hashed_password="x",
+                    role="student"
+                ))
+                db.commit()
+                with lock:
+                    counts["writes"] += 1
+                    write_latencies.append((time.perf_counter() - start) * 1000)
+            except OperationalError:
+                db.rollback()
+                with lock:
+                    counts["locked"] += 1
+            finally:
+                db.close()
+
+    def reader():
+        while not stop.is_set():
+            db = ReadSession()
+            start = time.perf_counter()
+            try:
+                db.query(func.count(models.User.id)).filter(models.User.role == "student").scalar()
+                with lock:
+                    counts["reads"] += 1
+                    read_latencies.append((time.perf_counter() - start) * 1000)
+            except OperationalError:
+                with lock:
+                    counts["locked"] += 1
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=writer) for _ in range(args.writers)]
+    threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    read_engine.dispose()
+
+    def p99(values):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * 0.99))] if values else 0.0
+
+    print(
+        f"{profile:>8}: {counts['writes'] / args.seconds:7.0f} writes/s "
+        f"(median {statistics.median(write_latencies or [0]):.1f} ms, p99 {p99(write_latencies):.1f} ms), "
+        f"{counts['reads'] / args.seconds:7.0f} reads/s "
+        f"(p99 {p99(read_latencies):.1f} ms), locked errors: {counts['locked']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--profiles", nargs="+", default=["default", "wal"])
+    args = parser.parse_args()
+    for profile in args.profiles:
+        run_profile(profile, args)
+
+
+if __name__ == "__main__":
+    main()
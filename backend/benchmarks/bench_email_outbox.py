@@ -0,0 +1,105 @@
+#/backend/benchmarks/bench_email_outbox.py
+"""
+Throughput of one-connection-per-message vs the batched outbox sender,
+against a local SMTP stand-in.
+
+--connect-delay emulates the TCP/TLS/AUTH cost of opening a session to a
+real mail server. Run from the backend directory:
+    python -m benchmarks.bench_email_outbox --messages 500
+"""
+import argparse
+import os
+import smtplib
+import socketserver
+import tempfile
+import threading
+import time
+
+
+class SMTPStandIn(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: accepts and discards every message"""
+    connect_delay = 0.0
+    received = 0
+    lock = threading.Lock()
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        time.sleep(self.connect_delay)
+        self.reply("220 stand-in ready")
+        in_data = False
+        for raw in self.rfile:
+            line = raw.decode(errors="replace").rstrip("\r\n")
+            if in_data:
+                if line == ".":
+                    in_data = False
+                    with SMTPStandIn.lock:
+                        SMTPStandIn.received += 1
+                    self.reply("250 queued")
+                continue
+            command = line[:4].upper()
+            if command == "EHLO":
+                self.reply("250 stand-in")
+            elif command == "DATA":
+                in_data = True
+                self.reply("354 go ahead")
+            elif command == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 ok")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--connect-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    SMTPStandIn.connect_delay = args.connect_delay
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SMTPStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    tmp = tempfile.mkdtemp()
+    os.chdir(tmp)  # the app's SQLite file is relative to the working directory
+    os.environ["SMTP_HOST"] = "127.0.0.1"
+    os.environ["SMTP_PORT"] = str(port)
+
+    from app.config import settings
+    from app.database import Base, SessionLocal, engine
+    from app.email_service import build_message, queue_welcome_email, WELCOME_SUBJECT, WELCOME_TEMPLATE
+    from app.outbox import OutboxSender
+    Base.metadata.create_all(bind=engine)
+
+    # Old behaviour: render, connect and send for every message
+    start = time.perf_counter()
+    for i in range(args.messages):
+        body = WELCOME_TEMPLATE.substitute(user_fullname=f"Student {i}", user_role="student",
+                                           user_id=f"{i:011d}", reset_link="http://x")
+        with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as smtp:
+            smtp.send_message(build_message(f"s{i}@campus.edu", WELCOME_SUBJECT, body))
+    per_message = time.perf_counter() - start
+
+    db = SessionLocal()
+    for i in range(args.messages):
+        queue_welcome_email(db, f"s{i}@campus.edu", f"{i:011d}", f"Student {i}", "student")
+    db.commit()
+    db.close()
+
+    sender = OutboxSender()
+    start = time.perf_counter()
+    sender.drain()
+    outbox = time.perf_counter() - start
+    server.shutdown()
+
+    print(f"messages:                 {args.messages}")
+    print(f"connection per message:   {per_message:.2f}s ({args.messages / per_message:.0f} msg/s)")
+    print(f"outbox, batch={settings.EMAIL_BATCH_SIZE}:        {outbox:.2f}s ({args.messages / outbox:.0f} msg/s, "
+          f"{sender.stats['connections']} connection(s))")
+    print(f"stand-in received:        {SMTPStandIn.received}")
+
+
+if __name__ == "__main__":
+    main()
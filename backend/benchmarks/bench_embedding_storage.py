@@ -0,0 +1,70 @@
+#/backend/benchmarks/bench_embedding_storage.py
+"""
+Measure DB size and load time of JSON vs float32 blob face embeddings.
+
+Run from the backend directory:
+    python -m benchmarks.bench_embedding_storage --users 10000
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from app.embeddings import decode_embedding, to_blob
+
+DIM = 2622  # VGG-Face
+
+
+def build(path, embeddings, as_blob):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE users (id TEXT PRIMARY KEY, face_embedding TEXT, "
+        "face_embedding_blob BLOB, face_embedding_dim INTEGER)"
+    )
+    rows = (
+        (str(i), None, to_blob(e), DIM) if as_blob else (str(i), json.dumps(e.tolist()), None, None)
+        for i, e in enumerate(embeddings)
+    )
+    conn.executemany("INSERT INTO users VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return os.path.getsize(path)
+
+
+def load(path):
+    conn = sqlite3.connect(path)
+    start = time.perf_counter()
+    rows = conn.execute("SELECT face_embedding_blob, face_embedding_dim, face_embedding FROM users")
+    matrix = np.vstack([decode_embedding(blob, dim, legacy) for blob, dim, legacy in rows])
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed, matrix.shape
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10000)
+    args = parser.parse_args()
+
+    embeddings = np.random.default_rng(0).standard_normal((args.users, DIM), dtype=np.float32)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "json.db")
+        blob_path = os.path.join(tmp, "blob.db")
+        json_size = build(json_path, embeddings, as_blob=False)
+        blob_size = build(blob_path, embeddings, as_blob=True)
+        json_time, _ = load(json_path)
+        blob_time, _ = load(blob_path)
+
+    print(f"users:            {args.users}")
+    print(f"JSON db size:     {json_size / 1e6:.1f} MB ({json_size / args.users / 1e3:.1f} KB/user)")
+    print(f"blob db size:     {blob_size / 1e6:.1f} MB ({blob_size / args.users / 1e3:.1f} KB/user)")
+    print(f"JSON load time:   {json_time * 1000:.0f} ms")
+    print(f"blob load time:   {blob_time * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
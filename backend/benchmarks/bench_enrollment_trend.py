@@ -0,0 +1,142 @@
+#/backend/benchmarks/bench_enrollment_trend.py
+"""
+Enrollment trend from the enrollment_monthly rollup against a GROUP BY
+over the enrollments table, and a consistency check: after ORM inserts,
+deletes, a bulk enrollment and a rolled-back transaction the rollup
+must still match a recount of enrollments.
+
+Runs against a scratch SQLite database. From the backend directory:
+    python -m benchmarks.bench_enrollment_trend --enrollments 1000000
+Exits non-zero if the rollup and the recount differ.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_trend.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import Integer, cast, extract, func, insert  # noqa: E402
+
+from app import crud, enrollment_rollup, models  # noqa: E402
+from app.database import AsyncSessionLocal, Base, SessionLocal, engine  # noqa: E402
+
+COURSES = 200
+DEPARTMENTS = ["101", "102", "103", "104"]
+START = date(2023, 1, 1)
+SEED_END = date(2025, 12, 31)  # enrollment dates are spread over three years
+END = date.today()  # the write mix enrolls today
+
+
+def seed(enrollments: int):
+    """Raw inserts on the engine (no ORM events), like an import; the rollup is backfilled afterwards"""
+    Base.metadata.create_all(bind=engine)
+    students = enrollments // 5
+    with engine.begin() as conn:
+        conn.execute(insert(models.Course), [
+            {"id": f"BEN-{c:03d}", "name": f"Course {c}", "credits": 3, "department_code": DEPARTMENTS[c % 4]}
+            for c in range(COURSES)
+        ])
+        conn.execute(insert(models.User), [
+            {"id": f"2023031{s:07d}", "email": f"s{s}@campus.edu", "full_name": f"Student {s}",
+             "hashed_password": "x", "role": "student", "department_code": DEPARTMENTS[s % 4]}
+            for s in range(students)
+        ])
+        span = (SEED_END - START).days * 86400
+        start = datetime.combine(START, datetime.min.time())
+        for offset in range(0, enrollments, 100000):
+            conn.execute(insert(models.Enrollment), [
+                {"student_id": f"2023031{i // 5:07d}", "course_id": f"BEN-{(i * 37 + i // 5) % COURSES:03d}",
+                 "enrollment_date": start + timedelta(seconds=(i * 7919) % span)}
+                for i in range(offset, min(offset + 100000, enrollments))
+            ])
+    return students
+
+
+def scan_trend(db, department_code=None):
+    """Per-month counts straight from enrollments"""
+    year = cast(extract("year", models.Enrollment.enrollment_date), Integer)
+    month = cast(extract("month", models.Enrollment.enrollment_date), Integer)
+    query = db.query(year, month, func.count(models.Enrollment.id)).join(
+        models.Course, models.Enrollment.course_id == models.Course.id
+    ).filter(
+        models.Enrollment.enrollment_date >= START,
+        models.Enrollment.enrollment_date < END + timedelta(days=1)
+    )
+    if department_code:
+        query = query.filter(models.Course.department_code == department_code)
+    counts = {(y, m): n for y, m, n in query.group_by(year, month)}
+    return [
+        {"period": f"{y}-{m:02d}", "count": counts.get((y, m), 0)}
+        for y in range(START.year, END.year + 1) for m in range(1, 13)
+        if (START.year, START.month) <= (y, m) <= (END.year, END.month)
+    ]
+
+
+def timed(fn, repeat):
+    samples, result = [], None
+    for _ in range(repeat):
+        db = SessionLocal()
+        start = time.perf_counter()
+        result = fn(db)
+        samples.append((time.perf_counter() - start) * 1000)
+        db.close()
+    return statistics.median(samples), result
+
+
+async def write_mix(students: int):
+    db = SessionLocal()
+    db.add(models.Enrollment(student_id="20230310000000", course_id="BEN-001",
+                             enrollment_date=datetime(2024, 2, 29, 12)))
+    db.delete(db.query(models.Enrollment).filter(models.Enrollment.enrollment_date >= datetime(2025, 6, 1)).first())
+    db.commit()
+    db.add(models.Enrollment(student_id="20230310000001", course_id="BEN-198",
+                             enrollment_date=datetime(2024, 3, 1)))
+    db.flush()
+    db.rollback()
+    db.close()
+    async with AsyncSessionLocal() as adb:
+        await crud.enroll_students(adb, "BEN-000", [f"2023031{s:07d}" for s in range(min(students, 2000))])
+
+
+def check(label):
+    db = SessionLocal()
+    for department in (None, "102"):
+        rollup = enrollment_rollup.get_trend(db, START, END, "month", department)
+        if rollup != scan_trend(db, department):
+            print(f"FAIL: rollup and recount differ {label} (department={department})")
+            sys.exit(1)
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--enrollments", type=int, default=300000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    students = seed(args.enrollments)
+
+    start = time.perf_counter()
+    rows = enrollment_rollup.backfill(engine)
+    print(f"backfill of {args.enrollments} enrollments: {rows} rollup rows in {time.perf_counter() - start:.2f} s")
+    check("after backfill")
+
+    scan_ms, _ = timed(scan_trend, args.repeat)
+    rollup_ms, _ = timed(lambda db: enrollment_rollup.get_trend(db, START, END, "month"), args.repeat)
+    quarter_ms, _ = timed(lambda db: enrollment_rollup.get_trend(db, START, END, "quarter", "102"), args.repeat)
+    months = (END.year - START.year) * 12 + END.month - START.month + 1
+    print(f"{months} monthly points: table scan {scan_ms:.1f} ms, rollup {rollup_ms:.2f} ms "
+          f"(quarterly, one department: {quarter_ms:.2f} ms)")
+
+    asyncio.run(write_mix(students))
+    check("after the write mix")
+    print("rollup matches a recount after ORM, bulk and rolled-back writes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#/backend/benchmarks/bench_face_index.py
+"""
+Compare the old per-user cosine loop with the vectorized FaceIndex.
+
+Run from the backend directory:
+    python -m benchmarks.bench_face_index --users 40000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from scipy.spatial.distance import cosine
+
+from app.face_index import FaceIndex
+
+DIM = 2622  # VGG-Face
+
+
+def loop_search(stored_json, target, threshold):
+    """What check_duplicate_face used to do for every registration"""
+    for embedding_json in stored_json:
+        stored = json.loads(embedding_json)
+        if cosine(target, stored) < threshold:
+            return True
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=40000)
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((args.users, DIM), dtype=np.float32)
+    stored_json = [json.dumps(e.tolist()) for e in embeddings]
+    # Random queries are never duplicates, so both paths scan everything
+    queries = rng.standard_normal((args.queries, DIM), dtype=np.float32).tolist()
+
+    start = time.perf_counter()
+    for q in queries:
+        loop_search(stored_json, q, args.threshold)
+    loop_time = (time.perf_counter() - start) / args.queries
+
+    index = FaceIndex()
+    start = time.perf_counter()
+    index.load((str(i), json.loads(e)) for i, e in enumerate(stored_json))
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for q in queries:
+        index.find_match(q, args.threshold)
+    index_time = (time.perf_counter() - start) / args.queries
+
+    print(f"users:               {args.users}")
+    print(f"loop per query:      {loop_time * 1000:.1f} ms")
+    print(f"index build (once):  {build_time * 1000:.1f} ms")
+    print(f"index per query:     {index_time * 1000:.2f} ms")
+    print(f"speedup:             {loop_time / index_time:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
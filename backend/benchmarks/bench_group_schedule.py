@@ -0,0 +1,98 @@
+#/backend/benchmarks/bench_group_schedule.py
+"""
+Query count and latency of saving a group timetable
+(crud.update_group_schedule) as the cohort and timetable grow.
+
+Runs against a scratch SQLite database. From the backend directory:
+    python -m benchmarks.bench_group_schedule
+The bound on the query count is asserted in tests/test_group_schedule.py.
+"""
+import argparse
+import os
+import tempfile
+import time as clock
+from datetime import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_schedule.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import event, insert  # noqa: E402
+
+from app import crud, models, schemas  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+
+DAYS = 5
+COURSES = 5  # each course meets once a day: 25 slots a week
+
+
+def seed(cohorts):
+    """One cohort per size (group codes 2024101, 2024102, ...), each with its own courses"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    for g, students in enumerate(cohorts):
+        dept = f"{101 + g}"
+        db.execute(insert(models.User), [
+            {"id": f"202002{dept}{c:03d}", "email": f"t{dept}{c}@campus.edu", "full_name": "Teacher",
+             "hashed_password": "x", "role": "teacher", "department_code": dept}
+            for c in range(COURSES)
+        ])
+        db.execute(insert(models.Course), [
+            {"id": f"C{dept}-{c}", "name": f"Course {c}", "credits": 3, "teacher_id": f"202002{dept}{c:03d}"}
+            for c in range(COURSES)
+        ])
+        db.execute(insert(models.User), [
+            {"id": f"202403{dept}{s:03d}", "email": f"s{dept}{s}@campus.edu", "full_name": "Student",
+             "hashed_password": "x", "role": "student", "department_code": dept}
+            for s in range(students)
+        ])
+        db.execute(insert(models.Enrollment), [
+            {"student_id": f"202403{dept}{s:03d}", "course_id": f"C{dept}-{c}"}
+            for s in range(students) for c in range(COURSES)
+        ])
+        # The same teachers also teach another group late in the day
+        db.execute(insert(models.Schedule), [
+            {"course_id": f"C{dept}-{c}", "academic_year": 2024, "semester": "fall", "day_of_week": str(d),
+             "start_time": time(16), "end_time": time(17), "is_active": True, "group_code": "2023999"}
+            for c in range(COURSES) for d in range(DAYS)
+        ])
+    db.commit()
+    db.close()
+
+
+def timetable(dept, slots):
+    items = [
+        schemas.ScheduleCreate(course_id=f"C{dept}-{c}", academic_year=2024, semester="fall",
+                               day_of_week=str(d), start_time=time(8 + c), end_time=time(9 + c))
+        for d in range(DAYS) for c in range(COURSES)
+    ]
+    return items[:slots]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cohorts", type=int, nargs="+", default=[50, 500])
+    parser.add_argument("--slots", type=int, nargs="+", default=[5, 25])
+    args = parser.parse_args()
+    seed(args.cohorts)
+
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *rest: statements.append(statement))
+
+    for g, students in enumerate(args.cohorts):
+        dept = f"{101 + g}"
+        for slots in args.slots:
+            for attempt in ("insert", "update"):
+                db = SessionLocal()
+                statements.clear()
+                start = clock.perf_counter()
+                ok = crud.update_group_schedule(db, f"2024{dept}", timetable(dept, slots), 2024, "fall")
+                elapsed = (clock.perf_counter() - start) * 1000
+                db.close()
+                queries = sum(1 for s in statements if not s.startswith(("BEGIN", "COMMIT", "ROLLBACK")))
+                print(f"{students:>5} students, {slots:>2} slots ({attempt}): {queries} queries, "
+                      f"{elapsed:.1f} ms, saved={ok}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#/backend/benchmarks/bench_login_latency.py
+"""
+Measure /token latency and the latency of an unrelated endpoint during a
+login storm.
+
+Start the API first (uvicorn app.main:app), then from the backend directory:
+    python -m benchmarks.bench_login_latency --logins 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+import httpx
+
+from .bench_register_latency import probe, report
+
+
+async def login_storm(client, args, latencies, statuses):
+    queue = asyncio.Queue()
+    for _ in range(args.logins):
+        queue.put_nowait(None)
+
+    async def worker():
+        while not queue.empty():
+            queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.post("/token", data={
+                "username": args.email, "password": args.password
+            })
+            statuses[response.status_code] += 1
+            if response.status_code == 200:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", default="admin@campus.edu")
+    parser.add_argument("--password", default="secret")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--path", default="/", help="unrelated endpoint to probe")
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+        idle = []
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(client, args.path, stop, idle))
+        await asyncio.sleep(2)
+        stop.set()
+        await prober
+
+        logins, loaded, statuses = [], [], Counter()
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(client, args.path, stop, loaded))
+        start = time.perf_counter()
+        await login_storm(client, args, logins, statuses)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await prober
+
+    print(f"{args.logins} logins ({args.concurrency} concurrent) in {elapsed:.1f}s, "
+          f"statuses: {dict(statuses)}")
+    report("/token", logins)
+    report(f"{args.path} idle", idle)
+    report(f"{args.path} during logins", loaded)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
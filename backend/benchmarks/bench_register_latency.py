@@ -0,0 +1,103 @@
+#/backend/benchmarks/bench_register_latency.py
+"""
+Check that other endpoints stay fast while /register is under load.
+
+Each registration uploads a different face photo, so every one runs the
+model and passes the duplicate check instead of being answered from the
+embedding cache or rejected as an existing face. Give at least as many
+photos as registrations.
+
+Start the API first (uvicorn app.main:app), then from the backend directory:
+    python -m benchmarks.bench_register_latency --images faces/*.jpg --registrations 20
+
+tests/test_register.py checks the same property in pytest with a stubbed
+model.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+import httpx
+
+
+async def register(client, department, image_path):
+    with open(image_path, "rb") as f:
+        image_bytes = f.read()
+    response = await client.post("/register", data={
+        "email": f"bench-{uuid.uuid4().hex[:10]}@campus.edu",
+        "full_name": "Bench User",
+        "role": "student",
+        "department_code": department,
+        "date_of_enrollment": "2024-09-01",
+    }, files={"image": (os.path.basename(image_path), image_bytes, "image/jpeg")})
+    body = response.json()
+    return body.get("status") == "success", body.get("message") or body.get("detail")
+
+
+async def probe(client, path, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get(path)
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.05)
+
+
+def report(label, latencies):
+    if not latencies:
+        print(f"{label}: no samples")
+        return
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label}: n={len(latencies)} median={statistics.median(latencies):.1f} ms p99={p99:.1f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--images", nargs="+", required=True, help="one distinct face photo per registration")
+    parser.add_argument("--registrations", type=int, default=20)
+    parser.add_argument("--department", help="department code (default: the first one the API lists)")
+    parser.add_argument("--path", default="/", help="non-registration endpoint to probe")
+    args = parser.parse_args()
+    if len(set(args.images)) < args.registrations:
+        sys.exit(f"{args.registrations} registrations need as many distinct photos, got {len(set(args.images))}")
+    images = sorted(set(args.images))[:args.registrations]
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=300) as client:
+        department = args.department
+        if department is None:
+            departments = (await client.get("/departments/")).json()
+            if not departments:
+                sys.exit("no departments: create one first or pass --department")
+            department = departments[0]["code"]
+
+        idle = []
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(client, args.path, stop, idle))
+        await asyncio.sleep(2)
+        stop.set()
+        await prober
+
+        loaded = []
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(client, args.path, stop, loaded))
+        start = time.perf_counter()
+        results = await asyncio.gather(*(register(client, department, image) for image in images))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await prober
+
+    succeeded = sum(ok for ok, _ in results)
+    print(f"{args.registrations} registrations in {elapsed:.1f}s, {succeeded} succeeded")
+    for message in sorted({message for ok, message in results if not ok}):
+        print(f"  failed: {message}")
+    report(f"{args.path} idle", idle)
+    report(f"{args.path} during registration", loaded)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,153 @@
+#/backend/benchmarks/bench_roster_export.py
+"""
+Memory of the roster endpoints against department size: the streaming
+export (exports.py) against loading the whole roster into one list as
+/students/search-by-year used to, and the latency of keyset pages near
+the start and at the end of a large roster. Also checks that the pages
+return every student exactly once in id order and that the CSV/NDJSON
+exports contain every row.
+
+Runs against a scratch SQLite database. From the backend directory:
+    python -m benchmarks.bench_roster_export --students 50000
+Exits non-zero if a check fails.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, time as clock_time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_export.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("FACE_WORKERS", "0")
+os.environ.setdefault("EMAIL_WORKER_ENABLED", "false")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app import exports, models  # noqa: E402
+from app.database import Base, ReadSessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+LARGE, SMALL = "101", "102"
+COURSES = 20
+
+
+def seed(students: int):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Department), [
+            {"code": code, "name": f"Department {code}", "short_name": f"D{code}"} for code in (LARGE, SMALL)
+        ])
+        conn.execute(insert(models.Course), [
+            {"id": f"BEN-{c:03d}", "name": f"Course {c}", "credits": 3, "department_code": LARGE}
+            for c in range(COURSES)
+        ])
+        for offset in range(0, students, 10000):
+            conn.execute(insert(models.User), [
+                {"id": f"2024{LARGE}{s:05d}", "email": f"s{s}@campus.edu", "full_name": f"Student {s}",
+                 "hashed_password": "x", "role": "student", "department_code": LARGE}
+                for s in range(offset, min(offset + 10000, students))
+            ])
+            conn.execute(insert(models.Enrollment), [
+                {"student_id": f"2024{LARGE}{s:05d}", "course_id": f"BEN-{s % COURSES:03d}",
+                 "enrollment_date": datetime(2024, 9, 1)}
+                for s in range(offset, min(offset + 10000, students))
+            ])
+        conn.execute(insert(models.User), [
+            {"id": f"2024{SMALL}{s:05d}", "email": f"small{s}@campus.edu", "full_name": f"Small {s}",
+             "hashed_password": "x", "role": "student", "department_code": SMALL}
+            for s in range(50)
+        ])
+        conn.execute(insert(models.Schedule), [
+            {"course_id": f"BEN-{c:03d}", "academic_year": 2024, "semester": "fall", "day_of_week": str(c % 5),
+             "start_time": clock_time(8 + c % 8), "end_time": clock_time(9 + c % 8), "is_active": True}
+            for c in range(COURSES)
+        ])
+
+
+def peak_kib(fn):
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def load_all(department):
+    """The previous /students/search-by-year: every row, then one list of dicts"""
+    db = ReadSessionLocal()
+    rows = exports.student_roster(db, department).all()
+    result = [{"id": s.id, "name": s.full_name, "email": s.email} for s in rows]
+    db.close()
+    return result
+
+
+def drain(department, fmt):
+    for _ in exports.stream_rows(lambda db: exports.student_roster(db, department), models.User.id, fmt):
+        pass
+
+
+def fail(message):
+    print(f"FAIL: {message}")
+    sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=50000)
+    parser.add_argument("--page", type=int, default=500)
+    args = parser.parse_args()
+    seed(args.students)
+
+    for department, size in ((SMALL, 50), (LARGE, args.students)):
+        listed = peak_kib(lambda: load_all(department))
+        streamed = peak_kib(lambda: drain(department, "csv"))
+        print(f"{size:>6} students: one list {listed:8.0f} KiB peak, streamed CSV {streamed:6.0f} KiB peak")
+    small_peak = peak_kib(lambda: drain(SMALL, "ndjson"))
+    large_peak = peak_kib(lambda: drain(LARGE, "ndjson"))
+    # Bounded by the fetch batch and the output chunk, not the roster
+    if large_peak > max(4 * small_peak, 2048):
+        fail(f"streaming peak grows with the roster: {small_peak:.0f} KiB -> {large_peak:.0f} KiB")
+
+    client = TestClient(app)
+    seen, after, pages, latencies = [], None, 0, []
+    while True:
+        start = time.perf_counter()
+        response = client.get("/students/search-by-year",
+                              params={"year": "-1", "department": LARGE, "limit": args.page, "after": after})
+        latencies.append((time.perf_counter() - start) * 1000)
+        seen += [s["id"] for s in response.json()]
+        pages += 1
+        after = response.headers.get("X-Next-Cursor")
+        if not after:
+            break
+    expected = sorted(f"2024{LARGE}{s:05d}" for s in range(args.students))
+    if seen != expected:
+        fail(f"{pages} pages returned {len(seen)} ids ({len(set(seen))} distinct), {len(expected)} expected")
+    edge = max(1, len(latencies) // 10)
+    print(f"{pages} keyset pages of {args.page}: first pages median {statistics.median(latencies[:edge]):.2f} ms, "
+          f"last pages median {statistics.median(latencies[-edge:]):.2f} ms")
+
+    response = client.get("/export/students", params={"department": LARGE})
+    exported = [row["id"] for row in csv.DictReader(io.StringIO(response.text))]
+    if exported != expected:
+        fail(f"CSV export has {len(exported)} rows, {len(expected)} expected")
+    response = client.get("/export/enrollments", params={"department": LARGE, "format": "ndjson"})
+    enrollments = [json.loads(line) for line in response.text.splitlines()]
+    if len(enrollments) != args.students or enrollments[0]["course_name"] != "Course 0":
+        fail(f"NDJSON enrollment export has {len(enrollments)} rows, {args.students} expected")
+    response = client.get("/export/schedules", params={"academic_year": 2024, "semester": "fall"})
+    if len(response.text.splitlines()) != COURSES + 1:
+        fail("schedule export is missing rows")
+    print("keyset pages and exports return every row exactly once")
+
+
+if __name__ == "__main__":
+    main()
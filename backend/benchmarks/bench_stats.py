@@ -0,0 +1,140 @@
+#/backend/benchmarks/bench_stats.py
+"""
+Latency of GET /stats served from the read model (stats_model.py) against
+a full recompute, and a drift check: after a mix of ORM, bulk and
+rolled-back writes the incrementally maintained response must equal a
+fresh recompute.
+
+Runs against a scratch SQLite database. From the backend directory:
+    python -m benchmarks.bench_stats --students 20000
+Exits non-zero if the two responses differ.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, time as clock_time, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_stats.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import insert, update  # noqa: E402
+
+from app import crud, models  # noqa: E402
+from app.database import AsyncSessionLocal, Base, ReadSessionLocal, SessionLocal, engine  # noqa: E402
+from app.stats_model import StatsReadModel, stats_model  # noqa: E402
+
+DEPARTMENTS = ["101", "102", "103", "104"]
+
+
+def seed(students: int, courses: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.execute(insert(models.Department), [
+        {"code": code, "name": f"Department {code}", "short_name": f"D{code}"} for code in DEPARTMENTS
+    ])
+    db.execute(insert(models.User), [
+        {"id": f"202002101{t:03d}", "email": f"t{t}@campus.edu", "full_name": f"Teacher {t}",
+         "hashed_password": "x", "role": "teacher", "department_code": DEPARTMENTS[t % 4]}
+        for t in range(courses)
+    ])
+    db.execute(insert(models.User), [
+        {"id": f"2024031{s:06d}", "email": f"s{s}@campus.edu", "full_name": f"Student {s}",
+         "hashed_password": "x", "role": "student", "department_code": DEPARTMENTS[s % 4]}
+        for s in range(students)
+    ])
+    db.execute(insert(models.Course), [
+        {"id": f"BEN-{c:03d}", "name": f"Course {c}", "credits": 3, "department_code": DEPARTMENTS[c % 4],
+         "teacher_id": f"202002101{c:03d}"}
+        for c in range(courses)
+    ])
+    now = datetime.now()
+    db.execute(insert(models.Enrollment), [
+        {"student_id": f"2024031{s:06d}", "course_id": f"BEN-{(s + k) % courses:03d}",
+         "enrollment_date": now - timedelta(days=(s * 7 + k) % 400)}
+        for s in range(students) for k in range(3)
+    ])
+    db.execute(insert(models.Schedule), [
+        {"course_id": f"BEN-{c:03d}", "academic_year": 2024, "semester": "fall", "day_of_week": str(c % 5),
+         "start_time": clock_time(8 + c % 8), "end_time": clock_time(9 + c % 8), "is_active": c % 7 != 0}
+        for c in range(courses)
+    ])
+    db.commit()
+    db.close()
+
+
+async def write_mix(courses: int):
+    """ORM inserts, updates and deletes, a bulk enrollment and a rolled-back transaction"""
+    db = SessionLocal()
+    db.add(models.User(id="202403101999", email="new@campus.edu", full_name="New", hashed_password="x",
+                       role="student", department_code="102"))
+    db.add(models.Enrollment(student_id="202403101999", course_id="BEN-001"))
+    db.query(models.User).filter(models.User.id == "2024031000001").one().department_code = "104"
+    db.delete(db.query(models.Enrollment).first())
+    db.query(models.Schedule).filter(models.Schedule.course_id == "BEN-007").one().is_active = True
+    db.commit()
+
+    db.add(models.User(id="202403101998", email="gone@campus.edu", full_name="Gone", hashed_password="x",
+                       role="student", department_code="101"))
+    db.flush()
+    db.rollback()
+
+    # Bulk schedule writes, as in crud.update_group_schedule
+    db.execute(insert(models.Schedule), [
+        {"course_id": "BEN-002", "academic_year": 2024, "semester": "spring", "day_of_week": str(d),
+         "start_time": clock_time(10), "end_time": clock_time(11), "is_active": True}
+        for d in range(5)
+    ])
+    db.execute(update(models.Schedule), [{"id": 1, "start_time": clock_time(7), "end_time": clock_time(8)}])
+    db.commit()
+    db.close()
+
+    async with AsyncSessionLocal() as adb:
+        await crud.enroll_students(adb, f"BEN-{courses - 1:03d}", [f"2024031{s:06d}" for s in range(500)])
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+def recompute():
+    model = StatsReadModel(ReadSessionLocal, ttl_seconds=30, reconcile_seconds=300)
+    model.reconcile()
+    return model.snapshot()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--courses", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    seed(args.students, args.courses)
+
+    stats_model.reconcile()
+    stats_model.snapshot()
+    full_us = timed(recompute, max(args.repeat // 4, 1))
+    cached_us = timed(stats_model.snapshot, args.repeat * 100)
+    print(f"{args.students} students: full recompute {full_us / 1000:.1f} ms, read model {cached_us:.1f} us")
+
+    asyncio.run(write_mix(args.courses))
+    incremental = stats_model.snapshot()
+    expected = recompute()
+    if incremental != expected:
+        for key in expected:
+            if incremental[key] != expected[key]:
+                print(f"FAIL: {key} drifted: {incremental[key]} != {expected[key]}")
+        sys.exit(1)
+    print("incremental counters match a full recompute after the write mix")
+
+
+if __name__ == "__main__":
+    main()
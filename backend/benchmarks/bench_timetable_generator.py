@@ -0,0 +1,117 @@
+#/backend/benchmarks/bench_timetable_generator.py
+"""
+Generate the timetable of every cohort of a faculty (all departments,
+all years) with crud.generate_group_timetable, saving each one through
+crud.update_group_schedule so later cohorts see earlier commitments of
+shared teachers.
+
+Runs against a scratch SQLite database. From the backend directory:
+    python -m benchmarks.bench_timetable_generator --departments 10 --years 4
+Exits non-zero if a cohort is not solved, the saved faculty timetable
+has a conflict, a rerun with the same seed differs, or the whole faculty
+takes more than TIME_LIMIT seconds.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_timetable.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import crud, models, schemas  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.schedule_conflicts import ConflictIndex, Slot  # noqa: E402
+
+TIME_LIMIT = 60.0
+COURSES = 6  # per cohort
+STUDENTS = 30  # per cohort
+TEACHER_LOAD = 3  # courses per teacher, often in different departments
+
+
+def seed(departments: int, years: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    depts = [f"{101 + d}" for d in range(departments)]
+    cohorts = [(f"{2021 + y}", dept) for dept in depts for y in range(years)]
+    teachers = [f"202002{depts[t % departments]}{t:03d}" for t in range(len(cohorts) * COURSES // TEACHER_LOAD)]
+    db.execute(insert(models.Department), [
+        {"code": dept, "name": f"Department {dept}", "short_name": f"D{dept}"} for dept in depts
+    ])
+    db.execute(insert(models.User), [
+        {"id": tid, "email": f"t{tid}@campus.edu", "full_name": "Teacher", "hashed_password": "x",
+         "role": "teacher", "department_code": tid[6:9]}
+        for tid in teachers
+    ])
+    for g, (year, dept) in enumerate(cohorts):
+        db.execute(insert(models.Course), [
+            {"id": f"C{year}{dept}-{c}", "name": f"Course {c}", "credits": 3 + c % 2, "department_code": dept,
+             "semester": "fall", "teacher_id": teachers[(g * COURSES + c) % len(teachers)]}
+            for c in range(COURSES)
+        ])
+        db.execute(insert(models.User), [
+            {"id": f"{year}03{dept}{s:03d}", "email": f"s{year}{dept}{s}@campus.edu", "full_name": "Student",
+             "hashed_password": "x", "role": "student", "department_code": dept}
+            for s in range(STUDENTS)
+        ])
+        db.execute(insert(models.Enrollment), [
+            {"student_id": f"{year}03{dept}{s:03d}", "course_id": f"C{year}{dept}-{c}"}
+            for s in range(STUDENTS) for c in range(COURSES)
+        ])
+    db.commit()
+    db.close()
+    return [year + dept for year, dept in cohorts]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--departments", type=int, default=10)
+    parser.add_argument("--years", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    groups = seed(args.departments, args.years)
+
+    db = SessionLocal()
+    runs = [crud.generate_group_timetable(db, groups[0], 2024, "fall", seed=args.seed) for _ in range(2)]
+    db.close()
+    if runs[0]["schedule"] != runs[1]["schedule"]:
+        print("FAIL: the same seed produced a different timetable")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    for group_code in groups:
+        db = SessionLocal()
+        result = crud.generate_group_timetable(db, group_code, 2024, "fall", seed=args.seed)
+        if result["status"] != "solved":
+            print(f"FAIL: {group_code} {result['status']}")
+            sys.exit(1)
+        items = [schemas.ScheduleCreate(**item) for item in result["schedule"]]
+        saved = crud.update_group_schedule(db, group_code, items, 2024, "fall")
+        db.close()
+        if not saved:
+            print(f"FAIL: could not save the timetable of {group_code}")
+            sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    # Re-check the saved faculty timetable from scratch: every row against all earlier ones
+    db = SessionLocal()
+    slots = [
+        Slot(row.course_id, row.day_of_week, row.start_time, row.end_time, teacher_id, row.group_code, row.id)
+        for row, teacher_id in db.query(models.Schedule, models.Course.teacher_id).join(
+            models.Course, models.Schedule.course_id == models.Course.id)
+    ]
+    conflicts = ConflictIndex().check(slots)
+    db.close()
+
+    print(f"{len(groups)} cohorts, {len(slots)} sessions scheduled in {elapsed:.2f} s "
+          f"({elapsed / len(groups) * 1000:.0f} ms per cohort), {len(conflicts)} conflicts")
+    if conflicts or elapsed > TIME_LIMIT:
+        print(f"FAIL: expected no conflicts and at most {TIME_LIMIT:.0f} s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#/backend/benchmarks/bench_token_revocation.py
+"""
+Measure how long a token revoked in one process takes to reach the
+others, and what `is_revoked` costs on the hot path (correctness is
+asserted in tests/test_token_revocation.py).
+
+Each worker process runs its own RevocationStore against the shared
+database, like separate uvicorn workers. From the backend directory:
+    python -m benchmarks.bench_token_revocation --workers 4 --tokens 20
+"""
+import argparse
+import multiprocessing
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+
+def worker(tokens, ready, results):
+    from app.revocation import revocation_store
+    revocation_store.start()
+    ready.put(True)
+    seen = {}
+    deadline = time.time() + 30
+    while len(seen) < len(tokens) and time.time() < deadline:
+        now = time.time()
+        for token in tokens:
+            if token not in seen and revocation_store.is_revoked(token):
+                seen[token] = now
+        time.sleep(0.005)
+    revocation_store.stop()
+    results.put(seen)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--tokens", type=int, default=20)
+    args = parser.parse_args()
+
+    from app.database import Base, engine
+    from app.revocation import RevocationStore, SQLRevocationBackend
+    Base.metadata.create_all(bind=engine)
+
+    tokens = [f"bench-{uuid.uuid4().hex}" for _ in range(args.tokens)]
+    context = multiprocessing.get_context("spawn")
+    ready, results = context.Queue(), context.Queue()
+    processes = [context.Process(target=worker, args=(tokens, ready, results)) for _ in range(args.workers)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get(timeout=60)
+
+    store = RevocationStore(SQLRevocationBackend(), sync_seconds=1.0)
+    revoked_at = {}
+    expires = datetime.utcnow() + timedelta(minutes=5)
+    for token in tokens:
+        revoked_at[token] = time.time()
+        store.revoke(token, expires)
+        time.sleep(0.05)
+
+    delays, missing = [], 0
+    for _ in processes:
+        seen = results.get(timeout=60)
+        missing += len(tokens) - len(seen)
+        delays.extend((seen[t] - revoked_at[t]) * 1000 for t in seen)
+    for process in processes:
+        process.join()
+
+    start = time.perf_counter()
+    lookups = 100_000
+    for i in range(lookups):
+        store.is_revoked(tokens[i % len(tokens)])
+    lookup_us = (time.perf_counter() - start) / lookups * 1e6
+
+    print(f"{args.workers} workers, {args.tokens} revocations: missed {missing}")
+    if delays:
+        delays.sort()
+        print(f"propagation: median={statistics.median(delays):.0f} ms max={delays[-1]:.0f} ms")
+    print(f"is_revoked: {lookup_us:.2f} us per call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#/backend/benchmarks/bench_user_search.py
+"""
+Latency of /students/search style lookups at 100k users: the FTS5
+trigram index (user_search.py) against the previous ILIKE '%q%' scan,
+plus correctness checks: substring matches equal a brute-force scan,
+a typo still finds the user, and inserts/updates/deletes reach the index
+through the triggers.
+
+Runs against a scratch SQLite database. From the backend directory:
+    python -m benchmarks.bench_user_search --users 100000
+Exits non-zero if a check fails.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_search.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import models  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.user_search import UserSearchIndex  # noqa: E402
+
+DEPARTMENTS = ["101", "102", "103", "104"]
+SYLLABLES = ["ja", "bay", "dur", "ra", "sid", "ma", "hmud", "fa", "tim", "nus", "rat", "ka", "rim",
+             "sha", "kil", "ta", "nvir", "ha", "san", "mi", "la", "ri", "zu", "ber", "no", "ah"]
+
+
+def name(rng):
+    return " ".join(
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize() for _ in range(2)
+    )
+
+
+def seed(users: int):
+    Base.metadata.create_all(bind=engine)
+    search = UserSearchIndex("auto")
+    search.ensure(engine)  # triggers first, so the bulk insert below goes through them
+    rng = random.Random(7)
+    rows = []
+    for i in range(users):
+        full_name = name(rng)
+        rows.append({"id": f"2024031{i:06d}", "full_name": full_name,
+                     "email": f"{full_name.split()[0].lower()}{i}@campus.edu", "hashed_password": "x",
+                     "role": "student", "department_code": DEPARTMENTS[i % 4]})
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), rows)
+    return search, rows
+
+
+def timed(fn, queries, repeat):
+    samples = []
+    for _ in range(repeat):
+        for query in queries:
+            db = SessionLocal()
+            start = time.perf_counter()
+            fn(db, query)
+            samples.append((time.perf_counter() - start) * 1000)
+            db.close()
+    return statistics.median(samples), max(samples)
+
+
+def fail(message):
+    print(f"FAIL: {message}")
+    sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    search, rows = seed(args.users)
+    like = UserSearchIndex("like")
+
+    target = rows[args.users // 2]
+    first, last = target["full_name"].split()
+    queries = [
+        first[:4],  # autocomplete prefix
+        last[1:5],  # middle of a name
+        target["id"][-6:],  # id fragment
+        f"{first} {last[:3]}",  # full first name and the start of the last
+    ]
+    for label, index in (("ILIKE scan", like), ("FTS5 trigram", search)):
+        for department in ("101", None):
+            median_ms, worst_ms = timed(
+                lambda db, q: index.search(db, "student", department, q, limit=20), queries, args.repeat
+            )
+            scope = f"department {department}" if department else "all departments"
+            print(f"{label:>13}, {scope:<15}: median {median_ms:6.2f} ms, worst {worst_ms:6.2f} ms")
+
+    db = SessionLocal()
+    # Substring matches are exactly the brute-force ones (name, id or email)
+    for query in queries:
+        expected = {
+            r["id"] for r in rows
+            if any(query.lower() in r[field].lower() for field in ("full_name", "id", "email"))
+        }
+        found = {row.id for row in search._fts5(db, "student", None, f'"{query}"', query, len(rows))}
+        if found != expected:
+            fail(f"{query!r}: {len(found)} index matches, {len(expected)} expected")
+    # Prefix matches rank first
+    top = search.search(db, "student", None, first[:4])[0]
+    if not top.full_name.lower().startswith(first[:4].lower()):
+        fail(f"{first[:4]!r} ranked {top.full_name!r} first")
+    # One wrong letter still finds the user
+    typo = f"{first} {last[:2]}x{last[3:]}"
+    if target["id"] not in {row.id for row in search.search(db, "student", None, typo)}:
+        fail(f"typo {typo!r} did not find {target['full_name']!r}")
+    db.close()
+
+    # Writes reach the index through the triggers
+    db = SessionLocal()
+    user = models.User(id="202403199999", full_name="Zyxwv Quxly", email="zyx@campus.edu",
+                       hashed_password="x", role="student", department_code="101")
+    db.add(user)
+    db.commit()
+    found_new = [row.id for row in search.search(db, "student", "101", "xwv qu")]
+    user.full_name = "Renamed Person"
+    db.commit()
+    found_old = [row.id for row in search.search(db, "student", "101", "xwv qu") if row.id == "202403199999"]
+    db.delete(user)
+    db.commit()
+    found_deleted = [row.id for row in search.search(db, "student", "101", "renamed pers")
+                     if row.id == "202403199999"]
+    db.close()
+    if found_new != ["202403199999"] or found_old or found_deleted:
+        fail(f"trigger sync: inserted {found_new}, after rename {found_old}, after delete {found_deleted}")
+    print("substring, ranking, typo and trigger checks passed")
+
+
+if __name__ == "__main__":
+    main()
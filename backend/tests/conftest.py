@@ -0,0 +1,42 @@
+#/backend/tests/conftest.py
+"""
+The app binds its engines to DATABASE_URL at import, so every test runs
+against one scratch SQLite file set up here, before anything imports app.
+Run from the backend directory:
+    python -m pytest
+"""
+import os
+import tempfile
+
+import pytest
+
+SCRATCH_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(SCRATCH_DIR, 'test.db')}"
+os.environ.setdefault("EMBEDDING_CACHE_DIR", os.path.join(SCRATCH_DIR, "embedding_cache"))
+os.environ.setdefault("FACE_WORKERS", "0")  # no inference processes
+os.environ.setdefault("EMAIL_WORKER_ENABLED", "false")
+
+
+def reset_database():
+    """Empty schema: tables created, every row deleted"""
+    from app.database import Base, engine
+    from app.user_search import user_search
+
+    Base.metadata.create_all(bind=engine)
+    user_search.ensure(engine)
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    return engine
+
+
+@pytest.fixture
+def clean_db():
+    """An empty database for one test"""
+    return reset_database()
+
+
+@pytest.fixture(scope="module")
+def clean_module_db():
+    """An empty database shared by the tests of one module, e.g. to seed once"""
+    return reset_database()
@@ -0,0 +1,59 @@
+#/backend/tests/test_ann_recall.py
+"""IVF search (ann_index.py) against brute force over the same embeddings"""
+import os
+
+import numpy as np
+import pytest
+
+from app.ann_index import IVFIndex
+from app.config import settings
+
+USERS = 20000
+DIM = 256
+QUERIES = 200
+K = 10
+
+
+@pytest.fixture(scope="module")
+def faces(tmp_path_factory):
+    """Clustered embeddings (faces are not uniform), a saved index and noisy copies as queries"""
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((200, DIM), dtype=np.float32)
+    embeddings = centers[rng.integers(0, 200, USERS)] + 0.8 * rng.standard_normal((USERS, DIM), dtype=np.float32)
+    ids = [f"{i:011d}" for i in range(USERS)]
+    path = os.path.join(tmp_path_factory.mktemp("ann"), "faces.ivf")
+    IVFIndex.build(ids, embeddings).save(path)
+    picked = rng.choice(USERS, QUERIES, replace=False)
+    queries = embeddings[picked] + 0.3 * rng.standard_normal((QUERIES, DIM), dtype=np.float32)
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return ids, normalized, IVFIndex.open(path), queries
+
+
+def brute_force(normalized, ids, query, k):
+    similarities = normalized @ (query / np.linalg.norm(query))
+    return [ids[i] for i in np.argsort(-similarities)[:k]]
+
+
+def test_recall_at_1_finds_duplicates(faces):
+    ids, normalized, index, queries = faces
+    hits = [
+        index.search(q, k=1)[0][0] == brute_force(normalized, ids, q, 1)[0]
+        for q in queries
+    ]
+    assert np.mean(hits) >= 0.99, f"recall@1 at nprobe={settings.FACE_ANN_NPROBE}"
+
+
+def test_recall_at_k(faces):
+    ids, normalized, index, queries = faces
+    recall = np.mean([
+        len({i for i, _ in index.search(q, k=K)} & set(brute_force(normalized, ids, q, K))) / K
+        for q in queries
+    ])
+    assert recall >= 0.9, f"recall@{K} at nprobe={settings.FACE_ANN_NPROBE}"
+
+
+def test_distances_are_exact(faces):
+    ids, normalized, index, queries = faces
+    user_id, distance = index.search(queries[0], k=1)[0]
+    expected = 1.0 - float(normalized[ids.index(user_id)] @ (queries[0] / np.linalg.norm(queries[0])))
+    assert distance == pytest.approx(expected, abs=1e-5)
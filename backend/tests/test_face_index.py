@@ -0,0 +1,65 @@
+#/backend/tests/test_face_index.py
+"""A worker's FaceIndex (face_index.py) following changes other workers commit"""
+import numpy as np
+from sqlalchemy import delete
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+from app.embeddings import set_user_embedding
+from app.face_index import FaceIndex
+
+DIM = 64
+
+
+def axis(n: int) -> np.ndarray:
+    vector = np.zeros(DIM, dtype=np.float32)
+    vector[n] = 1.0
+    return vector
+
+
+def store(db, user_id: str, embedding, model_name: str = "VGG-Face"):
+    user = db.get(models.User, user_id)
+    if user is None:
+        user = models.User(id=user_id, email=f"{user_id}@campus.edu", full_name=user_id,
+                           hashed_password="x", role="student")
+        db.add(user)
+    set_user_embedding(user, embedding, model_name)
+    db.commit()
+
+
+def indexed(index: FaceIndex) -> set:
+    return {index.nearest(axis(n))[0] for n in range(DIM) if index.nearest(axis(n))[1] < 1e-6}
+
+
+def test_refresh_drops_embeddings_moved_to_another_model(clean_db):
+    db = SessionLocal()
+    store(db, "a", axis(0))
+    store(db, "b", axis(1))
+    index = FaceIndex()
+    index.rebuild_from_db(db)
+    assert indexed(index) == {"a", "b"}
+
+    store(db, "b", axis(1), model_name="Facenet512")  # re-embedded with another model elsewhere
+    store(db, "c", axis(2))
+    index.refresh(db)
+    db.close()
+    assert indexed(index) == {"a", "c"}
+    assert len(index) == 2
+
+
+def test_refresh_drops_deleted_users_on_reconcile(clean_db, monkeypatch):
+    db = SessionLocal()
+    for n, user_id in enumerate(["a", "b", "c"]):
+        store(db, user_id, axis(n))
+    index = FaceIndex()
+    index.rebuild_from_db(db)
+    db.execute(delete(models.User).where(models.User.id == "b"))
+    db.commit()
+
+    index.refresh(db)
+    assert len(index) == 3  # a deletion leaves no stamp to see before the reconcile is due
+    monkeypatch.setattr(settings, "FACE_INDEX_RECONCILE_SECONDS", 0)
+    index.refresh(db)
+    db.close()
+    assert indexed(index) == {"a", "c"}
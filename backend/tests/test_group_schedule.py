@@ -0,0 +1,97 @@
+#/backend/tests/test_group_schedule.py
+"""crud.update_group_schedule saves in a bounded number of statements"""
+from datetime import time
+
+import pytest
+from sqlalchemy import event, insert
+
+from app import crud, models, schemas
+from app.database import SessionLocal, engine
+
+# 4 prefetch SELECTs + at most one UPDATE and one INSERT executemany
+MAX_QUERIES = 6
+DAYS = 5
+COURSES = 5
+COHORTS = {"101": 20, "102": 300}  # department -> students
+
+
+@pytest.fixture(scope="module")
+def cohorts(clean_module_db):
+    """One cohort per department (group 2024<dept>) with its own courses and teachers"""
+    db = SessionLocal()
+    for dept, students in COHORTS.items():
+        db.execute(insert(models.User), [
+            {"id": f"202002{dept}{c:03d}", "email": f"t{dept}{c}@campus.edu", "full_name": "Teacher",
+             "hashed_password": "x", "role": "teacher", "department_code": dept}
+            for c in range(COURSES)
+        ])
+        db.execute(insert(models.Course), [
+            {"id": f"C{dept}-{c}", "name": f"Course {c}", "credits": 3, "teacher_id": f"202002{dept}{c:03d}"}
+            for c in range(COURSES)
+        ])
+        db.execute(insert(models.User), [
+            {"id": f"202403{dept}{s:03d}", "email": f"s{dept}{s}@campus.edu", "full_name": "Student",
+             "hashed_password": "x", "role": "student", "department_code": dept}
+            for s in range(students)
+        ])
+        db.execute(insert(models.Enrollment), [
+            {"student_id": f"202403{dept}{s:03d}", "course_id": f"C{dept}-{c}"}
+            for s in range(students) for c in range(COURSES)
+        ])
+        # The same teachers also teach another group late in the day
+        db.execute(insert(models.Schedule), [
+            {"course_id": f"C{dept}-{c}", "academic_year": 2024, "semester": "fall", "day_of_week": str(d),
+             "start_time": time(16), "end_time": time(17), "is_active": True, "group_code": "2023999"}
+            for c in range(COURSES) for d in range(DAYS)
+        ])
+    db.commit()
+    db.close()
+    return COHORTS
+
+
+def timetable(dept, slots, hour=8):
+    items = [
+        schemas.ScheduleCreate(course_id=f"C{dept}-{c}", academic_year=2024, semester="fall",
+                               day_of_week=str(d), start_time=time(hour + c), end_time=time(hour + c + 1))
+        for d in range(DAYS) for c in range(COURSES)
+    ]
+    return items[:slots]
+
+
+def save(dept, items):
+    """(saved, statements issued) for one crud.update_group_schedule call"""
+    statements = []
+
+    def count(conn, cursor, statement, *rest):
+        if not statement.startswith(("BEGIN", "COMMIT", "ROLLBACK")):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    db = SessionLocal()
+    try:
+        saved = crud.update_group_schedule(db, f"2024{dept}", items, 2024, "fall")
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", count)
+    return saved, len(statements)
+
+
+def group_rows(dept):
+    db = SessionLocal()
+    rows = db.query(models.Schedule.course_id, models.Schedule.day_of_week, models.Schedule.start_time).filter(
+        models.Schedule.group_code == f"2024{dept}"
+    ).all()
+    db.close()
+    return sorted(rows)
+
+
+@pytest.mark.parametrize("dept", list(COHORTS))
+@pytest.mark.parametrize("slots", [5, 25])
+def test_statement_count_is_bounded(cohorts, dept, slots):
+    # Insert, then update the same slots to new times: neither grows with the cohort
+    for hour in (8, 9):
+        items = timetable(dept, slots, hour)
+        saved, queries = save(dept, items)
+        assert saved
+        assert queries <= MAX_QUERIES, f"{cohorts[dept]} students, {slots} slots"
+        assert group_rows(dept) == sorted((i.course_id, i.day_of_week, i.start_time) for i in items)
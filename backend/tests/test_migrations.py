@@ -0,0 +1,35 @@
+#/backend/tests/test_migrations.py
+"""Data migrations (migrations.py) on rows written by older versions"""
+import json
+from datetime import datetime
+
+import numpy as np
+
+from app import models
+from app.database import SessionLocal
+from app.embeddings import get_user_embedding
+from app.migrations import migrate_face_embeddings
+
+
+def test_converting_legacy_embeddings_keeps_their_stamp(clean_db):
+    embedding = np.random.default_rng(0).standard_normal(64).astype(np.float32)
+    stamped = datetime(2024, 1, 1, 12, 0)
+    db = SessionLocal()
+    for user_id, updated_at in (("legacy", None), ("stamped", stamped)):
+        db.add(models.User(id=user_id, email=f"{user_id}@campus.edu", full_name=user_id,
+                           hashed_password="x", role="student",
+                           face_embedding=json.dumps(embedding.tolist()),
+                           face_embedding_updated_at=updated_at))
+    db.commit()
+    db.close()
+
+    migrate_face_embeddings(batch_size=1)
+
+    db = SessionLocal()
+    users = {u.id: u for u in db.query(models.User)}
+    db.close()
+    assert all(u.face_embedding is None and u.face_embedding_blob for u in users.values())
+    assert np.array_equal(get_user_embedding(users["legacy"]), embedding)
+    # Same vector, same model: other workers' face indexes have nothing to re-read
+    assert users["legacy"].face_embedding_updated_at is None
+    assert users["stamped"].face_embedding_updated_at == stamped
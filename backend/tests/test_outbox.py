@@ -0,0 +1,71 @@
+#/backend/tests/test_outbox.py
+"""Outbox sender (outbox.py) against an in-memory SMTP stand-in"""
+from app import models, outbox
+from app.database import SessionLocal
+from app.email_service import queue_email
+from app.outbox import OutboxSender
+
+
+class RecordingSMTP:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, message):
+        self.sent.append(message["To"])
+
+
+def queue(recipients):
+    db = SessionLocal()
+    for recipient in recipients:
+        queue_email(db, recipient, "Subject", "<p>Body</p>")
+    db.commit()
+    db.close()
+
+
+def outbox_rows() -> dict:
+    db = SessionLocal()
+    rows = {m.recipient: (m.status, m.attempts) for m in db.query(models.EmailOutbox)}
+    db.close()
+    return rows
+
+
+def test_unexpected_error_retries_only_that_message(clean_db, monkeypatch):
+    queue(["a@campus.edu", "broken@campus.edu", "c@campus.edu"])
+    build = outbox.build_message
+
+    def build_message(recipient, subject, body_html):
+        if recipient == "broken@campus.edu":
+            raise UnicodeEncodeError("ascii", recipient, 0, 1, "bad header")
+        return build(recipient, subject, body_html)
+
+    monkeypatch.setattr(outbox, "build_message", build_message)
+    smtp = RecordingSMTP()
+    sender = OutboxSender(batch_size=10, max_attempts=3, retry_base=60)
+    monkeypatch.setattr(sender, "_connection", lambda: smtp)
+
+    assert sender.send_batch() == 3
+    assert smtp.sent == ["a@campus.edu", "c@campus.edu"]
+    assert outbox_rows() == {
+        "a@campus.edu": ("sent", 1),
+        "broken@campus.edu": ("pending", 1),
+        "c@campus.edu": ("sent", 1),
+    }
+
+
+def test_sent_messages_are_committed_before_a_crash(clean_db, monkeypatch):
+    queue(["a@campus.edu", "b@campus.edu"])
+    smtp = RecordingSMTP()
+    sender = OutboxSender(batch_size=10)
+    monkeypatch.setattr(sender, "_connection", lambda: smtp)
+
+    def crash_after_first(message):
+        RecordingSMTP.send_message(smtp, message)
+        if len(smtp.sent) == 2:
+            raise SystemExit  # the sender process dies mid-batch
+
+    monkeypatch.setattr(smtp, "send_message", crash_after_first)
+    try:
+        sender.send_batch()
+    except SystemExit:
+        pass
+    assert outbox_rows()["a@campus.edu"] == ("sent", 1)
@@ -0,0 +1,136 @@
+#/backend/tests/test_query_plans.py
+"""
+Hot endpoints stay on indexes: every SELECT, UPDATE and DELETE they issue
+is run through EXPLAIN QUERY PLAN, which must not contain a bare
+"SCAN <table>" of a hot table, and the lookups the indexes were added
+for must name them.
+"""
+import re
+import sqlite3
+from datetime import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, inspect, text
+
+from app import models
+from app.database import SessionLocal, async_engine, engine
+from app.main import app
+from app.migrations import add_missing_indexes
+
+HOT_TABLES = {"users", "courses", "enrollments", "schedules", "departments"}
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+def teacher_id(t: int) -> str:
+    return f"202002{101 + t % 2}{t:03d}"
+
+
+@pytest.fixture(scope="module")
+def seeded(clean_module_db):
+    db = SessionLocal()
+    db.add(models.Department(code="101", name="Computer Science", short_name="CSE"))
+    db.add(models.Department(code="102", name="Electrical Engineering", short_name="EEE"))
+    for t in range(20):
+        db.add(models.User(id=teacher_id(t), email=f"t{t}@campus.edu",
+                           full_name=f"Teacher {t}", hashed_password="x", role="teacher",
+                           department_code=f"10{t % 2 + 1}"))
+    for s in range(2000):
+        db.add(models.User(id=f"202403{101 + s % 2}{s // 2:03d}", email=f"s{s}@campus.edu",
+                           full_name=f"Student {s}", hashed_password="x", role="student",
+                           department_code=f"10{s % 2 + 1}"))
+    for c in range(100):
+        db.add(models.Course(id=f"CSE-{c:03d}", name=f"Course {c}", credits=3, semester="fall",
+                             department_code="101", teacher_id=teacher_id(c % 20)))
+        db.add(models.Schedule(course_id=f"CSE-{c:03d}", academic_year=2024, semester="fall",
+                               day_of_week=str(c % 5), start_time=time(8 + c % 8), end_time=time(9 + c % 8),
+                               group_code=f"2024{100 + c % 3}"))
+    db.flush()
+    students = [u.id for u in db.query(models.User.id).filter(models.User.role == "student")]
+    for i, student_id in enumerate(students):
+        for c in range(3):
+            db.add(models.Enrollment(student_id=student_id, course_id=f"CSE-{(i + c * 7) % 100:03d}"))
+    db.commit()
+    teacher = db.query(models.Course.teacher_id).first()[0]
+    db.close()
+    with sqlite3.connect(engine.url.database) as conn:
+        conn.execute("ANALYZE")
+    return {"one": students[0], "group": students[:50], "teacher": teacher}
+
+
+# name -> (call, indexes its plans must use)
+HOT_PATHS = {
+    "teachers/search": (lambda c, ids: c.get("/teachers/search", params={"department": "101", "query": "Tea"}),
+                        ()),
+    "students/search": (lambda c, ids: c.get("/students/search", params={"department": "101", "query": "Stu"}),
+                        ()),
+    "students/search all": (lambda c, ids: c.get("/students/search", params={"department": "-1"}), ()),
+    "students/search-by-year": (lambda c, ids: c.get("/students/search-by-year",
+                                                     params={"year": "2024", "department": "101"}),
+                                ("ix_users_role_department_id",)),
+    "students/search-by-year page": (lambda c, ids: c.get("/students/search-by-year", params={
+        "year": "-1", "department": "101", "after": ids["one"], "limit": 100}), ("ix_users_role_department_id",)),
+    "getTeachersCourse": (lambda c, ids: c.get(f"/courses/getTeachersCourse/{ids['teacher']}"),
+                          ("ix_courses_teacher_id",)),
+    "getStudentsCourse": (lambda c, ids: c.get(f"/courses/getStudentsCourse/{ids['one']}"),
+                          ("ix_enrollments_student_course",)),
+    "common-courses": (lambda c, ids: c.post("/courses/common-courses", json={"student_ids": ids["group"]}),
+                       ("ix_enrollments_student_course",)),
+    "enrollments create": (lambda c, ids: c.post("/enrollments/", json={
+        "course_id": "CSE-050", "student_id": ids["one"]}), ()),
+    "enrollments bulk": (lambda c, ids: c.post("/enrollments/bulk", json={
+        "course_id": "CSE-051", "student_ids": ids["group"]}), ()),
+    "schedules teacher": (lambda c, ids: c.get(f"/schedules/teacher/{ids['teacher']}",
+                                               params={"academic_year": 2024, "semester": "fall"}),
+                          ("ix_courses_teacher_id",)),
+    "schedules student": (lambda c, ids: c.get(f"/schedules/student/{ids['one']}",
+                                               params={"academic_year": 2024, "semester": "fall"}),
+                          ("ix_schedules_group_term",)),
+    "schedules group": (lambda c, ids: c.get("/schedules/group/2024101",
+                                             params={"academic_year": 2024, "semester": "fall"}),
+                        ("ix_schedules_group_term",)),
+}
+
+
+@pytest.fixture
+def captured():
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")) and not executemany:
+            statements.append((statement, parameters))
+
+    targets = (engine, async_engine.sync_engine)
+    for target in targets:
+        event.listen(target, "before_cursor_execute", capture)
+    yield statements
+    for target in targets:
+        event.remove(target, "before_cursor_execute", capture)
+
+
+@pytest.mark.parametrize("name", HOT_PATHS)
+def test_hot_path_uses_indexes(name, seeded, captured):
+    call, expected_indexes = HOT_PATHS[name]
+    response = call(TestClient(app), seeded)
+    assert response.status_code == 200, response.text
+    assert captured, "no queries captured"
+
+    plans = []
+    with sqlite3.connect(engine.url.database) as explain:
+        for statement, parameters in captured:
+            for row in explain.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ()):
+                plans.append(row[-1])
+    scans = {plan for plan in plans if (m := FULL_SCAN.match(plan)) and m.group(1) in HOT_TABLES}
+    assert not scans, f"full table scans: {scans}"
+    for index in expected_indexes:
+        assert any(index in plan for plan in plans), f"{index} not used: {plans}"
+
+
+def test_replaced_roster_index_is_dropped(clean_db):
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_users_role_department_id"))
+        conn.execute(text("CREATE INDEX ix_users_role_department ON users (role, department_code)"))
+    add_missing_indexes(engine)
+    names = {i["name"] for i in inspect(engine).get_indexes("users")}
+    assert "ix_users_role_department_id" in names
+    assert "ix_users_role_department" not in names
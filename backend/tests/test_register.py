@@ -0,0 +1,151 @@
+#/backend/tests/test_register.py
+"""Registration through the async endpoint path (crud.create_user_async)"""
+import asyncio
+import io
+import itertools
+import os
+import threading
+import time
+from datetime import date
+
+import httpx
+import numpy as np
+from fastapi import UploadFile
+
+from app import auth, crud, face_pipeline, models, schemas
+from app.database import AsyncSessionLocal, SessionLocal
+from app.face_index import face_index
+from app.face_pipeline import FaceAnalysis
+from app.main import app
+
+DEPARTMENT = "301"
+
+
+def add_department():
+    db = SessionLocal()
+    db.add(models.Department(code=DEPARTMENT, name="Registration", short_name="REG"))
+    db.commit()
+    db.close()
+
+
+def user_create(n: int) -> schemas.UserCreate:
+    return schemas.UserCreate(
+        email=f"register{n}@campus.edu",
+        full_name=f"Register {n}",
+        role="student",
+        department_code=DEPARTMENT,
+        date_of_enrollment=date(2024, 9, 1),
+        image=UploadFile(io.BytesIO(b"jpeg"), filename=f"face{n}.jpg")
+    )
+
+
+def analysis(n: int) -> FaceAnalysis:
+    # One axis per user: no two faces are within the duplicate threshold
+    embedding = np.zeros(4096, dtype=np.float32)
+    embedding[n] = 1.0
+    return FaceAnalysis(embedding.tolist(), None, None, 0.0)
+
+
+async def register(n: int):
+    path = crud.save_upload_image(f"face{n}.jpg", b"jpeg")
+    async with AsyncSessionLocal() as db:
+        return await crud.create_user_async(db, user_create(n), path, analysis(n))
+
+
+def test_concurrent_registrations_get_distinct_ids(clean_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(crud, "UPLOAD_DIR", str(tmp_path))
+    add_department()
+    face_index.reset()
+
+    async def register_all():
+        return await asyncio.gather(*(register(n) for n in range(8)))
+
+    responses = asyncio.run(register_all())
+    assert all(b'"success"' in response.body for response in responses)
+    db = SessionLocal()
+    users = db.query(models.User).filter(models.User.department_code == DEPARTMENT).all()
+    db.close()
+    assert sorted(u.id for u in users) == [f"202403{DEPARTMENT}{seq:03d}" for seq in range(1, 9)]
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(u.image_path) for u in users)
+
+
+def test_profile_stays_fast_while_registrations_run(clean_db, tmp_path, monkeypatch):
+    """Face inference runs off the event loop: /profile answers between model runs"""
+    inference_seconds = 1.0
+    axes = itertools.count(100)
+
+    def compute_face(image_path):
+        end = time.perf_counter() + inference_seconds
+        while time.perf_counter() < end:
+            pass  # CPU-bound, like the model
+        return analysis(next(axes))
+
+    monkeypatch.setattr(face_pipeline, "compute_face", compute_face)
+    monkeypatch.setattr(crud, "UPLOAD_DIR", str(tmp_path))
+    add_department()
+    db = SessionLocal()
+    db.add(models.User(id="20240130100", email="probe@campus.edu", full_name="Probe",
+                       role="admin", department_code=DEPARTMENT, date_of_enrollment=date(2024, 1, 1),
+                       hashed_password="x"))
+    db.commit()
+    db.close()
+    face_index.reset()
+    token = auth.create_access_token({"sub": "probe@campus.edu"})
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+            async def register_one(n):
+                return await client.post("/register", data={
+                    "email": f"load{n}@campus.edu",
+                    "full_name": f"Load {n}",
+                    "role": "student",
+                    "department_code": DEPARTMENT,
+                    "date_of_enrollment": "2024-09-01",
+                }, files={"image": (f"load{n}.jpg", f"distinct image {n}".encode(), "image/jpeg")})
+
+            registrations = asyncio.gather(*(register_one(n) for n in range(4)))
+            latencies = []
+            while not registrations.done():
+                start = time.perf_counter()
+                response = await client.get("/profile", headers={"Authorization": f"Bearer {token}"})
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200
+                await asyncio.sleep(0.02)
+            return await registrations, latencies
+
+    responses, latencies = asyncio.run(run())
+    assert all(response.json()["status"] == "success" for response in responses)
+    assert len(latencies) >= 5
+    # One model run on the loop would hold a probe for the full second
+    assert max(latencies) < inference_seconds / 2
+
+
+def test_embedding_cache_is_used_off_the_event_loop(tmp_path, monkeypatch):
+    """get/put can touch spill files on disk; the loop thread must not wait on them"""
+    from app.embedding_cache import embedding_cache
+    from app.inference_pool import inference_pool
+
+    loop_threads, cache_threads = set(), []
+    for name in ("get", "put"):
+        method = getattr(embedding_cache, name)
+
+        def recorded(*args, _method=method):
+            cache_threads.append(threading.get_ident())
+            return _method(*args)
+
+        monkeypatch.setattr(embedding_cache, name, recorded)
+    monkeypatch.setattr(face_pipeline, "compute_face", lambda image_path: analysis(7))
+    image = tmp_path / "face.jpg"
+    image.write_bytes(b"cache probe image")
+
+    async def analyze_twice():
+        loop_threads.add(threading.get_ident())
+        first = await inference_pool.analyze_face(str(image))
+        second = await inference_pool.analyze_face(str(image))
+        return first, second
+
+    first, second = asyncio.run(analyze_twice())
+    assert first.embedding == second.embedding
+    assert len(cache_threads) == 3  # miss, store, hit
+    assert not loop_threads & set(cache_threads)
@@ -0,0 +1,94 @@
+#/backend/tests/test_token_revocation.py
+"""Token revocations (revocation.py) shared between worker processes"""
+import os
+import subprocess
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app import models
+from app.database import engine
+from app.revocation import RevocationStore, SQLRevocationBackend
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A second worker: its own store on the shared database, started before the
+# revocation, polling for a token read from stdin
+WORKER = """
+import sys, time
+from sqlalchemy import update
+
+from app import models
+from app.database import engine
+from app.revocation import RevocationStore, SQLRevocationBackend
+store = RevocationStore(SQLRevocationBackend(), sync_seconds=0.1)
+store.start()
+print("ready", flush=True)
+token = sys.stdin.readline().strip()
+deadline = time.time() + 10
+while not store.is_revoked(token) and time.time() < deadline:
+    time.sleep(0.02)
+print("revoked" if store.is_revoked(token) else "missed", flush=True)
+store.stop()
+"""
+
+
+def start_worker():
+    return subprocess.Popen(
+        [sys.executable, "-c", WORKER], cwd=BACKEND_DIR, env=os.environ.copy(),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+
+
+def test_revocation_reaches_a_running_worker(clean_db):
+    worker = start_worker()
+    try:
+        assert worker.stdout.readline().strip() == "ready"
+        token = f"test-{uuid.uuid4().hex}"
+        store = RevocationStore(SQLRevocationBackend(), sync_seconds=1.0)
+        store.revoke(token, datetime.utcnow() + timedelta(minutes=5))
+        assert store.is_revoked(token)
+        worker.stdin.write(token + "\n")
+        worker.stdin.flush()
+        assert worker.stdout.readline().strip() == "revoked"
+    finally:
+        worker.stdin.close()
+        worker.wait(timeout=30)
+
+
+def test_new_worker_loads_existing_revocations(clean_db):
+    token = f"test-{uuid.uuid4().hex}"
+    RevocationStore(SQLRevocationBackend(), sync_seconds=1.0).revoke(
+        token, datetime.utcnow() + timedelta(minutes=5)
+    )
+    fresh = RevocationStore(SQLRevocationBackend(), sync_seconds=1.0)
+    fresh.sync()
+    assert fresh.is_revoked(token)
+    assert not fresh.is_revoked(f"test-{uuid.uuid4().hex}")
+
+
+def test_expired_revocations_are_not_enforced(clean_db):
+    token = f"test-{uuid.uuid4().hex}"
+    store = RevocationStore(SQLRevocationBackend(), sync_seconds=1.0)
+    store.revoke(token, datetime.utcnow() - timedelta(seconds=1))
+    assert not store.is_revoked(token)
+
+
+def test_revocation_after_a_purge_reaches_a_synced_worker(clean_db):
+    """Purging can free low ids; a revocation that reuses one must still be seen"""
+    a = RevocationStore(SQLRevocationBackend(), sync_seconds=1.0)
+    b = RevocationStore(SQLRevocationBackend(), sync_seconds=1.0)
+    expires = datetime.utcnow() + timedelta(minutes=5)
+    for token in ("tok1", "tok2"):
+        a.revoke(token, expires)
+    b.sync()
+    assert b.is_revoked("tok2")
+
+    with engine.begin() as conn:
+        conn.execute(update(models.RevokedToken).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    assert a.backend.purge(datetime.utcnow()) == 2
+    a.revoke("tok3", expires)
+    b.sync()
+    assert b.is_revoked("tok3")
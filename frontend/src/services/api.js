@@ -127,16 +127,21 @@ export const userService = {
 },
  async getStudents(params) {
     try {
+    // One keyset page; pass nextCursor back as params.after for the next one
     const response = await api.get('/students/search-by-year', {
       params: {
         year: params.year,
-        department: params.department // Send trimmed query
+        department: params.department,
+        after: params.after
       }
     });
-    return response.data;
+    return {
+      students: response.data,
+      nextCursor: response.headers['x-next-cursor'] || null
+    };
   } catch (error) {
     if (error.response?.status === 404) {
-      return []; // Return empty array for "no teachers found"
+      return { students: [], nextCursor: null }; // no students found
     }
     console.error("Student search error:", error);
     throw error;